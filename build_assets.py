@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+from core.assets import (scan_assets, source_key, biome_map, BUILD_PATH, BUILD_MANIFEST_PATH, BUILD_PACK_PATH,
+                         BUILD_VERSION, ARRAY_CATEGORIES)
+
+# Un TextureArray par catégorie envoyée en TextureArray par le jeu (core.assets.ARRAY_CATEGORIES) ; les blocs et
+# sprites, envoyés en textures 2D, restent décodés depuis les PNG. Sans pyglet : pas besoin d'affichage.
+
+
+def build_layer_levels(images, layer_width, layer_height):
+    """
+    Place chaque image dans le coin bas-gauche d'une couche et calcule la chaîne de mipmaps.
+    Retourne [(largeur, hauteur, rgba de toutes les couches)] du niveau 0 jusqu'à 1x1.
+    Les lignes sont écrites de bas en haut, comme les attend OpenGL.
+    """
+    from PIL import Image
+
+    canvases = []
+    for image in images:
+        canvas = Image.new("RGBA", (layer_width, layer_height), (0, 0, 0, 0))
+        canvas.paste(image, (0, layer_height - image.height))
+        canvases.append(canvas)
+
+    levels = []
+    width, height = layer_width, layer_height
+    while True:
+        layers = [canvas if canvas.size == (width, height) else canvas.resize((width, height), Image.BOX)
+                  for canvas in canvases]
+        data = b"".join(layer.transpose(Image.FLIP_TOP_BOTTOM).tobytes() for layer in layers)
+        levels.append((width, height, data))
+        if width == 1 and height == 1:
+            return levels
+        width, height = max(1, width // 2), max(1, height // 2)
+
+
+def build_assets():
+    from PIL import Image
+
+    entries = [entry for entry in scan_assets() if entry[0] in ARRAY_CATEGORIES]
+    manifest = {
+        "version": BUILD_VERSION,
+        "source_key": source_key(entries),
+        "arrays": {},
+        "biomes": {},
+    }
+    offset = 0
+
+    os.makedirs(BUILD_PATH, exist_ok=True)
+    with open(BUILD_PACK_PATH, 'wb') as pack:
+        for category in ARRAY_CATEGORIES:
+            keys = [key for entry_category, key, path in entries if entry_category == category]
+            images = [Image.open(path).convert("RGBA") for entry_category, key, path in entries if entry_category == category]
+            if not images:
+                continue
+            layer_width = max(image.width for image in images)
+            layer_height = max(image.height for image in images)
+
+            levels = []
+            for width, height, data in build_layer_levels(images, layer_width, layer_height):
+                pack.write(data)
+                levels.append({"width": width, "height": height, "offset": offset, "length": len(data)})
+                offset += len(data)
+
+            manifest["arrays"][category] = {
+                "width": layer_width,
+                "height": layer_height,
+                "layers": len(images),
+                "levels": levels,
+                "textures": {
+                    key: {"layer": layer, "width": image.width, "height": image.height}
+                    for layer, (key, image) in enumerate(zip(keys, images))
+                },
+            }
+            manifest["biomes"][category] = biome_map(keys)
+            print(f"{category}: {len(images)} textures, couches {layer_width}x{layer_height}, {len(levels)} niveaux de mipmap")
+
+    with open(BUILD_MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    print(f"Écrit {BUILD_MANIFEST_PATH} et {BUILD_PACK_PATH} ({offset // 1024} Ko)")
+
+
+if __name__ == "__main__":
+    try:
+        from PIL import Image
+    except ImportError:
+        print("Pillow library not found. Please install it by running: pip install Pillow")
+        sys.exit(1)
+    build_assets()
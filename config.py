@@ -3,6 +3,18 @@ RENDER_DISTANCE = 7
 SPRITE_RENDER_DISTANCE = 4 # New: Separate render distance for sprites
 BLOCK_HEIGHT = 20
 WORLD_SEED = 42
+# Placement des arbres et sprites : True reproduit les mondes générés avant le hash entier (core/hashing.py)
+LEGACY_WORLD_HASH = False
+# Relief, biomes et grottes : True reproduit le bruit des mondes d'avant core/perlin.py (seed passée comme base
+# à la bibliothèque `noise`) ; les calculs par lot (cartes, minimap, terrain lointain, grottes) sont alors bien plus lents
+LEGACY_WORLD_NOISE = False
+# Pregenerated chunks (pregenerate.py), one database per seed, read by the game when present
+WORLD_STORE_DIR = "worlds"
+
+# Predictive chunk prefetch: chunks along the player's path, LOOKAHEAD seconds ahead,
+# at most MAX_CHUNKS held outside the render window
+PREFETCH_LOOKAHEAD = 3.0
+PREFETCH_MAX_CHUNKS = 90
 
 # Sprite generation parameters
 SPRITE_NOISE_SCALE = 0.05
@@ -12,6 +24,22 @@ SPRITE_HEIGHT_OFFSET = 0.5
 # Animal generation parameters
 ANIMAL_HEIGHT_OFFSET = 0.5
 ANIMAL_RENDER_DISTANCE = 4
+MAX_ANIMALS = 200
+
+# Idle chunks: beyond RESIDENT_RADIUS chunks from the player and untouched for IDLE_SECONDS,
+# their block data is kept compressed (core/chunk_memory.py), at most COMPRESS_PER_FRAME per frame
+CHUNK_RESIDENT_RADIUS = 4
+CHUNK_IDLE_SECONDS = 10.0
+CHUNK_COMPRESS_PER_FRAME = 4
+
+# Background jobs (core/jobs.py): worker threads for chunk generation, meshing and sprites, and the
+# main-thread time per frame spent turning finished jobs into GPU buffers (the rest waits for the next frame)
+JOB_WORKERS = 2
+JOB_FRAME_BUDGET_MS = 4.0
+
+# Memory budget (core/memory.py) shared by the caches of a process (column data, cave masks, compressed
+# chunks, far terrain, minimap); loaded block data counts against it but is only freed by unloading
+MEMORY_BUDGET_MB = 1024
 
 # Minimap
 MINIMAP_RADIUS = 32
@@ -20,3 +48,38 @@ MINIMAP_CHUNK_PIXEL_SIZE = 8
 # Fog parameters
 FOG_START = 80.0
 FOG_END = 90.0
+
+# Far terrain (core/lod.py): rings of downsampled heightmap beyond RENDER_DISTANCE,
+# as (grid step in blocks, outer radius in chunks). An empty list disables it.
+LOD_RINGS = [(2, 14), (4, 24), (8, 40)]
+# Fog used instead of FOG_START/FOG_END while the far terrain is enabled
+LOD_FOG_START = 400.0
+LOD_FOG_END = 620.0
+
+# Simulation (player physics, animals, raycast, world streaming) runs at a fixed SIMULATION_RATE ticks per
+# second, rendering interpolates between the last two ticks. At most MAX_TICKS_PER_FRAME ticks per frame:
+# past that a slow machine slows the game down instead of falling further behind.
+SIMULATION_RATE = 60
+MAX_TICKS_PER_FRAME = 5
+# Player updates sent to the server per second
+NETWORK_SEND_RATE = 20
+# Frame limiter in frames per second (0: redraw as often as possible, paced by vsync when enabled)
+FRAME_RATE_LIMIT = 60
+
+# Dynamic resolution: scale the 3D pass down to hold the target frame rate (measured on the GPU time of the frame,
+# which is what the render scale reduces)
+DYNAMIC_RESOLUTION = False
+TARGET_FPS = 60
+MIN_RENDER_SCALE = 0.5
+
+# Adaptive render distance: moved one chunk at a time between MIN and MAX_RENDER_DISTANCE to hold TARGET_FPS
+# (measured on the larger of the frame's CPU work and its GPU time, so it also acts under the frame limiter).
+# Sprite and animal distances and MAX_ANIMALS follow in proportion to their values above. Only raised while the
+# background job queue holds at most ADAPTIVE_MAX_BACKLOG jobs.
+ADAPTIVE_RENDER_DISTANCE = False
+MIN_RENDER_DISTANCE = 3
+MAX_RENDER_DISTANCE = 12
+ADAPTIVE_MAX_BACKLOG = 32
+
+# HUD: debug overlay text refresh rate (updates per second)
+DEBUG_TEXT_RATE = 4
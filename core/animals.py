@@ -1,10 +1,14 @@
 import random
 import math
 import os
-import pyglet # Added for batch rendering
-from config import ANIMAL_RENDER_DISTANCE, CHUNK_SIZE, ANIMAL_HEIGHT_OFFSET
-
-# Import des classes d'animaux
+import numpy as np
+import pyglet
+import config
+from config import CHUNK_SIZE, ANIMAL_HEIGHT_OFFSET
+from core.instancing import InstanceBuffer, FLOATS_PER_INSTANCE, create_instanced_program
+from core.render_state import render_state
+
+# Import des classes d'animaux (paramètres de chaque espèce)
 from core.animal.base import BaseAnimal
 from core.animal.poisson import Poisson
 from core.animal.poulpe import Poulpe
@@ -13,21 +17,49 @@ from core.animal.frog import Frog
 from core.animal.snake import Snake
 from core.animal.cerf import Cerf
 
+# Simulation en structure de tableaux : position, vitesse, minuteurs et paramètres d'espèce de tous les animaux
+# sont des tableaux NumPy (une ligne par animal, qui est aussi son slot dans le buffer d'instances), mis à jour
+# en quelques opérations par tick quel que soit leur nombre. Le sol est la hauteur naturelle du terrain
+# (get_height) : elle n'est recalculée que pour les animaux qui changent de colonne.
+
+GRAVITY = 9.8 * 0.5
+FLEE_DISTANCE = 7.0
+FLEE_SPEED = 4.0 # Fuir plus vite : multiple de base_speed
+FLEE_PAUSE = 1.0 # Courte pause avant de reprendre un mouvement normal
+SUPPORT_MARGIN = 0.1 # Un animal à moins de cette hauteur au-dessus du sol est porté
+
+# Paramètres d'espèce copiés sur chaque animal (attributs de BaseAnimal et de ses sous-classes)
+PARAMS_DTYPE = np.dtype([
+    ('speed', 'f8'), ('gravity', 'f8'), ('wander_min', 'f8'), ('wander_max', 'f8'),
+    ('vertical_wander', 'f8'), ('burst_chance', 'f8'), ('burst_speed', 'f8'),
+    ('jump_strength', 'f8'), ('jump_cooldown', 'f8'), ('max_y', 'f8'),
+])
+
+
+def species_params(animal_class):
+    return (animal_class.base_speed, animal_class.gravity_multiplier, animal_class.wander_time[0],
+            animal_class.wander_time[1], animal_class.vertical_wander, animal_class.burst_chance,
+            animal_class.burst_speed, animal_class.jump_strength, animal_class.jump_cooldown, animal_class.max_y)
+
 
 # Classe manager pour tous les animaux
 class Animals:
-    def __init__(self, seed=0, vegetation=None, program=None): # Added program
+    def __init__(self, seed=0, vegetation=None):
         self.seed = seed
-        self.active_animals = []
+        self.count = 0 # Animaux actifs : les lignes [0, count) des tableaux
+        self.capacity = 0
         self.textures = None
-        self.max_animals = 30
-        self.spawn_radius = ANIMAL_RENDER_DISTANCE * CHUNK_SIZE / 2
-        self.r = random.Random(seed)
+        self.r = random.Random(seed) # Apparitions
+        self.rng = np.random.default_rng(seed) # Déplacements
         self.vegetation = vegetation
-        self.program = program # Store the shader program
-        self.animal_batches = {} # Dictionary to store batches per texture
-        # self.vertex_list = None # No longer needed
-        self._needs_rebuild = False # Flag to indicate if the vertex list needs rebuilding
+        self._allocate(max(1, self.max_animals))
+        self.dirty = False # Des slots du buffer d'instances sont à réécrire
+
+        # Rendu instancié : un buffer d'attributs par animal, réécrit d'un bloc quand des animaux bougent
+        self.program = create_instanced_program()
+        self.instances = InstanceBuffer(capacity=self.capacity)
+        self.texture_array = None
+        self.texture_layers = {}
 
         # Mapper le nom du type d'animal (depuis le nom de fichier) à la classe
         self.animal_class_map = {
@@ -42,37 +74,194 @@ class Animals:
             "cerf1": Cerf
         }
 
+    # Lus à chaque tick : la distance des animaux et leur nombre maximal peuvent changer en jeu
+    @property
+    def max_animals(self):
+        return config.MAX_ANIMALS
+
+    @property
+    def spawn_radius(self):
+        return config.ANIMAL_RENDER_DISTANCE * CHUNK_SIZE / 2
+
+    def __len__(self):
+        return self.count
+
+    def _allocate(self, capacity):
+        """Agrandit les tableaux à `capacity` lignes en gardant les animaux actifs."""
+        fields = {
+            'position': ((3,), np.float64), # x, y, z
+            'previous': ((3,), np.float64), # Position au tick précédent (interpolation du rendu)
+            'velocity': ((3,), np.float64),
+            'timer': ((), np.float64), # Avant le prochain changement de direction
+            'jump_timer': ((), np.float64), # Avant le prochain saut possible
+            'on_ground': ((), bool), # Sauteurs : posés (un saut ne part que du sol)
+            'column': ((2,), np.int64), # Colonne de terrain sous l'animal...
+            'column_height': ((), np.float64), # ... et sa hauteur naturelle
+            'moved': ((), bool), # A bougé pendant le dernier tick
+            'params': ((), PARAMS_DTYPE),
+            'appearance': ((5,), np.float32), # width, height, couche, u_max, v_max (attributs d'instance fixes)
+        }
+        for name, (shape, dtype) in fields.items():
+            array = np.zeros((capacity,) + shape, dtype=dtype)
+            if self.capacity:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
     def set_textures(self, textures):
         self.textures = textures
+        self.texture_array, self.texture_layers = textures.get_animal_texture_array()
 
     def update(self, dt, player_pos, world_info_funcs):
-        """Méthode principale appelée à chaque frame."""
-        self._manage_population(player_pos, world_info_funcs.get("get_height"), world_info_funcs.get("get_biome"))
-
-        # Le dictionnaire est déjà prêt à être passé aux animaux
-        for animal in self.active_animals:
-            old_pos = (animal.x, animal.y, animal.z)
-            animal.update(dt, player_pos, world_info_funcs)
-            new_pos = (animal.x, animal.y, animal.z)
-            if old_pos != new_pos:
-                self._needs_rebuild = True # Animal moved, so rebuild
-
+        """Méthode principale appelée à chaque tick de simulation."""
+        get_height = world_info_funcs.get("get_height")
+        self._manage_population(player_pos, get_height, world_info_funcs.get("get_biome"))
+        n = self.count
+        if n:
+            self._simulate(n, dt, player_pos, get_height)
+
+        # Retirer les animaux trop loin, puis les plus éloignés si le nombre maximal a été abaissé
         player_x, _, player_z = player_pos
-        max_dist = self.spawn_radius * 1.5
-        # Filter out animals that are too far, and mark for rebuild if any are removed
-        initial_animal_count = len(self.active_animals)
-        self.active_animals = [
-            animal for animal in self.active_animals
-            if math.hypot(animal.x - player_x, animal.z - player_z) < max_dist
-        ]
-        if len(self.active_animals) < initial_animal_count:
-            self._needs_rebuild = True # Animals were removed, so rebuild
-
-        if self._needs_rebuild:
-            self._rebuild_vertex_list()
+        distance = np.hypot(self.position[:n, 0] - player_x, self.position[:n, 2] - player_z)
+        keep = distance < self.spawn_radius * 1.5
+        excess = int(keep.sum()) - self.max_animals
+        if excess > 0:
+            keep[np.argsort(np.where(keep, distance, np.inf))[-excess - int((~keep).sum()):]] = False
+        if not keep.all():
+            self._remove(keep)
+
+    def _simulate(self, n, dt, player_pos, get_height):
+        position, velocity, params = self.position[:n], self.velocity[:n], self.params[:n]
+        timer, jump_timer, on_ground = self.timer[:n], self.jump_timer[:n], self.on_ground[:n]
+        self.previous[:n] = position
+        old_state = np.concatenate([position, velocity[:, [0, 2]]], axis=1)
+        prev_vy = velocity[:, 1].copy() # Sauteurs : détection de l'atterrissage
+
+        # La fuite modifie directement la vélocité et a la priorité
+        px, _, pz = player_pos
+        away_x, away_z = position[:, 0] - px, position[:, 2] - pz
+        distance = np.hypot(away_x, away_z)
+        fleeing = (distance < FLEE_DISTANCE) & (distance > 0)
+        if fleeing.any():
+            flee_speed = params['speed'][fleeing] * FLEE_SPEED / distance[fleeing]
+            velocity[fleeing, 0] = away_x[fleeing] * flee_speed
+            velocity[fleeing, 2] = away_z[fleeing] * flee_speed
+            timer[fleeing] = FLEE_PAUSE
+        # Sinon, mouvement normal
+        timer[~fleeing] -= dt
+        self._wander(np.flatnonzero(~fleeing & (timer <= 0)))
+
+        # Gravité (toujours appliquée) ; un animal porté par le sol arrête de tomber
+        ground = self.column_height[:n] + 1
+        supported = position[:, 1] < ground + SUPPORT_MARGIN
+        velocity[:, 1] = np.where(supported, np.maximum(velocity[:, 1], 0), velocity[:, 1] - GRAVITY * dt * params['gravity'])
+
+        # Déplacement horizontal, un axe après l'autre : une marche d'un bloc se monte, un mur fait rebondir
+        blocked = np.zeros(n, dtype=bool)
+        for axis in (0, 2):
+            target = position.copy()
+            target[:, axis] += velocity[:, axis] * dt
+            columns = np.floor(target[:, [0, 2]] + 0.5).astype(np.int64)
+            heights = self._column_heights(n, columns, get_height)
+            floor_y = np.floor(position[:, 1])
+            step = heights == floor_y # Obstacle d'un bloc : l'animal monte
+            wall = heights > floor_y
+            position[~wall, axis] = target[~wall, axis]
+            position[step, 1] += 1
+            velocity[wall, axis] *= -1
+            blocked |= wall
+            moved_column = ~wall
+            self.column[:n][moved_column] = columns[moved_column]
+            self.column_height[:n][moved_column] = heights[moved_column]
+
+        # Déplacement vertical : l'animal se pose sur le sol
+        ground = self.column_height[:n] + 1
+        new_y = position[:, 1] + velocity[:, 1] * dt
+        landed = new_y < ground
+        position[:, 1] = np.where(landed, ground, new_y)
+        velocity[landed, 1] = 0
+        self.timer[:n][blocked | landed] = 0 # Nouvelle direction au prochain tick
+
+        # Animaux aquatiques : rester sous la surface
+        above = position[:, 1] > params['max_y']
+        position[above, 1] = params['max_y'][above]
+        velocity[above & (velocity[:, 1] > 0), 1] = 0
+
+        # Sauteurs : détecter l'atterrissage, arrêter le mouvement horizontal
+        landing = (params['jump_strength'] > 0) & (prev_vy < 0) & (velocity[:, 1] == 0) & ~on_ground
+        on_ground[landing] = True
+        velocity[landing, 0] = 0
+        velocity[landing, 2] = 0
+        jump_timer -= dt
+
+        moved = (np.concatenate([position, velocity[:, [0, 2]]], axis=1) != old_state).any(axis=1)
+        # Un animal qui s'arrête doit être réécrit une dernière fois à sa position exacte
+        self.dirty |= bool(moved.any() or self.moved[:n].any())
+        self.moved[:n] = moved
+
+    def _wander(self, indices):
+        """Nouvelle direction aléatoire des animaux `indices`, selon le comportement de leur espèce."""
+        if not len(indices):
+            return
+        params = self.params[indices]
+        speed = params['speed']
+        random_x = self.rng.uniform(-1, 1, len(indices)) * speed
+        random_z = self.rng.uniform(-1, 1, len(indices)) * speed
+        velocity = self.velocity[indices]
+
+        # Marcheurs et nageurs : nouvelle direction horizontale, vélocité Y conservée (la gravité continue)
+        walkers = params['jump_strength'] == 0
+        velocity[walkers, 0] = random_x[walkers]
+        velocity[walkers, 2] = random_z[walkers]
+        swimmers = params['vertical_wander'] > 0
+        velocity[swimmers, 1] = self.rng.uniform(-1, 1, int(swimmers.sum())) * speed[swimmers] * params['vertical_wander'][swimmers]
+        bursts = self.rng.random(len(indices)) < params['burst_chance']
+        velocity[bursts, 1] = speed[bursts] * params['burst_speed'][bursts]
+
+        # Sauteurs : un saut s'ils sont au sol et que le délai est passé, sinon immobiles au sol
+        jumpers = ~walkers
+        grounded = jumpers & self.on_ground[indices]
+        jumps = grounded & (self.jump_timer[indices] <= 0)
+        velocity[jumps, 0] = random_x[jumps]
+        velocity[jumps, 2] = random_z[jumps]
+        velocity[jumps, 1] = params['jump_strength'][jumps]
+        velocity[grounded & ~jumps, 0] = 0
+        velocity[grounded & ~jumps, 2] = 0
+        self.jump_timer[indices[jumps]] = params['jump_cooldown'][jumps]
+        self.on_ground[indices[jumps]] = False
+
+        self.velocity[indices] = velocity
+        self.timer[indices] = self.rng.uniform(params['wander_min'], params['wander_max'])
+
+    def _column_heights(self, n, columns, get_height):
+        """Hauteur naturelle du terrain aux colonnes demandées : celle déjà connue si l'animal n'en change pas."""
+        heights = self.column_height[:n].copy()
+        changed = np.flatnonzero((columns != self.column[:n]).any(axis=1))
+        if len(changed):
+            # Peu d'animaux changent de colonne à chaque tick : un appel par colonne coûte moins qu'un lot NumPy
+            heights[changed] = [get_height(x, z) for x, z in columns[changed].tolist()]
+        return heights
+
+    def _remove(self, keep):
+        """Retire les animaux dont keep est False ; les autres gardent leur ordre (et sont réécrits)."""
+        kept = np.flatnonzero(keep)
+        for name in ('position', 'previous', 'velocity', 'timer', 'jump_timer', 'on_ground',
+                     'column', 'column_height', 'moved', 'params', 'appearance'):
+            array = getattr(self, name)
+            array[:len(kept)] = array[kept]
+        self.count = len(kept)
+        self.dirty = True
+
+    def interpolate(self, alpha):
+        """Réécrit les slots des animaux, à leur position entre les deux derniers ticks, si l'un d'eux a bougé."""
+        if not self.dirty:
+            return
+        self.dirty = bool(self.moved[:self.count].any()) # Ceux qui bougent sont réécrits à chaque frame
+        if self.count:
+            self.instances.write_block(0, self._instance_values(alpha))
 
     def _manage_population(self, player_pos, get_height_func, get_biome_func):
-        if len(self.active_animals) < self.max_animals:
+        if self.count < self.max_animals:
             self._spawn_animal(player_pos, get_height_func, get_biome_func)
 
     def _spawn_animal(self, player_pos, get_height_func, get_biome_func):
@@ -98,12 +287,26 @@ class Animals:
                 type_name = os.path.splitext(os.path.basename(animal_texture_path))[0]
                 # Utiliser BaseAnimal comme fallback si le type n'est pas dans la map
                 AnimalClass = self.animal_class_map.get(type_name, BaseAnimal)
-
-                new_animal = AnimalClass(x, h + 1, z, animal_texture_path)
-                self.active_animals.append(new_animal)
-                self._needs_rebuild = True # Mark for rebuild when a new animal is spawned
+                self._add_animal(AnimalClass, animal_texture_path, x, h, z)
                 return
 
+    def _add_animal(self, animal_class, animal_type, x, h, z):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.position[i] = self.previous[i] = (x, h + 1, z)
+        self.velocity[i] = 0
+        self.timer[i] = self.jump_timer[i] = 0
+        self.on_ground[i] = True
+        self.column[i] = (x, z)
+        self.column_height[i] = h
+        self.moved[i] = False
+        self.params[i] = species_params(animal_class)
+        layer, u_max, v_max = self.texture_layers.get(animal_type, (0, 0.0, 0.0))
+        self.appearance[i] = (animal_class.width, animal_class.height, layer, u_max, v_max)
+        self.count += 1
+        self.dirty = True
+
     def get_animal_type_for_biome(self, biome):
         if not self.textures:
             return None
@@ -113,97 +316,32 @@ class Animals:
             return None
         return self.r.choice(animals_for_biome)
 
-    def _rebuild_vertex_list(self):
-        # This method will build the combined mesh for all active animals
-        # Similar logic to World.build_sprite_mesh but for animals only
-        vertex_data_by_texture = {}
-
-        sprite_tex_coords = (0, 0, 1, 0, 1, 1, 0, 1)
-        sprite_indices_template = (0, 1, 2, 0, 2, 3)
-
-        y_offset = -0.5 # Animals are typically on the ground
-
-        for animal in self.active_animals:
-            x, y, z = animal.x, animal.y, animal.z
-            width = animal.width
-            height = animal.height
-
-            half_width = width / 2
-            sprite_quad_vertices = [(-half_width, 0.0, 0.0), (half_width, 0.0, 0.0), (half_width, height, 0.0), (-half_width, height, 0.0)]
-
-            # Logic for animals (single oriented plane)
-            velocity = animal.velocity
-            vx, _, vz = velocity
-
-            # Calculate rotation angle on Y axis
-            if abs(vx) > 0.01 or abs(vz) > 0.01:
-                angle = math.atan2(vx, vz)
-            else:
-                angle = 0 # No movement, no rotation
-
-            cos_a = math.cos(angle)
-            sin_a = math.sin(angle)
-
-            rotated_vertices = []
-            for v_x, v_y, v_z in sprite_quad_vertices:
-                # 2D rotation on XZ plane
-                rotated_x = v_x * cos_a
-                rotated_z = v_x * sin_a
-                # Add world position
-                rotated_vertices.append((x + rotated_x, y + v_y + y_offset, z + rotated_z))
-
-            # Get texture for the animal
-            texture = self.textures.get(animal.type) # Assuming animal.type maps to a texture
-            if texture is None: continue
-
-            if texture not in vertex_data_by_texture:
-                vertex_data_by_texture[texture] = {'positions': [], 'tex_coords': [], 'indices': [], 'colors': [], 'count': 0}
-
-            mesh_data = vertex_data_by_texture[texture]
-            vc = mesh_data['count']
-
-            for vert in rotated_vertices:
-                mesh_data['positions'].extend(vert)
-
-            mesh_data['tex_coords'].extend(sprite_tex_coords)
-            mesh_data['colors'].extend((1.0, 1.0, 1.0) * 4)
-            mesh_data['indices'].extend((vc + i for i in sprite_indices_template))
-            mesh_data['count'] += 4
-
-        # Clear previous batches
-        for texture_key in list(self.animal_batches.keys()): # Iterate over a copy of keys
-            batch = self.animal_batches.pop(texture_key) # Remove and get the batch
-            # Pyglet batches don't have a direct delete method, but their vertex lists do.
-            # If the batch contains vertex lists, they should be deleted.
-            # For simplicity, we'll rely on Python's garbage collection for the batch object itself.
-            # However, if vertex lists are directly managed, they need explicit deletion.
-            # Given how pyglet.graphics.Batch works, deleting the batch itself might not free GL resources.
-            # The vertex_list_indexed call returns a VertexList object. We need to store and delete those.
-            # Let's assume for now that replacing the batch will eventually free resources.
-            # A more robust solution would involve tracking the VertexList objects created within the batch.
-            pass # No explicit deletion needed for the batch object itself
-
-        # Create new batches
-        for texture, mesh_data in vertex_data_by_texture.items():
-            if not mesh_data['indices']: continue
-
-            # Create a new batch for this texture
-            batch = pyglet.graphics.Batch()
-            self.program.vertex_list_indexed(
-                mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, None,
-                position=('f', mesh_data['positions']),
-                tex_coords=('f', mesh_data['tex_coords']),
-                colors=('f', mesh_data['colors'])
-            )
-            self.animal_batches[texture] = batch # Store the batch keyed by texture
-
-        self._needs_rebuild = False # Reset the flag
-
-    def draw(self):
-        # Iterate through the animal_batches and draw each one
-        for texture, batch in self.animal_batches.items():
-            if batch:
-                pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0)
-                pyglet.gl.glBindTexture(texture.target, texture.id)
-                self.program['our_texture'] = 0
-                batch.draw()
+    def _instance_values(self, alpha=1.0):
+        """Attributs d'instance des animaux actifs, (count, FLOATS_PER_INSTANCE) : position (interpolée), orientation, taille et couche de texture."""
+        n = self.count
+        values = np.empty((n, FLOATS_PER_INSTANCE), dtype=np.float32)
+        values[:, :3] = self.previous[:n] + (self.position[:n] - self.previous[:n]) * alpha
+        # Rotation sur l'axe Y selon la direction de déplacement (calculée dans le vertex shader)
+        vx, vz = self.velocity[:n, 0], self.velocity[:n, 2]
+        values[:, 3] = np.where((np.abs(vx) > 0.01) | (np.abs(vz) > 0.01), np.arctan2(vx, vz), 0.0)
+        values[:, 4:] = self.appearance[:n]
+        return values
+
+    def draw(self, projection, view, fog_color, fog_start, fog_end):
+        if not self.program or not self.texture_array or not self.count:
+            return
+        self.instances.upload()
+
+        render_state.use_program(self.program)
+        render_state.set_uniform(self.program, 'projection', projection)
+        render_state.set_uniform(self.program, 'view', view)
+        render_state.set_uniform(self.program, 'fog_color', fog_color)
+        render_state.set_uniform(self.program, 'fog_start', fog_start)
+        render_state.set_uniform(self.program, 'fog_end', fog_end)
+        render_state.set_uniform(self.program, 'y_offset', -0.5) # Animals are typically on the ground
+        render_state.set_uniform(self.program, 'billboard', False)
+
+        render_state.bind_texture(self.texture_array.target, self.texture_array.id)
+        render_state.set_uniform(self.program, 'our_texture', 0)
+
+        self.instances.draw(self.count)
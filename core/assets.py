@@ -0,0 +1,60 @@
+import os
+import hashlib
+
+# Inventaire des assets, sans pyglet : partagé par core/textures.py, build_assets.py et la génération (worldgen)
+
+ASSETS_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "assets"))
+
+# Sorties de build_assets.py : manifeste JSON + pack binaire des TextureArray (tous les niveaux de mipmap)
+BUILD_PATH = os.path.join(ASSETS_PATH, "build")
+BUILD_MANIFEST_PATH = os.path.join(BUILD_PATH, "manifest.json")
+BUILD_PACK_PATH = os.path.join(BUILD_PATH, "textures.bin")
+BUILD_VERSION = 2 # 2 : seules les ARRAY_CATEGORIES sont dans le pack
+# Catégories dessinées depuis leur TextureArray (les shaders instanciés) : seules celles-ci sont construites par
+# build_assets.py et envoyées en TextureArray, sans textures 2D. Blocs et sprites restent des textures 2D par nom,
+# décodées depuis les PNG (ou le cache disque de core/textures.py).
+ARRAY_CATEGORIES = ("animal",)
+
+
+def scan_assets():
+    """Liste (catégorie, clé, chemin) pour tous les PNG : généraux, sprites/<biome>, annimals/<biome>."""
+    entries = []
+    for filename in sorted(os.listdir(ASSETS_PATH)):
+        if filename.endswith(".png"):
+            entries.append(("general", os.path.splitext(filename)[0], os.path.join(ASSETS_PATH, filename)))
+
+    for category, directory in (("sprite", "sprites"), ("animal", "annimals")):
+        category_path = os.path.join(ASSETS_PATH, directory)
+        if not os.path.exists(category_path):
+            continue
+        for biome_dir in sorted(os.listdir(category_path)):
+            full_biome_path = os.path.join(category_path, biome_dir)
+            if os.path.isdir(full_biome_path):
+                for filename in sorted(os.listdir(full_biome_path)):
+                    if filename.endswith(".png"):
+                        name = os.path.splitext(filename)[0]
+                        entries.append((category, f"{biome_dir}/{name}", os.path.join(full_biome_path, filename)))
+    return entries
+
+
+def source_key(entries):
+    """Empreinte des assets sources : chemins, dates de modification et tailles."""
+    digest = hashlib.sha1()
+    for category, key, path in entries:
+        stat = os.stat(path)
+        digest.update(f"{category}:{key}:{stat.st_mtime_ns}:{stat.st_size}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def biome_map(keys):
+    """Regroupe des clés "<biome>/<nom>" par biome, en gardant leur ordre."""
+    biomes = {}
+    for key in keys:
+        if "/" in key:
+            biomes.setdefault(key.split("/", 1)[0], []).append(key)
+    return biomes
+
+
+def sprite_biome_map():
+    """Clés de sprites par biome, lues depuis les noms de fichiers (les mêmes que Textures.get_biome_textures)."""
+    return biome_map(key for category, key, path in scan_assets() if category == "sprite")
@@ -0,0 +1,92 @@
+from array import array
+
+# Ordre des faces, partagé par les tables de textures et le mesher
+FACES = ["front", "back", "left", "right", "top", "bottom"]
+FACE_COUNT = len(FACES)
+
+AIR = 0
+
+# Biomes dont les arbres ont un feuillage propre ("<biome>/leaves", texture de sprite)
+LEAVES_BIOMES = ["forest", "taiga", "jungle", "plains", "savanna"]
+
+
+class BlockRegistry:
+    """
+    Identifiants entiers des blocs et tables plates indexées par identifiant.
+    Les chemins chauds (génération, mesher, physique) lisent ces tables au lieu de manipuler des chaînes ;
+    le nom ne sert qu'à l'affichage et au chargement des textures.
+    """
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.layer_names = [] # couche -> nom de texture (résolue par core/textures.py au moment du dessin)
+        self._layers = {}
+        self.face_layers = array('i') # id * FACE_COUNT + face -> couche de texture
+        self.solid = array('b')
+        self.transparent = array('b')
+        self.leaves = array('b')
+        self.register("air", solid=False, transparent=True)
+
+    def _layer(self, texture_name):
+        layer = self._layers.get(texture_name)
+        if layer is None:
+            layer = self._layers[texture_name] = len(self.layer_names)
+            self.layer_names.append(texture_name)
+        return layer
+
+    def register(self, name, texture=None, faces=None, solid=True, transparent=False, leaves=False):
+        """
+        Enregistre un bloc et retourne son identifiant.
+        `texture` (par défaut le nom du bloc) est utilisée sur toutes les faces, sauf celles données dans `faces`.
+        """
+        if name in self.ids:
+            return self.ids[name]
+        block_id = len(self.names)
+        self.names.append(name)
+        self.ids[name] = block_id
+        faces = faces or {}
+        for face in FACES:
+            self.face_layers.append(self._layer(faces.get(face, texture or name)))
+        self.solid.append(solid)
+        self.transparent.append(transparent)
+        self.leaves.append(leaves)
+        return block_id
+
+    def id(self, name):
+        return self.ids[name]
+
+    def name(self, block_id):
+        return self.names[block_id]
+
+    def face_layer(self, block_id, face):
+        return self.face_layers[block_id * FACE_COUNT + face]
+
+
+def _create_registry():
+    registry = BlockRegistry()
+    for name in ["tundra", "snow", "taiga", "forest", "plains", "savanna", "desert", "jungle",
+                 "grass", "dirt", "stone", "sea_floor", "sea_floor2", "sand", "log", "cactus"]:
+        registry.register(name)
+    registry.register("leaves", transparent=True, leaves=True)
+    for biome in LEAVES_BIOMES:
+        registry.register(f"{biome}/leaves", transparent=True, leaves=True)
+    return registry
+
+
+# Registre partagé : les identifiants sont stables pour une version donnée du jeu
+block_registry = _create_registry()
+
+# Identifiants utilisés directement par la génération et la physique
+STONE = block_registry.id("stone")
+DIRT = block_registry.id("dirt")
+SEA_FLOOR = block_registry.id("sea_floor")
+LOG = block_registry.id("log")
+CACTUS = block_registry.id("cactus")
+
+# Bloc de surface et bloc de sous-sol par biome (indexés par nom de biome, résolus une seule fois)
+BIOME_TOP_BLOCKS = {biome: block_registry.id(biome) for biome in
+                    ["tundra", "snow", "taiga", "forest", "plains", "savanna", "desert", "jungle"]}
+BIOME_BASE_BLOCKS = {biome: (block_registry.id(biome) if biome in ("desert", "savanna") else
+                             STONE if biome in ("tundra", "snow", "taiga") else DIRT)
+                     for biome in BIOME_TOP_BLOCKS}
+BIOME_LEAVES_BLOCKS = {biome: block_registry.id(f"{biome}/leaves") for biome in LEAVES_BIOMES}
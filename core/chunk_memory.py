@@ -0,0 +1,243 @@
+import time
+import zlib
+import threading
+import numpy as np
+from core.memory import LRUCache, ENTRY_BYTES
+from core.jobs import Job, GENERATE
+from config import CHUNK_SIZE, CHUNK_RESIDENT_RADIUS, CHUNK_IDLE_SECONDS, CHUNK_COMPRESS_PER_FRAME
+
+# Mémoire des chunks en deux niveaux : les chunks proches (ou utilisés récemment) gardent leurs blocs en dict
+# (World.blocks et chunk['blocks']), les autres ne gardent qu'une version compressée, décompressée dès
+# qu'une modification, un raycast, la physique ou un remaillage en a besoin. Sous la pression du budget mémoire
+# (core/memory.py), la version compressée d'un chunk non modifié peut être abandonnée : il est alors régénéré par
+# une tâche de fond (le thread principal ne génère jamais de chunk ; en attendant, le chunk est vu comme non chargé).
+
+Y_OFFSET = 1 << 15 # y stocké en uint16
+SCAN_INTERVAL = 0.5 # Secondes entre deux recherches de chunks inactifs (coûteuses à grande distance de rendu)
+
+
+def encode_cells(cx, cz, cells):
+    """
+    { (x, y, z): valeur entière } d'un chunk -> octets. Les positions sont triées par colonne puis par y,
+    et chaque suite de y consécutifs de même valeur devient une plage (palette + RLE), le tout passé à zlib.
+    """
+    if not cells:
+        return b""
+    positions = np.array(list(cells.keys()), dtype=np.int64)
+    values = np.array(list(cells.values()), dtype=np.int64)
+    column = (positions[:, 0] - cx * CHUNK_SIZE) * CHUNK_SIZE + (positions[:, 2] - cz * CHUNK_SIZE)
+    y = positions[:, 1] + Y_OFFSET
+    order = np.lexsort((y, column))
+    column, y, values = column[order], y[order], values[order]
+
+    palette, indices = np.unique(values, return_inverse=True)
+    starts = np.ones(len(y), dtype=bool)
+    starts[1:] = (column[1:] != column[:-1]) | (y[1:] != y[:-1] + 1) | (indices[1:] != indices[:-1])
+    start_indices = np.flatnonzero(starts)
+    lengths = np.diff(np.append(start_indices, len(y)))
+
+    arrays = (
+        palette.astype(np.uint16),
+        column[start_indices].astype(np.uint16),
+        y[start_indices].astype(np.uint16),
+        lengths.astype(np.uint16),
+        indices[start_indices].astype(np.uint16),
+    )
+    header = np.array([len(palette), len(start_indices)], dtype=np.uint32)
+    return zlib.compress(header.tobytes() + b"".join(array.tobytes() for array in arrays), 1)
+
+
+def decode_cells(cx, cz, data):
+    """Inverse de encode_cells."""
+    if not data:
+        return {}
+    payload = zlib.decompress(data)
+    palette_size, run_count = np.frombuffer(payload, dtype=np.uint32, count=2)
+    offset = 8
+    palette = np.frombuffer(payload, dtype=np.uint16, count=palette_size, offset=offset)
+    offset += palette.nbytes
+    runs = np.frombuffer(payload, dtype=np.uint16, count=4 * run_count, offset=offset).reshape(4, run_count)
+    column, y, lengths, indices = (runs[i].astype(np.int64) for i in range(4))
+
+    # Déroulement des plages : position de chaque cellule dans sa plage
+    total = int(lengths.sum())
+    run_of_cell = np.repeat(np.arange(run_count), lengths)
+    step = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    x = cx * CHUNK_SIZE + column[run_of_cell] // CHUNK_SIZE
+    z = cz * CHUNK_SIZE + column[run_of_cell] % CHUNK_SIZE
+    ys = y[run_of_cell] + step - Y_OFFSET
+    positions = np.stack([x, ys, z], axis=1).tolist()
+    return dict(zip(map(tuple, positions), palette[indices[run_of_cell]].tolist()))
+
+
+class ChunkMemory:
+    """
+    Compression des chunks inactifs d'un World : hors de CHUNK_RESIDENT_RADIUS chunks du joueur et sans accès
+    depuis CHUNK_IDLE_SECONDS, les blocs et le masque de grottes d'un chunk rendu sont retirés des dicts du monde
+    et gardés compressés (son maillage reste affiché). Le verrou protège ces transitions contre le worker de
+    génération, qui le tient pendant tout le maillage d'un chunk pour que ses voisins restent résidents.
+    """
+    def __init__(self, world):
+        self.world = world
+        # (cx, cz) -> (blocs compressés, masque de grottes compressé) ; les chunks modifiés ne sont jamais évincés
+        self.compressed = LRUCache("compressed_chunks", lambda key, entry: len(entry[0]) + len(entry[1]) + ENTRY_BYTES,
+                                   priority=3, can_evict=lambda key: key not in self.edited, on_evict=self._evicted)
+        self.edited = set() # Chunks modifiés par le joueur : leur contenu ne se régénère pas
+        self.dropped = set() # Chunks sans blocs en mémoire, ni compressés : régénérés au prochain accès
+        self.regenerating = {} # (cx, cz) -> tâche GENERATE qui régénère un chunk abandonné
+        self.last_access = {} # (cx, cz) -> time.monotonic() du dernier accès explicite
+        self.lock = threading.RLock()
+        self.pending = [] # Chunks inactifs trouvés par le dernier parcours, compressés au fil des frames
+        self.next_scan = 0.0
+        self.compressions = 0
+        self.decompressions = 0
+        self.regenerations = 0
+
+    def touch(self, cx, cz, wait=True):
+        """
+        Marque le chunk comme utilisé et rend ses blocs résidents ; True s'il a fallu les décompresser ou régénérer.
+        Sans wait (thread principal), un chunk abandonné n'est pas régénéré sur place : une tâche de fond le
+        régénère et False est retourné, le chunk restant non chargé jusque-là.
+        """
+        key = (cx, cz)
+        self.last_access[key] = time.monotonic()
+        if key not in self.compressed and key not in self.dropped:
+            return False
+        with self.lock:
+            if key in self.compressed:
+                return self._decompress(cx, cz)
+            if not wait:
+                self.queue_regeneration(cx, cz)
+                return False
+            return self._regenerate(cx, cz)
+
+    def has_inactive(self):
+        """True si des chunks chargés n'ont pas leurs blocs en mémoire (compressés ou abandonnés)."""
+        return bool(self.compressed) or bool(self.dropped)
+
+    def touch_area(self, cx, cz):
+        """Chunk et ses 4 voisins : ce qu'un maillage ou une modification de bloc peut lire."""
+        for ncx, ncz in ((cx, cz), (cx - 1, cz), (cx + 1, cz), (cx, cz - 1), (cx, cz + 1)):
+            self.touch(ncx, ncz)
+
+    def touch_position(self, pos):
+        """
+        Thread principal : décompresse le chunk contenant pos s'il l'était, ou demande sa régénération s'il a été
+        abandonné ; True si des blocs viennent d'être rendus visibles.
+        """
+        return self.touch(int(pos[0] // CHUNK_SIZE), int(pos[2] // CHUNK_SIZE), wait=False)
+
+    def _decompress(self, cx, cz):
+        entry = self.compressed.pop((cx, cz), None)
+        if entry is None:
+            return False # Décompressé entre-temps par un autre thread
+        chunk_data = self.world.chunks.get((cx, cz))
+        if chunk_data is None:
+            return False # Déchargé entre-temps
+        blocks_data, cave_data = entry
+        blocks = decode_cells(cx, cz, blocks_data)
+        self.world.blocks.update(blocks)
+        chunk_data['blocks'] = blocks
+        self.world.cave_masks[(cx, cz)] = {pos: bool(value) for pos, value in decode_cells(cx, cz, cave_data).items()}
+        self.decompressions += 1
+        return True
+
+    def _evicted(self, key, entry):
+        if key in self.world.chunks:
+            self.dropped.add(key)
+
+    def queue_regeneration(self, cx, cz, priority=0):
+        """Régénère un chunk abandonné dans une tâche de fond (une seule tâche par chunk)."""
+        key = (cx, cz)
+        if key in self.regenerating or key not in self.dropped:
+            return
+        self.regenerating[key] = self.world.jobs.submit(Job(GENERATE, lambda: self._regenerate(cx, cz), priority))
+
+    def _regenerate(self, cx, cz):
+        """Worker (ou maillage) : blocs d'un chunk abandonné, générés hors verrou puis installés sous le verrou."""
+        chunk_data = self.world.chunks.get((cx, cz))
+        if chunk_data is None or 'blocks' in chunk_data:
+            return False
+        chunk = self.world.load_chunk(cx, cz)
+        with self.lock:
+            self.regenerating.pop((cx, cz), None)
+            # Déchargé, rechargé ou déjà régénéré pendant la génération
+            if (cx, cz) not in self.dropped or self.world.chunks.get((cx, cz)) is not chunk_data:
+                return False
+            self.dropped.discard((cx, cz))
+            self.world.blocks.update(chunk.blocks)
+            chunk_data['blocks'] = chunk.blocks
+            self.world.cave_masks[(cx, cz)] = chunk.cave_mask
+            self.regenerations += 1
+        return True
+
+    def _compress(self, cx, cz):
+        chunk_data = self.world.chunks.get((cx, cz))
+        if chunk_data is None or chunk_data.get('status') != 'rendered' or 'blocks' not in chunk_data:
+            return False
+        blocks = chunk_data['blocks']
+        cave_mask = self.world.cave_masks.get((cx, cz), {})
+        self.compressed[(cx, cz)] = (encode_cells(cx, cz, blocks), encode_cells(cx, cz, cave_mask))
+        world_blocks = self.world.blocks
+        for pos in blocks:
+            world_blocks.pop(pos, None)
+        del chunk_data['blocks']
+        self.world.cave_masks.pop((cx, cz), None)
+        self.compressions += 1
+        return True
+
+    def update(self, player_chunk_x, player_chunk_z):
+        """
+        Compresse au plus CHUNK_COMPRESS_PER_FRAME chunks inactifs, les plus éloignés du joueur d'abord, et demande
+        la régénération des chunks abandonnés dont le joueur s'approche, avant que la physique n'en ait besoin.
+        """
+        for cx, cz in list(self.dropped):
+            if max(abs(cx - player_chunk_x), abs(cz - player_chunk_z)) <= CHUNK_RESIDENT_RADIUS:
+                self.queue_regeneration(cx, cz)
+
+        now = time.monotonic()
+        if not self.pending and now >= self.next_scan:
+            self.next_scan = now + SCAN_INTERVAL
+            self.pending = self._idle_chunks(player_chunk_x, player_chunk_z, now)
+        if not self.pending:
+            return
+        # Un worker maille un chunk en tenant le verrou : la compression attend la frame suivante
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            for _ in range(min(CHUNK_COMPRESS_PER_FRAME, len(self.pending))):
+                cx, cz = self.pending.pop()
+                # Le joueur a pu s'approcher, ou le chunk servir, depuis le parcours
+                if (max(abs(cx - player_chunk_x), abs(cz - player_chunk_z)) > CHUNK_RESIDENT_RADIUS
+                        and now - self.last_access.get((cx, cz), now) >= CHUNK_IDLE_SECONDS):
+                    self._compress(cx, cz)
+        finally:
+            self.lock.release()
+
+    def _idle_chunks(self, player_chunk_x, player_chunk_z, now):
+        """Chunks compressibles, le plus éloigné en dernier (pris en premier par pending.pop())."""
+        candidates = []
+        for (cx, cz), chunk_data in list(self.world.chunks.items()):
+            distance = max(abs(cx - player_chunk_x), abs(cz - player_chunk_z))
+            if distance <= CHUNK_RESIDENT_RADIUS or 'blocks' not in chunk_data or chunk_data.get('status') != 'rendered':
+                continue
+            if now - self.last_access.setdefault((cx, cz), now) >= CHUNK_IDLE_SECONDS:
+                candidates.append((distance, cx, cz))
+        candidates.sort()
+        return [(cx, cz) for distance, cx, cz in candidates]
+
+    def forget(self, cx, cz):
+        """Chunk déchargé par le monde : sa version compressée n'a plus d'utilité."""
+        self.compressed.pop((cx, cz), None)
+        self.last_access.pop((cx, cz), None)
+        self.edited.discard((cx, cz))
+        self.dropped.discard((cx, cz))
+        job = self.regenerating.pop((cx, cz), None)
+        if job is not None:
+            job.cancel()
+
+    def stats(self):
+        compressed_bytes = sum(len(blocks) + len(caves) for blocks, caves in list(self.compressed.values()))
+        return {"compressed_chunks": len(self.compressed), "compressed_bytes": compressed_bytes,
+                "compressions": self.compressions, "decompressions": self.decompressions,
+                "dropped_chunks": len(self.dropped), "regenerations": self.regenerations}
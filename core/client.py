@@ -2,17 +2,21 @@ import socket
 import json
 import threading
 import time # Added for time.time() and time.sleep()
-from core.player_sprite import PlayerSprite
+from core.player_sprite import PlayerSprite, PlayerSpriteRenderer
 
 class Client:
-    def __init__(self, host, port, program=None): # Added program
+    def __init__(self, host, port):
         self.host = host
         self.port = port
         self.socket = None
-        self.other_players = {} # To store other players' sprites
+        self.other_players = {} # player_id -> PlayerSprite (état seulement, rempli par le thread réseau)
         self._running = False # Flag to control the receiver thread
         self._receive_thread = None # To hold the receiver thread object
-        self.program = program # Store the program
+        self.renderer = None # Créé sur le thread GL via set_textures()
+
+    def set_textures(self, textures):
+        """Crée le renderer des joueurs distants à partir du cache de textures partagé."""
+        self.renderer = PlayerSpriteRenderer(textures)
 
     def connect(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -128,28 +132,20 @@ class Client:
                                 rotation = player_info["rotation"]
 
                                 if player_id not in self.other_players:
-                                    # Pass self.program to PlayerSprite constructor
-                                    self.other_players[player_id] = PlayerSprite(position, rotation, program=self.program)
+                                    self.other_players[player_id] = PlayerSprite(position, rotation)
                                 else:
-                                    # PlayerSprite.update now expects view_matrix, will be passed from draw_other_players
                                     self.other_players[player_id].update(position, rotation)
                         elif parsed_data.get("type") == "player_disconnect" and "player_id" in parsed_data:
                             player_id = parsed_data["player_id"]
-                            if player_id in self.other_players:
-                                # When a player disconnects, delete their sprite's vertex list
-                                if self.other_players[player_id].vertex_list:
-                                    self.other_players[player_id].vertex_list.delete()
-                                del self.other_players[player_id]
+                            self.other_players.pop(player_id, None)
                         # Handle "all_player_data" type for initial sync
                         elif parsed_data.get("type") == "all_player_data" and "players" in parsed_data:
                             for player_id, player_info in parsed_data["players"].items():
                                 position = player_info["position"]
                                 rotation = player_info["rotation"]
                                 if player_id not in self.other_players:
-                                    # Pass self.program to PlayerSprite constructor
-                                    self.other_players[player_id] = PlayerSprite(position, rotation, program=self.program)
+                                    self.other_players[player_id] = PlayerSprite(position, rotation)
                                 else:
-                                    # PlayerSprite.update now expects view_matrix, will be passed from draw_other_players
                                     self.other_players[player_id].update(position, rotation)
                     except json.JSONDecodeError:
                         print(f"Received malformed JSON: {json_str}")
@@ -175,7 +171,9 @@ class Client:
         # It's kept for compatibility with existing calls in ui/window.py for now.
         pass
 
-    def draw_other_players(self, view_matrix): # Added view_matrix parameter
-        for player_sprite in self.other_players.values():
-            player_sprite.update(player_sprite.position, player_sprite.rotation, view_matrix) # Update with current position/rotation and view_matrix
-            player_sprite.draw()
+    def draw_other_players(self, projection, view, fog_color, fog_start, fog_end):
+        if not self.renderer:
+            return
+        # Copie : le thread réseau peut modifier le dictionnaire pendant le dessin
+        player_sprites = list(self.other_players.values())
+        self.renderer.draw(player_sprites, projection, view, fog_color, fog_start, fog_end)
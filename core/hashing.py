@@ -0,0 +1,60 @@
+import random
+import numpy as np
+from config import LEGACY_WORLD_HASH
+
+# Hash entier sans état (finaliseur splitmix64) pour les décisions par colonne : arbres, sprites, sélection.
+# Remplace random.Random((x * 73856093) ^ (z * 19349663) ^ seed), dont l'initialisation du Mersenne Twister
+# coûtait plus cher que tout le reste de la décision. LEGACY_WORLD_HASH garde l'ancien placement.
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+MASK32 = 0xFFFFFFFF
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX1 = 0xBF58476D1CE4E5B9
+MIX2 = 0x94D049BB133111EB
+TO_UNIT = 1.0 / (1 << 53)
+
+
+def splitmix64(value):
+    value = (value + GOLDEN_GAMMA) & MASK64
+    value = ((value ^ (value >> 30)) * MIX1) & MASK64
+    value = ((value ^ (value >> 27)) * MIX2) & MASK64
+    return value ^ (value >> 31)
+
+
+def hash_u64(x, z, seed):
+    """Hash 64 bits de la colonne (x, z) pour une seed donnée."""
+    key = (x & MASK32) | ((z & MASK32) << 32)
+    return splitmix64(splitmix64(seed & MASK64) ^ key)
+
+
+def hash01(x, z, seed):
+    """Valeur déterministe dans [0, 1) pour la colonne (x, z)."""
+    if LEGACY_WORLD_HASH:
+        return random.Random((x * 73856093) ^ (z * 19349663) ^ seed).random()
+    return (hash_u64(x, z, seed) >> 11) * TO_UNIT
+
+
+def _splitmix64_array(values):
+    values = values + np.uint64(GOLDEN_GAMMA)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(MIX1)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(MIX2)
+    return values ^ (values >> np.uint64(31))
+
+
+def hash01_batch(xs, zs, seed):
+    """Version NumPy de hash01 : mêmes valeurs, pour des tableaux de coordonnées de même forme."""
+    xs = np.asarray(xs, dtype=np.int64)
+    zs = np.asarray(zs, dtype=np.int64)
+    if LEGACY_WORLD_HASH:
+        return np.array([hash01(x, z, seed) for x, z in zip(xs.ravel().tolist(), zs.ravel().tolist())]).reshape(xs.shape)
+    mask = np.uint64(MASK32)
+    keys = (xs.astype(np.uint64) & mask) | ((zs.astype(np.uint64) & mask) << np.uint64(32))
+    seed_mix = np.uint64(splitmix64(seed & MASK64))
+    return (_splitmix64_array(keys ^ seed_mix) >> np.uint64(11)).astype(np.float64) * TO_UNIT
+
+
+def randint(x, z, seed, low, high):
+    """Entier déterministe dans [low, high] pour la colonne (x, z), comme random.randint."""
+    if LEGACY_WORLD_HASH:
+        return random.Random((x * 73856093) ^ (z * 19349663) ^ seed).randint(low, high)
+    return low + int(hash01(x, z, seed) * (high - low + 1))
@@ -0,0 +1,194 @@
+import ctypes
+from array import array
+import numpy as np
+import pyglet
+from pyglet.graphics import shader
+
+# Layout d'une instance (en floats) :
+#   pos_yaw    : x, y, z, yaw
+#   size_layer : width, height, layer
+#   uv_max     : u_max, v_max (étendue de l'image dans la couche du TextureArray)
+FLOATS_PER_INSTANCE = 9
+_FLOAT_SIZE = ctypes.sizeof(pyglet.gl.GLfloat)
+_STRIDE = FLOATS_PER_INSTANCE * _FLOAT_SIZE
+
+# Quad unitaire partagé par toutes les instances (triangle strip)
+_QUAD_CORNERS = (-0.5, 0.0, 0.5, 0.0, -0.5, 1.0, 0.5, 1.0)
+
+
+def create_instanced_program():
+    vertex_shader_source = '''
+    #version 330 core
+    layout (location = 0) in vec2 corner;
+    layout (location = 1) in vec4 instance_pos_yaw;
+    layout (location = 2) in vec3 instance_size_layer;
+    layout (location = 3) in vec2 instance_uv_max;
+
+    out vec3 new_tex_coords;
+    out vec3 world_pos;
+
+    uniform mat4 projection;
+    uniform mat4 view;
+    uniform float y_offset;
+    uniform bool billboard; // true : le quad fait face à la caméra, false : orienté par le yaw
+
+    void main()
+    {
+        float local_x = corner.x * instance_size_layer.x;
+        float local_y = corner.y * instance_size_layer.y;
+        vec3 offset;
+        if (billboard) {
+            // Vecteurs droite/haut de la caméra extraits de la matrice de vue
+            vec3 right = vec3(view[0][0], view[1][0], view[2][0]);
+            vec3 up = vec3(view[0][1], view[1][1], view[2][1]);
+            offset = right * local_x + up * local_y + vec3(0.0, y_offset, 0.0);
+        } else {
+            // Orientation calculée ici : rotation du quad autour de l'axe Y
+            float yaw = instance_pos_yaw.w;
+            offset = vec3(local_x * cos(yaw), local_y + y_offset, local_x * sin(yaw));
+        }
+
+        world_pos = instance_pos_yaw.xyz + offset;
+        gl_Position = projection * view * vec4(world_pos, 1.0);
+
+        vec2 uv = vec2(corner.x + 0.5, corner.y);
+        new_tex_coords = vec3(uv * instance_uv_max, instance_size_layer.z);
+    }
+    '''
+    fragment_shader_source = '''
+    #version 330 core
+    in vec3 new_tex_coords;
+    in vec3 world_pos;
+
+    out vec4 out_color;
+
+    uniform sampler2DArray our_texture;
+    uniform vec3 fog_color;
+    uniform float fog_start;
+    uniform float fog_end;
+    uniform mat4 view;
+
+    void main()
+    {
+        out_color = texture(our_texture, new_tex_coords);
+        if(out_color.a < 0.1)
+            discard;
+
+        vec4 view_pos = view * vec4(world_pos, 1.0);
+        float dist = length(view_pos.xyz);
+        float fog_factor = clamp((fog_end - dist) / (fog_end - fog_start), 0.0, 1.0);
+
+        out_color = mix(vec4(fog_color, 1.0), out_color, fog_factor);
+    }
+    '''
+    try:
+        vert_shader = shader.Shader(vertex_shader_source, 'vertex')
+        frag_shader = shader.Shader(fragment_shader_source, 'fragment')
+        return shader.ShaderProgram(vert_shader, frag_shader)
+    except shader.ShaderException as e:
+        print(e)
+        return None
+
+
+class InstanceBuffer:
+    """
+    Buffer d'attributs par instance, mis à jour sur place.
+    Les écritures marquent une plage sale ; upload() l'envoie au GPU en un seul glBufferSubData.
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.data = array('f', bytes(capacity * _STRIDE))
+        self._dirty_start = None
+        self._dirty_end = None
+        self._needs_realloc = True
+
+        self.vao = pyglet.gl.GLuint()
+        pyglet.gl.glGenVertexArrays(1, self.vao)
+        self.quad_vbo = pyglet.gl.GLuint()
+        pyglet.gl.glGenBuffers(1, self.quad_vbo)
+        self.instance_vbo = pyglet.gl.GLuint()
+        pyglet.gl.glGenBuffers(1, self.instance_vbo)
+
+        pyglet.gl.glBindVertexArray(self.vao)
+
+        # Sommets du quad (par sommet)
+        quad = (pyglet.gl.GLfloat * len(_QUAD_CORNERS))(*_QUAD_CORNERS)
+        pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, self.quad_vbo)
+        pyglet.gl.glBufferData(pyglet.gl.GL_ARRAY_BUFFER, ctypes.sizeof(quad), quad, pyglet.gl.GL_STATIC_DRAW)
+        pyglet.gl.glEnableVertexAttribArray(0)
+        pyglet.gl.glVertexAttribPointer(0, 2, pyglet.gl.GL_FLOAT, pyglet.gl.GL_FALSE, 0, 0)
+
+        # Attributs par instance
+        pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, self.instance_vbo)
+        offset = 0
+        for location, size in ((1, 4), (2, 3), (3, 2)):
+            pyglet.gl.glEnableVertexAttribArray(location)
+            pyglet.gl.glVertexAttribPointer(location, size, pyglet.gl.GL_FLOAT, pyglet.gl.GL_FALSE, _STRIDE, offset)
+            pyglet.gl.glVertexAttribDivisor(location, 1)
+            offset += size * _FLOAT_SIZE
+
+        pyglet.gl.glBindVertexArray(0)
+        pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, 0)
+
+    def _mark_dirty(self, start, end):
+        if self._dirty_start is None:
+            self._dirty_start, self._dirty_end = start, end
+        else:
+            self._dirty_start = min(self._dirty_start, start)
+            self._dirty_end = max(self._dirty_end, end)
+
+    def reserve(self, count):
+        """Agrandit le buffer (par doublement) pour contenir au moins `count` instances."""
+        if count <= self.capacity:
+            return
+        new_capacity = self.capacity
+        while new_capacity < count:
+            new_capacity *= 2
+        self.data.extend(array('f', bytes((new_capacity - self.capacity) * _STRIDE)))
+        self.capacity = new_capacity
+        self._needs_realloc = True
+
+    def write(self, slot, values):
+        """Écrit les FLOATS_PER_INSTANCE valeurs d'une instance dans son slot."""
+        self.reserve(slot + 1)
+        start = slot * FLOATS_PER_INSTANCE
+        self.data[start:start + FLOATS_PER_INSTANCE] = array('f', values)
+        self._mark_dirty(start, start + FLOATS_PER_INSTANCE)
+
+    def write_block(self, first_slot, values):
+        """Écrit les instances consécutives à partir de `first_slot` : tableau NumPy (n, FLOATS_PER_INSTANCE)."""
+        self.reserve(first_slot + len(values))
+        start = first_slot * FLOATS_PER_INSTANCE
+        end = start + len(values) * FLOATS_PER_INSTANCE
+        # Vue temporaire : reserve() peut réallouer self.data
+        np.frombuffer(self.data, dtype=np.float32)[start:end] = values.reshape(-1)
+        self._mark_dirty(start, end)
+
+    def upload(self):
+        """Envoie les données modifiées au GPU (un seul appel par frame)."""
+        address = self.data.buffer_info()[0]
+        if self._needs_realloc:
+            pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, self.instance_vbo)
+            pyglet.gl.glBufferData(pyglet.gl.GL_ARRAY_BUFFER, self.capacity * _STRIDE, address, pyglet.gl.GL_DYNAMIC_DRAW)
+            self._needs_realloc = False
+        elif self._dirty_start is not None:
+            pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, self.instance_vbo)
+            byte_start = self._dirty_start * _FLOAT_SIZE
+            byte_length = (self._dirty_end - self._dirty_start) * _FLOAT_SIZE
+            pyglet.gl.glBufferSubData(pyglet.gl.GL_ARRAY_BUFFER, byte_start, byte_length, address + byte_start)
+        else:
+            return
+        pyglet.gl.glBindBuffer(pyglet.gl.GL_ARRAY_BUFFER, 0)
+        self._dirty_start = self._dirty_end = None
+
+    def draw(self, count):
+        if count <= 0:
+            return
+        pyglet.gl.glBindVertexArray(self.vao)
+        pyglet.gl.glDrawArraysInstanced(pyglet.gl.GL_TRIANGLE_STRIP, 0, 4, count)
+        pyglet.gl.glBindVertexArray(0)
+
+    def delete(self):
+        pyglet.gl.glDeleteBuffers(1, self.quad_vbo)
+        pyglet.gl.glDeleteBuffers(1, self.instance_vbo)
+        pyglet.gl.glDeleteVertexArrays(1, self.vao)
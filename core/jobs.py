@@ -0,0 +1,201 @@
+import time
+import heapq
+import itertools
+import threading
+import traceback
+
+# Système de tâches : un pool de workers exécute les tâches prêtes par priorité (distance au joueur, la plus
+# petite d'abord), puis le thread principal termine celles qui doivent toucher à OpenGL (création des vertex
+# lists) dans JobSystem.run_completions, borné par un budget de temps par frame : le reste attend la frame
+# suivante au lieu de créer un pic quand beaucoup de chunks arrivent en même temps.
+
+# Types de tâches (statistiques par type) ; LIGHT et SAVE n'ont pas encore de producteur dans le jeu
+GENERATE = "generate"
+MESH = "mesh"
+SPRITE = "sprite"
+LIGHT = "light"
+SAVE = "save"
+JOB_KINDS = (GENERATE, MESH, SPRITE, LIGHT, SAVE)
+
+# États d'une tâche
+WAITING = "waiting" # Attend ses dépendances
+QUEUED = "queued" # Prête, dans la file des workers
+RUNNING = "running"
+COMPLETING = "completing" # Travail fini, étape du thread principal en attente
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+FINISHED = (DONE, CANCELLED, FAILED)
+
+
+class Job:
+    """
+    Une tâche du JobSystem :
+    - work() : exécuté par un worker, son résultat est passé à complete
+    - complete(résultat) : exécuté ensuite par le thread principal (None si la tâche n'en a pas besoin)
+    - priority : les plus petites d'abord, parmi les tâches prêtes comme parmi les étapes du thread principal
+    - depends_on : tâches qui doivent être terminées (DONE) avant de lancer celle-ci ; si l'une est annulée
+      ou échoue, celle-ci est annulée
+    """
+    def __init__(self, kind, work, priority=0, complete=None, depends_on=()):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Type de tâche inconnu : {kind}")
+        self.kind = kind
+        self.work = work
+        self.complete = complete
+        self.priority = priority
+        self.depends_on = list(depends_on)
+        self.dependents = []
+        self.waiting = 0
+        self.state = WAITING
+        self.cancelled = False
+        self.result = None
+
+    def cancel(self):
+        """Annule la tâche : sautée si elle n'a pas commencé, son étape du thread principal sinon."""
+        self.cancelled = True
+
+    @property
+    def finished(self):
+        return self.state in FINISHED
+
+
+class JobSystem:
+    """Pool de `workers` threads et file des étapes du thread principal."""
+    def __init__(self, workers, name="jobs"):
+        self.condition = threading.Condition()
+        self.ready = [] # Tas de (priorité, ordre, tâche) ; une tâche repriorisée y a plusieurs entrées
+        self.completions = [] # Tas de (priorité, ordre, tâche) terminées par les workers
+        self._order = itertools.count()
+        self.counts = {kind: {"submitted": 0, "done": 0, "cancelled": 0, "failed": 0, "work_time": 0.0}
+                       for kind in JOB_KINDS}
+        self.last_completions = 0
+        self.last_completion_time = 0.0
+        for index in range(workers):
+            threading.Thread(target=self.worker, daemon=True, name=f"{name}-{index}").start()
+
+    def submit(self, job):
+        """Ajoute une tâche (lancée dès que ses dépendances sont terminées) ; retourne la tâche."""
+        with self.condition:
+            self.counts[job.kind]["submitted"] += 1
+            if any(dependency.state in (CANCELLED, FAILED) for dependency in job.depends_on):
+                job.cancelled = True
+            pending = [dependency for dependency in job.depends_on if not dependency.finished]
+            job.waiting = len(pending)
+            for dependency in pending:
+                dependency.dependents.append(job)
+            if job.cancelled:
+                self._finish(job, CANCELLED)
+            elif not pending:
+                self._push_ready(job)
+        return job
+
+    def reprioritize(self, job, priority):
+        """Change la priorité d'une tâche pas encore lancée (l'ancienne entrée de la file sera ignorée)."""
+        with self.condition:
+            if job.priority == priority:
+                return
+            job.priority = priority
+            if job.state == QUEUED:
+                heapq.heappush(self.ready, (priority, next(self._order), job))
+                self.condition.notify()
+
+    def _push_ready(self, job):
+        job.state = QUEUED
+        heapq.heappush(self.ready, (job.priority, next(self._order), job))
+        self.condition.notify()
+
+    def _finish(self, job, state):
+        """Termine une tâche (verrou tenu) et débloque ou annule celles qui en dépendent."""
+        job.state = state
+        job.work = job.complete = None # Libère ce que les fonctions retiennent (données du chunk...)
+        self.counts[job.kind][state] += 1
+        dependents, job.dependents = job.dependents, []
+        for dependent in dependents:
+            if state != DONE:
+                dependent.cancelled = True
+            dependent.waiting -= 1
+            if dependent.waiting == 0 and not dependent.finished:
+                if dependent.cancelled:
+                    self._finish(dependent, CANCELLED)
+                else:
+                    self._push_ready(dependent)
+
+    def worker(self):
+        while True:
+            with self.condition:
+                while not self.ready:
+                    self.condition.wait()
+                priority, order, job = heapq.heappop(self.ready)
+                if job.state != QUEUED or priority != job.priority:
+                    continue # Déjà prise par une autre entrée (repriorisée)
+                if job.cancelled:
+                    self._finish(job, CANCELLED)
+                    continue
+                job.state = RUNNING
+                work = job.work
+
+            start = time.perf_counter()
+            try:
+                result = work()
+            except Exception:
+                traceback.print_exc()
+                with self.condition:
+                    self._finish(job, FAILED)
+                continue
+
+            with self.condition:
+                self.counts[job.kind]["work_time"] += time.perf_counter() - start
+                if job.cancelled:
+                    self._finish(job, CANCELLED)
+                elif job.complete is None:
+                    job.result = result
+                    self._finish(job, DONE)
+                else:
+                    job.result = result
+                    job.state = COMPLETING
+                    heapq.heappush(self.completions, (job.priority, next(self._order), job))
+
+    def run_completions(self, budget_seconds):
+        """
+        Thread principal : termine les tâches en attente, les plus prioritaires d'abord, jusqu'à épuiser
+        budget_seconds. Au moins une par appel, pour avancer même quand une seule dépasse le budget.
+        Retourne le nombre de tâches terminées.
+        """
+        start = time.perf_counter()
+        deadline = start + budget_seconds
+        count = 0
+        while True:
+            with self.condition:
+                if not self.completions:
+                    break
+                priority, order, job = heapq.heappop(self.completions)
+                complete, result = job.complete, job.result
+                job.result = None
+            state = CANCELLED
+            if not job.cancelled:
+                try:
+                    complete(result)
+                    state = DONE
+                except Exception:
+                    traceback.print_exc()
+                    state = FAILED
+            with self.condition:
+                self._finish(job, state)
+            count += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.last_completions = count
+        self.last_completion_time = time.perf_counter() - start
+        return count
+
+    def pending(self):
+        """(tâches prêtes dans la file des workers, étapes du thread principal en attente)"""
+        with self.condition:
+            ready = sum(1 for priority, order, job in self.ready
+                        if job.state == QUEUED and priority == job.priority and not job.cancelled)
+            return ready, sum(1 for priority, order, job in self.completions if not job.cancelled)
+
+    def stats(self):
+        with self.condition:
+            return {kind: dict(counts) for kind, counts in self.counts.items()}
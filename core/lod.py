@@ -0,0 +1,289 @@
+import numpy as np
+import pyglet
+from core.render_state import render_state
+from core.memory import LRUCache, ENTRY_BYTES
+from core.jobs import Job, MESH
+import config
+from config import CHUNK_SIZE, LOD_RINGS
+
+# Terrain lointain : au-delà de RENDER_DISTANCE, chaque chunk est une simple grille de hauteurs sous-échantillonnée
+# (pas de grottes, d'arbres ni de blocs), colorée par biome. Les anneaux de config.LOD_RINGS donnent le pas.
+# En détail complet, la même grille au pas 1 sert de maillage provisoire en attendant le chunk voxel.
+
+LOD_TILE_CHUNKS = 8 # Chunks par côté d'un batch de terrain lointain (un batch = un appel de dessin)
+LOD_SKIRT_STEPS = 2 # Profondeur des jupes sous les bords, en pas de grille
+SLOPE_SHADING = 0.3 # Assombrissement des pentes (la grille n'a pas de faces latérales pour marquer le relief)
+DEFAULT_COLOR = (0.5, 0.5, 0.5)
+
+
+def lod_step(distance):
+    """Pas de grille (en blocs) d'un chunk à `distance` chunks du joueur : 1 en détail complet, None hors de portée."""
+    if distance <= config.RENDER_DISTANCE:
+        return 1
+    for step, radius in LOD_RINGS:
+        if distance <= radius:
+            return step
+    return None
+
+
+def lod_radius():
+    return LOD_RINGS[-1][1] if LOD_RINGS else config.RENDER_DISTANCE
+
+
+def ring_keys():
+    """
+    Clé de maillage de chaque décalage (dx, dz) : (pas, pas imposé sur chaque bord -x, +x, -z, +z).
+    Le pas 1 est le maillage provisoire des chunks de détail complet pas encore générés.
+    Un bord prend le pas de son voisin quand celui-ci est plus grossier, pour que les sommets coïncident.
+    """
+    radius = lod_radius()
+    keys = {}
+    for dx in range(-radius, radius + 1):
+        for dz in range(-radius, radius + 1):
+            step = lod_step(max(abs(dx), abs(dz)))
+            edges = []
+            for ndx, ndz in ((dx - 1, dz), (dx + 1, dz), (dx, dz - 1), (dx, dz + 1)):
+                neighbor_step = lod_step(max(abs(ndx), abs(ndz)))
+                edges.append(max(step, neighbor_step or step))
+            keys[(dx, dz)] = (step, tuple(edges))
+    return keys
+
+
+def stitch_edges(heights, step, edge_steps):
+    """
+    Recolle les bords sur la grille plus grossière des voisins : les sommets qui n'existent pas chez le voisin
+    sont ramenés sur le segment entre ses deux sommets, ce qui supprime les fissures entre niveaux.
+    """
+    heights = heights.copy()
+    n = heights.shape[0] - 1
+    edges = (heights[0, :], heights[n, :], heights[:, 0], heights[:, n]) # -x, +x, -z, +z
+    for edge, edge_step in zip(edges, edge_steps):
+        if edge_step > step:
+            ratio = edge_step // step
+            edge[:] = np.interp(np.arange(n + 1), np.arange(0, n + 1, ratio), edge[::ratio])
+    return heights
+
+
+def build_heightmap_mesh(x0, z0, step, heights, colors, edge_steps=None):
+    """
+    Maillage d'une grille de hauteurs de (n + 1)² échantillons espacés de `step` blocs à partir de (x0, z0).
+    `colors` donne la couleur (r, g, b) de chaque échantillon. Les sommets sont sur le dessus des blocs
+    (y = h + 0.5) et sur leurs arêtes, comme le maillage voxel ; des jupes descendent sous les quatre bords.
+    Retourne un mesh_data comme build_chunk_mesh (positions, tex_coords, colors, indices, count).
+    """
+    if edge_steps is not None:
+        heights = stitch_edges(heights, step, edge_steps)
+    n = heights.shape[0] - 1
+    grid = np.arange(n + 1) * step
+    xs, zs = np.meshgrid(x0 + grid - 0.5, z0 + grid - 0.5, indexing='ij')
+
+    # Éclairage simple par la pente, calculé sur la grille
+    grad_x, grad_z = np.gradient(heights.astype(np.float32), step)
+    shade = 1.0 - SLOPE_SHADING + SLOPE_SHADING / np.sqrt(1.0 + grad_x * grad_x + grad_z * grad_z)
+    top_colors = (colors * shade[..., None]).reshape(-1, 3)
+    top_positions = np.stack([xs, heights + 0.5, zs], axis=-1).reshape(-1, 3)
+
+    vertex = np.arange((n + 1) * (n + 1)).reshape(n + 1, n + 1)
+    a, b, c, d = vertex[:-1, 1:], vertex[1:, 1:], vertex[1:, :-1], vertex[:-1, :-1]
+    indices = [np.stack([a, b, c, a, c, d], axis=-1).reshape(-1)]
+
+    # Jupes : chaque bord est parcouru de façon que ses quads fassent face à l'extérieur
+    skirt_depth = LOD_SKIRT_STEPS * step + 1
+    positions, vertex_colors = [top_positions], [top_colors]
+    count = top_positions.shape[0]
+    for edge in (vertex[0, :], vertex[::-1, 0], vertex[n, ::-1], vertex[:, n]): # -x, -z, +x, +z
+        bottom = top_positions[edge] - (0.0, skirt_depth, 0.0)
+        bottom_index = count + np.arange(n + 1)
+        positions.append(bottom)
+        vertex_colors.append(top_colors[edge] * (1.0 - SLOPE_SHADING))
+        b0, b1, t0, t1 = bottom_index[:-1], bottom_index[1:], edge[:-1], edge[1:]
+        indices.append(np.stack([b0, b1, t1, b0, t1, t0], axis=-1).reshape(-1))
+        count += n + 1
+
+    return {
+        'positions': np.concatenate(positions).ravel().tolist(),
+        'tex_coords': [0.0] * (count * 2),
+        'colors': np.concatenate(vertex_colors).ravel().tolist(),
+        'indices': np.concatenate(indices).tolist(),
+        'count': count,
+    }
+
+
+def average_color(image):
+    """Couleur moyenne (r, g, b dans [0, 1]) des pixels opaques d'une image pyglet."""
+    if image is None:
+        return DEFAULT_COLOR
+    pixels = np.frombuffer(image.get_data('RGBA', image.width * 4), dtype=np.uint8).reshape(-1, 4)
+    opaque = pixels[pixels[:, 3] > 0]
+    if not len(opaque):
+        return DEFAULT_COLOR
+    return tuple((opaque[:, :3].mean(axis=0) / 255.0).tolist())
+
+
+class FarTerrain:
+    """
+    Anneaux de terrain lointain autour du joueur, et maillages provisoires des chunks de détail complet
+    tant que leurs tâches de génération ne sont pas finies (le monde apparaît tout de suite, même quand la
+    génération complète prend du retard). Les grilles de hauteurs et les maillages sont des tâches du JobSystem
+    du monde ; le thread principal les envoie au GPU, regroupés en batches de LOD_TILE_CHUNKS² chunks.
+    """
+    def __init__(self, world):
+        self.world = world
+        self.program = world.program
+        self.keys = ring_keys()
+        self.render_distance = config.RENDER_DISTANCE # Distance pour laquelle self.keys a été calculé
+        self.center = None
+        self.wanted = {} # (cx, cz) -> clé de maillage voulue pour la position actuelle du joueur
+        self.queued = {} # (cx, cz) -> (clé, tâche) en cours
+        self.meshes = {} # (cx, cz) -> (clé, vertex list)
+        self.tile_batches = {} # tuile -> Batch
+        self.tile_counts = {} # tuile -> nombre de chunks dans le batch
+        self.proxies = set() # Chunks de détail complet couverts par un maillage provisoire jusqu'à leur rendu voxel
+
+        # Caches du worker : grille de hauteurs la plus fine calculée et biome de chaque chunk (budget mémoire)
+        self.height_grids = LRUCache("lod_height_grids", lambda key, cached: cached[1].nbytes + ENTRY_BYTES, priority=1)
+        self.chunk_biomes = LRUCache("lod_chunk_biomes", lambda key, biome: ENTRY_BYTES, priority=0)
+
+        self.biome_colors = {name: average_color(world.textures.images.get(("general", name)))
+                             for name in world.textures.biome_textures}
+        self.sea_floor_color = average_color(world.textures.images.get(("general", "sea_floor")))
+        self.texture = pyglet.image.SolidColorImagePattern((255, 255, 255, 255)).create_image(1, 1).get_texture()
+
+    def _queue_mesh(self, coord, key, distance):
+        """
+        Tâche de maillage, annulant celle d'une clé précédente. Priorité distance / pas : un maillage grossier
+        coûte peu et couvre beaucoup d'écran, il passe avant les chunks complets à distance égale.
+        """
+        self._cancel(coord)
+        priority = distance / key[0] - 0.5
+        job = Job(MESH, lambda: self.build_mesh(coord[0], coord[1], key), priority,
+                  complete=lambda mesh_data: self._finish(coord, key, mesh_data))
+        self.queued[coord] = (key, job)
+        self.world.jobs.submit(job)
+
+    def _cancel(self, coord):
+        queued = self.queued.pop(coord, None)
+        if queued is not None:
+            queued[1].cancel()
+
+    def _finish(self, coord, key, mesh_data):
+        """Thread principal : envoie le maillage au GPU s'il est toujours voulu."""
+        if self.queued.get(coord, (None,))[0] == key:
+            del self.queued[coord]
+        if self.wanted.get(coord) != key or self.meshes.get(coord, (None,))[0] == key:
+            return
+        self._upload(coord, key, mesh_data)
+
+    def heights(self, cx, cz, step):
+        """Hauteurs des colonnes x0 + i * step, z0 + j * step (bord du chunk voisin compris), avec cache."""
+        cached = self.height_grids.get((cx, cz))
+        if cached is not None and step % cached[0] == 0:
+            ratio = step // cached[0]
+            return cached[1][::ratio, ::ratio]
+
+        x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+        samples = range(0, CHUNK_SIZE + 1, step)
+        columns = self.world.chunk_columns.get((cx, cz))
+        if columns is not None:
+            # Le chunk complet a déjà ses hauteurs (marge d'une colonne comprise)
+            column_heights = columns['heights']
+            grid = [[column_heights[(x0 + i, z0 + j)] for j in samples] for i in samples]
+        else:
+            get_height = self.world.get_height
+            grid = [[get_height(x0 + i, z0 + j) for j in samples] for i in samples]
+        grid = np.array(grid, dtype=np.float32)
+        self.height_grids[(cx, cz)] = (step, grid)
+        return grid
+
+    def chunk_biome(self, cx, cz):
+        biome = self.chunk_biomes.get((cx, cz))
+        if biome is None:
+            half = CHUNK_SIZE // 2
+            biome = self.chunk_biomes[(cx, cz)] = self.world.get_biome_name(cx * CHUNK_SIZE + half, cz * CHUNK_SIZE + half)
+        return biome
+
+    def build_mesh(self, cx, cz, key):
+        step, edge_steps = key
+        heights = self.heights(cx, cz, step)
+        land = np.array(self.biome_colors.get(self.chunk_biome(cx, cz), DEFAULT_COLOR), dtype=np.float32)
+        colors = np.where((heights < 0)[..., None], np.array(self.sea_floor_color, dtype=np.float32), land)
+        return build_heightmap_mesh(cx * CHUNK_SIZE, cz * CHUNK_SIZE, step, heights, colors, edge_steps)
+
+    def _plan(self, chunk_x, chunk_z):
+        """Recalcule les clés voulues autour du joueur, envoie les maillages à refaire et libère ceux hors de portée."""
+        chunks = self.world.chunks
+        wanted = {}
+        proxies = set()
+        for (dx, dz), key in self.keys.items():
+            coord = (chunk_x + dx, chunk_z + dz)
+            if key[0] == 1:
+                if chunks.get(coord, {}).get('status') == 'rendered':
+                    continue # Déjà en détail complet
+                proxies.add(coord)
+            wanted[coord] = key
+        self.wanted = wanted
+        self.proxies = proxies
+
+        for coord, key in wanted.items():
+            mesh = self.meshes.get(coord)
+            if (mesh is None or mesh[0] != key) and self.queued.get(coord, (None,))[0] != key:
+                self._queue_mesh(coord, key, max(abs(coord[0] - chunk_x), abs(coord[1] - chunk_z)))
+
+        for coord in [coord for coord in self.meshes if coord not in wanted]:
+            self._delete_mesh(coord)
+        for coord in [coord for coord in self.queued if coord not in wanted]:
+            self._cancel(coord)
+        radius = lod_radius()
+        for cache in (self.height_grids, self.chunk_biomes):
+            for coord in list(cache):
+                if max(abs(coord[0] - chunk_x), abs(coord[1] - chunk_z)) > radius:
+                    cache.pop(coord, None)
+
+    def _delete_mesh(self, coord):
+        key, vertex_list = self.meshes.pop(coord)
+        vertex_list.delete()
+        tile = (coord[0] // LOD_TILE_CHUNKS, coord[1] // LOD_TILE_CHUNKS)
+        self.tile_counts[tile] -= 1
+        if not self.tile_counts[tile]:
+            del self.tile_counts[tile]
+            del self.tile_batches[tile]
+
+    def _upload(self, coord, key, mesh_data):
+        if coord in self.meshes:
+            self._delete_mesh(coord)
+        tile = (coord[0] // LOD_TILE_CHUNKS, coord[1] // LOD_TILE_CHUNKS)
+        batch = self.tile_batches.get(tile)
+        if batch is None:
+            batch = self.tile_batches[tile] = pyglet.graphics.Batch()
+        vertex_list = self.program.vertex_list_indexed(mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, render_state.group(self.program), position=('f', mesh_data['positions']), tex_coords=('f', mesh_data['tex_coords']), colors=('f', mesh_data['colors']))
+        self.meshes[coord] = (key, vertex_list)
+        self.tile_counts[tile] = self.tile_counts.get(tile, 0) + 1
+
+    def update(self, chunk_x, chunk_z):
+        if config.RENDER_DISTANCE != self.render_distance:
+            # Distance de rendu changée en jeu : les anneaux commencent ailleurs, seuls les chunks concernés
+            # changent de clé et sont remaillés
+            self.render_distance = config.RENDER_DISTANCE
+            self.keys = ring_keys()
+            self.center = None
+        if (chunk_x, chunk_z) != self.center:
+            self.center = (chunk_x, chunk_z)
+            self._plan(chunk_x, chunk_z)
+
+        # Un maillage provisoire disparaît dès que le chunk voxel le remplace
+        chunks = self.world.chunks
+        for coord in [coord for coord in self.proxies if chunks.get(coord, {}).get('status') == 'rendered']:
+            self.proxies.discard(coord)
+            self.wanted.pop(coord, None)
+            self._cancel(coord)
+            if coord in self.meshes:
+                self._delete_mesh(coord)
+
+    def draw(self):
+        if not self.tile_batches:
+            return
+        render_state.use_program(self.program)
+        render_state.set_uniform(self.program, 'our_texture', 0)
+        render_state.bind_texture(self.texture.target, self.texture.id)
+        for batch in self.tile_batches.values():
+            batch.draw()
@@ -0,0 +1,239 @@
+import sys
+import weakref
+import threading
+from collections import OrderedDict
+from config import MEMORY_BUDGET_MB
+
+# Budget mémoire commun aux caches du processus (jeu, serveur, outils) : chaque cache s'enregistre auprès de
+# memory_governor, qui évince les entrées les moins récemment utilisées des caches les moins prioritaires dès que
+# le total estimé dépasse MEMORY_BUDGET_MB. Les tailles sont des estimations (objets Python), pas des mesures.
+
+ENTRY_BYTES = 100 # Entrée de dict à clé tuple de 2 entiers (clé, entiers, place dans la table)
+BLOCK_ENTRY_BYTES = 120 # Entrée { (x, y, z): identifiant } des blocs
+
+
+def dict_bytes(d, entry_bytes=ENTRY_BYTES):
+    """Taille estimée d'un dict (ou d'un set) de len(d) entrées de entry_bytes octets."""
+    return sys.getsizeof(d) + len(d) * entry_bytes
+
+
+class LRUCache:
+    """
+    Dict dont les entrées sont évincées par le gouverneur, de la moins récemment lue ou écrite à la plus récente.
+    - size_of(clé, valeur) : taille estimée d'une entrée, calculée à l'écriture (resize() la recalcule)
+    - priority : les caches de priorité basse sont vidés en premier
+    - can_evict(clé) : False pour les entrées encore indispensables (sautées)
+    - on_evict(clé, valeur) : appelé après l'éviction d'une entrée
+    Les méthodes sont protégées par un verrou : les workers de génération partagent ces caches avec le thread principal.
+    """
+    def __init__(self, name, size_of, priority=0, can_evict=None, on_evict=None, governor=None):
+        self.name = name
+        self.size_of = size_of
+        self.priority = priority
+        self.can_evict = can_evict
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+        self.governor = governor or memory_governor
+        self.governor.register(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(list(self.entries))
+
+    def keys(self):
+        return list(self.entries)
+
+    def values(self):
+        with self.lock:
+            return list(self.entries.values())
+
+    def items(self):
+        with self.lock:
+            return list(self.entries.items())
+
+    def __getitem__(self, key):
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self._store(key, value)
+        self.governor.enforce_if_over()
+
+    def _store(self, key, value):
+        size = self.size_of(key, value)
+        self.bytes += size - self.sizes.get(key, 0)
+        self.sizes[key] = size
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+    def setdefault(self, key, default):
+        with self.lock:
+            if key in self.entries:
+                return self[key]
+            self._store(key, default)
+        self.governor.enforce_if_over()
+        return default
+
+    def update(self, pairs):
+        with self.lock:
+            for key, value in pairs:
+                self._store(key, value)
+        self.governor.enforce_if_over()
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.bytes -= self.sizes.pop(key)
+            return self.entries.pop(key)
+
+    def __delitem__(self, key):
+        with self.lock:
+            if key not in self.entries:
+                raise KeyError(key)
+            self.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.bytes = 0
+
+    def resize(self, key):
+        """Recalcule la taille d'une entrée modifiée sur place."""
+        with self.lock:
+            if key in self.entries:
+                self._store(key, self.entries[key])
+
+    def evict_one(self):
+        """Évince l'entrée évinçable la plus ancienne ; retourne le nombre d'octets libérés, ou None."""
+        with self.lock:
+            for key in list(self.entries):
+                if self.can_evict is not None and not self.can_evict(key):
+                    self.entries.move_to_end(key) # Protégée : traitée comme utilisée, pour ne pas la repasser à chaque éviction
+                    continue
+                size = self.sizes.get(key, 0)
+                value = self.pop(key)
+                self.evictions += 1
+                break
+            else:
+                return None
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+        return size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"name": self.name, "priority": self.priority, "entries": len(self.entries), "bytes": self.bytes,
+                "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions}
+
+
+class TrackedSize:
+    """Structure comptée dans le budget sans pouvoir être évincée (l'état du monde : blocs, modifications)."""
+    def __init__(self, name, size_fn, governor=None):
+        self.name = name
+        self.size_fn = size_fn
+        self.priority = None
+        (governor or memory_governor).register(self)
+
+    @property
+    def bytes(self):
+        return self.size_fn()
+
+    def evict_one(self):
+        return None
+
+    def stats(self):
+        return {"name": self.name, "priority": None, "entries": None, "bytes": self.bytes,
+                "hits": None, "misses": None, "hit_rate": None, "evictions": 0}
+
+
+class MemoryGovernor:
+    """
+    Budget en octets partagé par les caches enregistrés. Les caches sont gardés par référence faible :
+    ceux d'un monde abandonné disparaissent du budget avec lui.
+    """
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.cache_refs = []
+        self.registry_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+    def register(self, cache):
+        with self.registry_lock:
+            self.cache_refs.append(weakref.ref(cache))
+        return cache
+
+    def caches(self):
+        """Caches encore vivants (les références mortes sont oubliées au passage)."""
+        with self.registry_lock:
+            caches = [ref() for ref in self.cache_refs]
+            self.cache_refs = [ref for ref, cache in zip(self.cache_refs, caches) if cache is not None]
+        return [cache for cache in caches if cache is not None]
+
+    def total_bytes(self):
+        return sum(cache.bytes for cache in self.caches())
+
+    def enforce_if_over(self):
+        if self.total_bytes() > self.budget_bytes:
+            self.enforce()
+
+    def enforce(self):
+        """Évince jusqu'à repasser sous le budget : priorité la plus basse d'abord, LRU au sein d'un cache."""
+        with self.lock:
+            caches = self.caches()
+            over = sum(cache.bytes for cache in caches) - self.budget_bytes
+            evictable = sorted((cache for cache in caches if cache.priority is not None), key=lambda cache: cache.priority)
+            for cache in evictable:
+                while over > 0:
+                    freed = cache.evict_one()
+                    if freed is None:
+                        break
+                    over -= freed
+                if over <= 0:
+                    break
+
+    def stats(self):
+        return sorted((cache.stats() for cache in self.caches()), key=lambda stats: stats["name"])
+
+    def report(self):
+        """Résumé texte : une ligne par cache (taille, entrées, taux de succès, évictions)."""
+        lines = [f"Mémoire : {self.total_bytes() / 2 ** 20:.1f} / {self.budget_bytes / 2 ** 20:.0f} Mo"]
+        for stats in self.stats():
+            hit_rate = f"{stats['hit_rate']:.0%}" if stats["hit_rate"] is not None else "-"
+            entries = stats["entries"] if stats["entries"] is not None else "-"
+            lines.append(f"  {stats['name']:<20} {stats['bytes'] / 2 ** 20:8.2f} Mo  {entries:>7} entrées  "
+                         f"succès {hit_rate:>4}  évictions {stats['evictions']}")
+        return "\n".join(lines)
+
+
+memory_governor = MemoryGovernor(MEMORY_BUDGET_MB * 2 ** 20)
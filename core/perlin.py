@@ -0,0 +1,233 @@
+import numpy as np
+import noise
+from config import LEGACY_WORLD_NOISE
+from core.hashing import hash_u64
+
+# Bruit de Perlin du monde : noise.pnoise2/pnoise3 (bibliothèque C) pour les points isolés, et leur portage
+# NumPy (float32, _perlin.c) pour évaluer des milliers de points en un appel. Les deux donnent les mêmes
+# valeurs, bit à bit, pour toutes les seeds : le bruit est toujours évalué avec la base 0 de la bibliothèque,
+# la seule où ses index restent dans sa table de permutation (PERM, 512 octets), et chaque `base` du monde
+# (seed, seed + 1...) décale les coordonnées de noise_offset(base) cellules au lieu d'être passée à la
+# bibliothèque. Avec base > 1, celle-ci lit au-delà de PERM, dans une mémoire qui dépend de sa compilation.
+# LEGACY_WORLD_NOISE garde ce bruit des mondes d'avant (base passée telle quelle) : les fonctions par lot
+# appellent alors la bibliothèque point par point.
+
+NOISE_OFFSET_SEED = 0x6E6F697365 # Seed du hash des décalages (indépendante de la seed du monde)
+
+_PERM_256 = [
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+    140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+    247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+    57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+    60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+    65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+    200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+    52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+    207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+    119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+    129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+    218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+    81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+    184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+    222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180,
+]
+PERM = np.array(_PERM_256 * 2, dtype=np.int64)
+
+GRAD3 = np.array([
+    (1, 1, 0), (-1, 1, 0), (1, -1, 0), (-1, -1, 0),
+    (1, 0, 1), (-1, 0, 1), (1, 0, -1), (-1, 0, -1),
+    (0, 1, 1), (0, -1, 1), (0, 1, -1), (0, -1, -1),
+    (1, 0, -1), (-1, 0, -1), (0, -1, 1), (0, 1, 1)
+], dtype=np.float32)
+
+_ONE = np.float32(1)
+INT_MIN = -2 ** 31
+
+
+_offsets = {} # base -> décalage (quelques bases par monde)
+
+
+def noise_offset(base):
+    """Décalage (x, y, z) du champ de bruit d'une base, en cellules : multiples de 1/256 dans [0, 256[."""
+    offset = _offsets.get(base)
+    if offset is None:
+        value = hash_u64(base, 0, NOISE_OFFSET_SEED)
+        offset = _offsets[base] = tuple(((value >> shift) & 0xFFFF) / 256 for shift in (0, 16, 32))
+    return offset
+
+
+def pnoise2(x, y, octaves=1, persistence=0.5, lacunarity=2.0, repeat=1024, base=0):
+    """Bruit 2D du monde en un point."""
+    if LEGACY_WORLD_NOISE:
+        return noise.pnoise2(x, y, octaves, persistence, lacunarity, repeat, repeat, base)
+    offset_x, offset_y, _ = noise_offset(base)
+    return noise.pnoise2(x + offset_x, y + offset_y, octaves, persistence, lacunarity, repeat, repeat, 0)
+
+
+def pnoise3(x, y, z, octaves=1, persistence=0.5, lacunarity=2.0, repeat=1024, base=0):
+    """Bruit 3D du monde en un point."""
+    if LEGACY_WORLD_NOISE:
+        return noise.pnoise3(x, y, z, octaves, persistence, lacunarity, repeat, repeat, repeat, base)
+    offset_x, offset_y, offset_z = noise_offset(base)
+    return noise.pnoise3(x + offset_x, y + offset_y, z + offset_z, octaves, persistence, lacunarity,
+                         repeat, repeat, repeat, 0)
+
+
+def _perm(index):
+    return PERM[index]
+
+
+def _fade(t):
+    return t * t * t * (t * (t * np.float32(6) - np.float32(15)) + np.float32(10))
+
+
+def _lerp(t, a, b):
+    return a + t * (b - a)
+
+
+def _grad3(hash_value, x, y, z):
+    h = hash_value & 15
+    return x * GRAD3[h, 0] + y * GRAD3[h, 1] + z * GRAD3[h, 2]
+
+
+def _to_int(values):
+    """Conversion (int) d'un float comme en C sur x86 : hors de l'intervalle d'un int 32 bits, elle donne INT_MIN."""
+    in_range = (values >= INT_MIN) & (values < 2 ** 31)
+    return np.where(in_range, values, INT_MIN).astype(np.int64)
+
+
+def _cell(coord, repeat):
+    """Index entier de la cellule et de la suivante, comme floorf(fmodf(...)) dans _perlin.c."""
+    repeat = np.float32(repeat)
+    i = _to_int(np.floor(np.fmod(coord, repeat)))
+    ii = _to_int(np.fmod((i + 1).astype(np.float32), repeat))
+    return i, ii
+
+
+def _grad2(hash_value, x, y):
+    h = hash_value & 15
+    return x * GRAD3[h, 0] + y * GRAD3[h, 1]
+
+
+def _noise2(x, y, repeat, base):
+    i, ii = _cell(x, repeat)
+    j, jj = _cell(y, repeat)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    fx, fy = _fade(x), _fade(y)
+
+    a = _perm(i)
+    aa = _perm(a + j)
+    ab = _perm(a + jj)
+    b = _perm(ii)
+    ba = _perm(b + j)
+    bb = _perm(b + jj)
+
+    return _lerp(fy, _lerp(fx, _grad2(_perm(aa), x, y),
+                               _grad2(_perm(ba), x - _ONE, y)),
+                     _lerp(fx, _grad2(_perm(ab), x, y - _ONE),
+                               _grad2(_perm(bb), x - _ONE, y - _ONE)))
+
+
+def _noise3(x, y, z, repeat, base):
+    i, ii = _cell(x, repeat)
+    j, jj = _cell(y, repeat)
+    k, kk = _cell(z, repeat)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    k = (k & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+    kk = (kk & 255) + base
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    z = z - np.floor(z)
+    fx, fy, fz = _fade(x), _fade(y), _fade(z)
+
+    a = _perm(i)
+    aa = _perm(a + j)
+    ab = _perm(a + jj)
+    b = _perm(ii)
+    ba = _perm(b + j)
+    bb = _perm(b + jj)
+
+    return _lerp(fz, _lerp(fy, _lerp(fx, _grad3(_perm(aa + k), x, y, z),
+                                         _grad3(_perm(ba + k), x - _ONE, y, z)),
+                               _lerp(fx, _grad3(_perm(ab + k), x, y - _ONE, z),
+                                         _grad3(_perm(bb + k), x - _ONE, y - _ONE, z))),
+                     _lerp(fy, _lerp(fx, _grad3(_perm(aa + kk), x, y, z - _ONE),
+                                         _grad3(_perm(ba + kk), x - _ONE, y, z - _ONE)),
+                               _lerp(fx, _grad3(_perm(ab + kk), x, y - _ONE, z - _ONE),
+                                         _grad3(_perm(bb + kk), x - _ONE, y - _ONE, z - _ONE))))
+
+
+def pnoise2_batch(xs, ys, octaves=1, persistence=0.5, lacunarity=2.0, repeat=1024, base=0):
+    """Version vectorisée de pnoise2 (mêmes valeurs) pour des tableaux de coordonnées de même forme."""
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if LEGACY_WORLD_NOISE:
+        values = [noise.pnoise2(x, y, octaves, persistence, lacunarity, repeat, repeat, base)
+                  for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())]
+        return np.array(values, dtype=np.float64).reshape(xs.shape)
+    offset_x, offset_y, _ = noise_offset(base)
+    xs, ys = xs + offset_x, ys + offset_y
+    base = 0
+    x = np.asarray(xs, dtype=np.float32)
+    y = np.asarray(ys, dtype=np.float32)
+    if octaves == 1:
+        return _noise2(x, y, repeat, base).astype(np.float64)
+
+    freq = np.float32(1)
+    amp = np.float32(1)
+    total_amp = np.float32(0)
+    total = np.zeros(x.shape, dtype=np.float32)
+    for _ in range(octaves):
+        xf, yf = x * freq, y * freq
+        # Aux hautes fréquences les coordonnées float32 deviennent entières et le bruit y vaut exactement 0 :
+        # seuls les autres points sont évalués (les 100 octaves des biomes se réduisent à une trentaine)
+        active = (xf != np.floor(xf)) | (yf != np.floor(yf))
+        if active.all():
+            total = total + _noise2(xf, yf, np.float32(repeat) * freq, base) * amp
+        elif active.any():
+            total[active] += _noise2(xf[active], yf[active], np.float32(repeat) * freq, base) * amp
+        total_amp = total_amp + amp
+        freq = freq * np.float32(lacunarity)
+        amp = amp * np.float32(persistence)
+    return (total / total_amp).astype(np.float64)
+
+
+def pnoise3_batch(xs, ys, zs, octaves=1, persistence=0.5, lacunarity=2.0, repeat=1024, base=0):
+    """Version vectorisée de pnoise3 (mêmes valeurs) pour des tableaux de coordonnées de même forme."""
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    zs = np.asarray(zs, dtype=np.float64)
+    if LEGACY_WORLD_NOISE:
+        values = [noise.pnoise3(x, y, z, octaves, persistence, lacunarity, repeat, repeat, repeat, base)
+                  for x, y, z in zip(xs.ravel().tolist(), ys.ravel().tolist(), zs.ravel().tolist())]
+        return np.array(values, dtype=np.float64).reshape(xs.shape)
+    offset_x, offset_y, offset_z = noise_offset(base)
+    xs, ys, zs = xs + offset_x, ys + offset_y, zs + offset_z
+    base = 0
+    x = np.asarray(xs, dtype=np.float32)
+    y = np.asarray(ys, dtype=np.float32)
+    z = np.asarray(zs, dtype=np.float32)
+    if octaves == 1:
+        return _noise3(x, y, z, repeat, base).astype(np.float64)
+
+    freq = np.float32(1)
+    amp = np.float32(1)
+    total_amp = np.float32(0)
+    total = np.zeros(x.shape, dtype=np.float32)
+    for _ in range(octaves):
+        total = total + _noise3(x * freq, y * freq, z * freq, int(repeat * freq), base) * amp
+        total_amp = total_amp + amp
+        freq = freq * np.float32(lacunarity)
+        amp = amp * np.float32(persistence)
+    return (total / total_amp).astype(np.float64)
@@ -13,7 +13,8 @@ SWIM_GRAVITY = -10.0 # Coule un peu plus vite pour être plus visible
 SWIM_SPEED_MULTIPLIER = 1.5 # faster movement in water
 SWIM_VERTICAL_SPEED = 5.0 # Speed for ascending/descending in water
 
-from core.textures import block_types
+from core.textures import get_block_types
+from core.blocks import SEA_FLOOR
 
 class Player:
     def __init__(self, position=(0, 2, 0)):
@@ -26,11 +27,13 @@ class Player:
         self.ghost_mode = True # Default to ghost mode
         self.is_swimming = False # New flag for swimming
         self.velocity_y = 0.0
+        self.velocity = [0.0, 0.0, 0.0] # Déplacement réel de la dernière mise à jour (blocs/s), pour le préchargement
+        self.previous_position = list(position) # Position au tick précédent, pour interpoler le rendu
         self.on_ground = False
         self.debug_info = ""
 
         # Block selection
-        self.block_types = block_types
+        self.block_types = get_block_types()
         self.selected_block_index = self.block_types.index('dirt') if 'dirt' in self.block_types else 0
         self.selected_block = self.block_types[self.selected_block_index]
 
@@ -40,11 +43,22 @@ class Player:
         self.is_swimming = False # Exit swimming if toggling ghost mode
 
     def update(self, dt, keys, world):
+        start_position = list(self.position)
+        self.previous_position = start_position
+        self._move(dt, keys, world)
+        if dt > 0:
+            self.velocity = [(new - old) / dt for new, old in zip(self.position, start_position)]
+
+    def interpolated_position(self, alpha):
+        """Position entre le tick précédent (alpha = 0) et le dernier (alpha = 1)."""
+        return [old + (new - old) * alpha for old, new in zip(self.previous_position, self.position)]
+
+    def _move(self, dt, keys, world):
         # Determine if player is in water
         # Player's feet are at y, water level is at 0. So if y <= -1, player is in water.
         # Also check if the block at player's feet is water
         feet_block_pos = (round(self.position[0]), math.floor(self.position[1]), round(self.position[2]))
-        is_in_water_block = world.blocks.get(feet_block_pos) == 'sea_floor'
+        is_in_water_block = world.get_block(feet_block_pos) == SEA_FLOOR
 
         was_swimming = self.is_swimming # Store previous state
 
@@ -52,7 +66,7 @@ class Player:
         # Player's feet are at y, water level is at 0. So if y <= -1, player is in water.
         # Also check if the block at player's feet is water
         feet_block_pos = (round(self.position[0]), math.floor(self.position[1]), round(self.position[2]))
-        is_in_water_block = world.blocks.get(feet_block_pos) == 'sea_floor'
+        is_in_water_block = world.get_block(feet_block_pos) == SEA_FLOOR
 
         # Swimming condition: player's eyes are at or below water level (y=0)
         if self.position[1] + EYE_HEIGHT < 0:
@@ -0,0 +1,118 @@
+import pyglet
+
+
+class TrackedShaderGroup(pyglet.graphics.Group):
+    """
+    Groupe de batch qui active son programme via le RenderState au lieu de faire use()/stop()
+    à chaque batch.draw() (comportement du ShaderGroup par défaut de pyglet).
+    """
+    def __init__(self, program, state):
+        super().__init__()
+        self.program = program
+        self.state = state
+
+    def __eq__(self, other):
+        return (other.__class__ is self.__class__ and
+                self.program is other.program and
+                self.order == other.order and
+                self.parent == other.parent)
+
+    def __hash__(self):
+        return hash((id(self.program), self.order, self.parent))
+
+    def set_state(self):
+        self.state.use_program(self.program)
+
+    def unset_state(self):
+        pass
+
+
+class RenderState:
+    """
+    Cache de l'état OpenGL (capabilities, blend, programme, textures, uniforms).
+    Chaque appel redondant est évité et compté ; les autres sont transmis à OpenGL.
+    """
+    def __init__(self):
+        self.calls_avoided = 0
+        self.calls_issued = 0
+        self.last_frame_avoided = 0
+        self.last_frame_issued = 0
+        self._uniforms = {} # (programme, nom) -> valeur ; l'état des uniforms survit aux frames
+        self._groups = {}
+        self.invalidate()
+
+    def invalidate(self):
+        """Oublie l'état GL connu (à appeler après du code qui modifie l'état sans passer par ici)."""
+        self._capabilities = {}
+        self._blend_func = None
+        self._program = None
+        self._active_texture = None
+        self._textures = {}
+
+    def begin_frame(self):
+        self.last_frame_avoided = self.calls_avoided
+        self.last_frame_issued = self.calls_issued
+        self.calls_avoided = 0
+        self.calls_issued = 0
+        # L'UI pyglet de la frame précédente a pu changer l'état GL
+        self.invalidate()
+
+    def _skip(self, redundant):
+        if redundant:
+            self.calls_avoided += 1
+        else:
+            self.calls_issued += 1
+        return redundant
+
+    def enable(self, capability):
+        if self._skip(self._capabilities.get(capability) is True):
+            return
+        pyglet.gl.glEnable(capability)
+        self._capabilities[capability] = True
+
+    def disable(self, capability):
+        if self._skip(self._capabilities.get(capability) is False):
+            return
+        pyglet.gl.glDisable(capability)
+        self._capabilities[capability] = False
+
+    def blend_func(self, src, dst):
+        if self._skip(self._blend_func == (src, dst)):
+            return
+        pyglet.gl.glBlendFunc(src, dst)
+        self._blend_func = (src, dst)
+
+    def use_program(self, program):
+        if self._skip(self._program is program):
+            return
+        program.use()
+        self._program = program
+
+    def bind_texture(self, target, texture_id, unit=0):
+        if not self._skip(self._active_texture == unit):
+            pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0 + unit)
+            self._active_texture = unit
+        if self._skip(self._textures.get((unit, target)) == texture_id):
+            return
+        pyglet.gl.glBindTexture(target, texture_id)
+        self._textures[(unit, target)] = texture_id
+
+    def set_uniform(self, program, name, value):
+        key = (program, name)
+        if isinstance(value, list):
+            value = tuple(value) # Copie : une liste peut être modifiée sur place par l'appelant
+        if self._skip(key in self._uniforms and self._uniforms[key] == value):
+            return
+        program[name] = value
+        self._uniforms[key] = value
+
+    def group(self, program):
+        """Groupe partagé à passer à vertex_list_indexed() pour les batches de ce programme."""
+        group = self._groups.get(program)
+        if group is None:
+            group = self._groups[program] = TrackedShaderGroup(program, self)
+        return group
+
+
+# Instance partagée par tous les sites de dessin
+render_state = RenderState()
@@ -1,20 +1,48 @@
-import noise
-import random
-import math
 from config import SPRITE_NOISE_SCALE, SPRITE_NOISE_THRESHOLD, SPRITE_HEIGHT_OFFSET, CHUNK_SIZE # Import CHUNK_SIZE as well
-from core.textures import Textures
-from core.vegetation import Vegetation
+from core import hashing
+
+# Seuil du bruit au-dessus duquel un sprite pousse, par biome (terre ferme)
+BIOME_SPRITE_THRESHOLDS = {
+    "plains": SPRITE_NOISE_THRESHOLD,
+    "forest": SPRITE_NOISE_THRESHOLD - 0.1, # Slightly more frequent in forest
+    "desert": SPRITE_NOISE_THRESHOLD + 0.15, # Less frequent in desert
+    "jungle": SPRITE_NOISE_THRESHOLD - 0.18,
+    "savanna": SPRITE_NOISE_THRESHOLD,
+    "snow": SPRITE_NOISE_THRESHOLD + 0.18,
+    "tundra": SPRITE_NOISE_THRESHOLD + 0.18,
+    "taiga": SPRITE_NOISE_THRESHOLD + 0.08,
+}
+UNDERWATER_SPRITE_THRESHOLD = SPRITE_NOISE_THRESHOLD - 0.2 # More likely underwater
+SHORE_SPRITE_THRESHOLD = SPRITE_NOISE_THRESHOLD
+
 
 class Sprites:
-    def __init__(self, seed=0, vegetation = None, textures=None):
+    def __init__(self, seed=0, vegetation = None, textures=None, sprite_biomes=None):
+        """`sprite_biomes` ({biome: clés}) remplace textures.get_biome_textures() quand il n'y a pas de contexte GL."""
         self.seed = seed
-        self.sprite_positions = set() # To prevent overlapping sprites
         self.textures = textures
         self.vegetation = vegetation
+        if sprite_biomes is None:
+            sprite_biomes = textures.get_biome_textures() if textures else {}
+        # Textures candidates par biome, calculées une seule fois (sans feuillage ni tronc)
+        self.candidates = {}
+        for biome, keys in sprite_biomes.items():
+            # TODO  remove texture leaves and log from sprite selection
+            self.candidates[biome] = [tex for tex in keys if "leaves" not in tex and "log" not in tex]
 
     def hash_noise(self, x, z, seed):
-        r = random.Random((x * 73856093) ^ (z * 19349663) ^ seed)
-        return r.random()  # entre 0 et 1
+        return hashing.hash01(x, z, seed)  # entre 0 et 1
+
+    @staticmethod
+    def sprite_threshold(h, biome):
+        """Seuil de bruit pour une colonne de hauteur h, ou None si aucun sprite ne peut y pousser."""
+        if h < -2:
+            return UNDERWATER_SPRITE_THRESHOLD
+        if h == -1:
+            return SHORE_SPRITE_THRESHOLD
+        if h < 0:
+            return None
+        return BIOME_SPRITE_THRESHOLDS.get(biome)
 
     def has_sprite(self, x, z, h, biome):
         """Decides if a sprite should be placed here based on noise and biome."""
@@ -22,88 +50,51 @@ class Sprites:
         if self.vegetation.has_tree(x, z, biome):
             return False # No sprites where there are trees
 
-        val = self.hash_noise(x, z, self.seed)
-
-        if h < -2 and val > SPRITE_NOISE_THRESHOLD - 0.2: # More likely underwater
-            return True
-        if h == -1 and val > SPRITE_NOISE_THRESHOLD:
-            return True
-        elif h < 0:
-            return False
-        # Example: place sprites more often in plains and forest
-        elif biome == "plains" and val > SPRITE_NOISE_THRESHOLD:
-            return True
-        elif biome == "forest" and val > (SPRITE_NOISE_THRESHOLD - 0.1): # Slightly more frequent in forest
-            return True
-        elif biome == "desert" and val > (SPRITE_NOISE_THRESHOLD + 0.15): # Less frequent in desert
-            return True
-        elif biome == "jungle" and val > (SPRITE_NOISE_THRESHOLD - 0.18):
-            return True
-        elif biome == "savanna" and val > SPRITE_NOISE_THRESHOLD:
-            return True
-        elif biome == "snow" and val > (SPRITE_NOISE_THRESHOLD + 0.18):
-            return True
-        elif biome == "tundra" and val > (SPRITE_NOISE_THRESHOLD + 0.18):
-            return True
-        elif biome == "taiga" and val > (SPRITE_NOISE_THRESHOLD + 0.08):
-            return True
-        else:
-            return False
-
-    def register_sprite(self, x, z):
-        """Adds the sprite to the list of positions."""
-        self.sprite_positions.add((x, z))
-
-    def generate_for_chunk(self, chunk_x, chunk_z, get_height_func, get_biome_func):
-        """Generates sprite data for a given chunk."""
-        sprites_in_chunk = []
-        for x in range(chunk_x * CHUNK_SIZE, (chunk_x + 1) * CHUNK_SIZE): # Use CHUNK_SIZE from config
-            for z in range(chunk_z * CHUNK_SIZE, (chunk_z + 1) * CHUNK_SIZE):
-                biome = get_biome_func(x, z)
-                # Find the ground level
-                ground_y = get_height_func(x, z)
-                if self.has_sprite(x, z, ground_y, biome):
-
-                    sprite_type = self.get_sprite_type_for_biome(biome, ground_y, x, z)
-                    if sprite_type:
-                        sprites_in_chunk.append({
-                            "position": (x, ground_y + SPRITE_HEIGHT_OFFSET, z), # Use configurable height offset
-                            "type": sprite_type,
-                            "biome": biome
-                        })
-                        self.register_sprite(x, z)
-        return sprites_in_chunk
+        threshold = self.sprite_threshold(h, biome)
+        return threshold is not None and self.hash_noise(x, z, self.seed) > threshold
 
-    def get_sprite_type_for_biome(self, biome, ground_y, x=None, z=None):
+    def generate_for_chunk(self, chunk_x, chunk_z, columns):
         """
-        Retourne une texture pour un biome donné en utilisant le bruit (sélection déterministe).
-        Cas spécial : si ground_y < 0 → biome = "water".
+        Generates sprite data for a given chunk.
+        `columns` vient de Generator.chunk_columns : hauteurs, biomes et arbres déjà calculés pour le terrain.
+        Les hashs de placement et de sélection sont calculés en un lot pour les 256 colonnes.
         """
-        if not self.textures:
-            print(f"[Sprites] Aucun gestionnaire de textures fourni pour biome={biome}")
-            return None
+        sprites_in_chunk = []
+        heights = columns['heights']
+        biomes = columns['biomes']
+        trees = columns['trees']
+        sprite_threshold = self.sprite_threshold
 
-        biome_map = self.textures.get_biome_textures()
+        coords = [(x, z) for x in range(chunk_x * CHUNK_SIZE, (chunk_x + 1) * CHUNK_SIZE) # Use CHUNK_SIZE from config
+                  for z in range(chunk_z * CHUNK_SIZE, (chunk_z + 1) * CHUNK_SIZE)]
+        xs = [x for x, z in coords]
+        zs = [z for x, z in coords]
+        placement_values = hashing.hash01_batch(xs, zs, self.seed).tolist()
+        selection_values = hashing.hash01_batch(xs, zs, self.seed + 100).tolist()
 
-        # Cas spécial : sous l'eau -> forcer biome = water
-        if ground_y < 0:
-            biome = "sea_floor"
+        for (x, z), placement, selection in zip(coords, placement_values, selection_values):
+            if (x, z) in trees:
+                continue # No sprites where there are trees
+            biome = biomes[(x, z)]
+            ground_y = heights[(x, z)]
+            threshold = sprite_threshold(ground_y, biome)
+            if threshold is None or placement <= threshold:
+                continue
 
-        if ground_y == -1:
-            biome = "plage"
-
-        textures_for_biome = biome_map.get(biome, [])
-        # TODO  remove texture leaves and log from sprite selection
-        textures_for_biome = [tex for tex in textures_for_biome if "leaves" not in tex and "log" not in tex]
-        if not textures_for_biome:
-            return None  # aucun sprite dispo pour ce biome
+            candidates = self.sprite_candidates(biome, ground_y)
+            if candidates:
+                sprite_type = candidates[int(selection * len(candidates)) % len(candidates)]
+                sprites_in_chunk.append({
+                    "position": (x, ground_y + SPRITE_HEIGHT_OFFSET, z), # Use configurable height offset
+                    "type": sprite_type,
+                    "biome": biome
+                })
+        return sprites_in_chunk
 
-        # Sélection déterministe via bruit
-        if x is not None and z is not None:
-            val = self.hash_noise(x, z, self.seed + 100)
-            idx = int(val * len(textures_for_biome)) % len(textures_for_biome)
-            chosen = textures_for_biome[idx]
-        else:
-            # fallback si pas de coordonnées (rare)
-            chosen = random.choice(textures_for_biome)
-        return chosen
+    def sprite_candidates(self, biome, ground_y):
+        """Textures possibles pour une colonne ; le fond marin et la plage remplacent le biome."""
+        if ground_y == -1:
+            return self.candidates.get("plage")
+        if ground_y < 0:
+            return self.candidates.get("sea_floor")
+        return self.candidates.get(biome)
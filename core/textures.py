@@ -1,96 +1,204 @@
 import pyglet
 import os
-import glob
+import json
+from concurrent.futures import ThreadPoolExecutor
+from core.assets import (ASSETS_PATH, BUILD_MANIFEST_PATH, BUILD_PACK_PATH, BUILD_VERSION, ARRAY_CATEGORIES,
+                         scan_assets, source_key, biome_map)
+
+TEXTURE_CACHE_PATH = os.path.join(ASSETS_PATH, ".texture_cache.bin")
+
+# Textures générales qui sont aussi des blocs de biome (et donc posables par le joueur)
+BIOME_BLOCK_NAMES = ["tundra", "snow", "taiga", "forest", "plains", "savanna", "desert", "jungle", "grass", "dirt", "stone", "sea_floor"]
+
 
 class Textures:
     def __init__(self):
         self.textures = {}
         self.biome_textures = {}
         self.sprite_textures = {}
-        self.animal_textures = {} # Ajout pour les animaux
+        self.images = {} # (catégorie, clé) -> ImageData décodée, gardée pour les TextureArray et la minimap
+        self.sprite_biomes = {} # biome -> clés de sprites
+        self.animal_biomes = {} # biome -> clés d'animaux
+        self.texture_arrays = {} # catégorie -> (TextureArray, { clé: (couche, u_max, v_max) }), depuis le build
+        self.animal_texture_array = None # TextureArray des animaux, construit à la demande
+        self.animal_layers = {}
         self.load_textures()
 
-    def load_textures(self):
-        base_path = os.path.join(os.path.dirname(__file__), "..", "assets")
-        sprite_base_path = os.path.join(base_path, "sprites")
-        animal_base_path = os.path.join(base_path, "annimals") # Chemin pour les animaux
-
-        # Load general textures
-        for filename in os.listdir(base_path):
-            if filename.endswith(".png"):
-                name = os.path.splitext(filename)[0]
+    @staticmethod
+    def _decode(path):
+        image = pyglet.image.load(path).get_image_data()
+        return image.width, image.height, image.get_data('RGBA', image.width * 4)
+
+    def _read_cache(self, cache_key):
+        """Retourne { (catégorie, clé): (w, h, rgba) } depuis le cache disque, ou None s'il est absent ou périmé."""
+        try:
+            with open(TEXTURE_CACHE_PATH, 'rb') as f:
+                blob = f.read()
+            header_length = int.from_bytes(blob[:4], 'little')
+            header = json.loads(blob[4:4 + header_length])
+        except (OSError, ValueError):
+            return None
+        if header.get("key") != cache_key:
+            return None
+        data_start = 4 + header_length
+        return {
+            (category, key): (width, height, blob[data_start + offset:data_start + offset + length])
+            for category, key, width, height, offset, length in header["entries"]
+        }
+
+    def _write_cache(self, cache_key, decoded):
+        header_entries = []
+        chunks = []
+        offset = 0
+        for (category, key), (width, height, data) in decoded.items():
+            header_entries.append([category, key, width, height, offset, len(data)])
+            chunks.append(data)
+            offset += len(data)
+        header = json.dumps({"key": cache_key, "entries": header_entries}).encode('utf-8')
+        try:
+            with open(TEXTURE_CACHE_PATH, 'wb') as f:
+                f.write(len(header).to_bytes(4, 'little'))
+                f.write(header)
+                for data in chunks:
+                    f.write(data)
+        except OSError as e:
+            print(f"[Textures] Impossible d'écrire le cache {TEXTURE_CACHE_PATH} : {e}")
+
+    def _load_sources(self, entries, cache_key):
+        """Décode les PNG (ou relit le cache disque) ; retourne { (catégorie, clé): (w, h, rgba) }."""
+        decoded = self._read_cache(cache_key)
+        if decoded is not None:
+            return decoded, "cache"
+
+        # Décodage PNG en parallèle ; l'upload GL reste sur le thread principal
+        decoded = {}
+        with ThreadPoolExecutor() as executor:
+            futures = [(category, key, path, executor.submit(self._decode, path)) for category, key, path in entries]
+            for category, key, path, future in futures:
                 try:
-                    texture = pyglet.image.load(os.path.join(base_path, filename)).get_texture()
-                    self.textures[name] = texture
-                    if name in ["tundra","snow","taiga","forest","plains","savanna","desert","jungle","grass","dirt","stone","sea_floor"]:
-                        self.biome_textures[name] = texture
-                    print(f"[Textures] Chargée : {name}")
+                    decoded[(category, key)] = future.result()
                 except Exception as e:
-                    print(f"[Textures] Impossible de charger {filename} : {e}")
-
-        # Load sprite textures for biomes
-        if os.path.exists(sprite_base_path):
-            for biome_dir in os.listdir(sprite_base_path):
-                full_biome_path = os.path.join(sprite_base_path, biome_dir)
-                if os.path.isdir(full_biome_path):
-                    for filename in os.listdir(full_biome_path):
-                        if filename.endswith(".png"):
-                            sprite_name = os.path.splitext(filename)[0]
-                            sprite_path = os.path.join(full_biome_path, filename)
-                            try:
-                                sprite_texture = pyglet.image.load(sprite_path).get_texture()
-                                self.sprite_textures[f"{biome_dir}/{sprite_name}"] = sprite_texture
-                                print(f"[Textures] Sprite chargé : {biome_dir}/{sprite_name}")
-                            except Exception as e:
-                                print(f"[Textures] Impossible de charger le sprite {biome_dir}/{filename} : {e}")
-
-        # Load animal textures for biomes
-        if os.path.exists(animal_base_path):
-            for biome_dir in os.listdir(animal_base_path):
-                full_biome_path = os.path.join(animal_base_path, biome_dir)
-                if os.path.isdir(full_biome_path):
-                    for filename in os.listdir(full_biome_path):
-                        if filename.endswith(".png"):
-                            animal_name = os.path.splitext(filename)[0]
-                            animal_path = os.path.join(full_biome_path, filename)
-                            try:
-                                animal_texture = pyglet.image.load(animal_path).get_texture()
-                                self.animal_textures[f"{biome_dir}/{animal_name}"] = animal_texture
-                                print(f"[Textures] Animal chargé : {biome_dir}/{animal_name}")
-                            except Exception as e:
-                                print(f"[Textures] Impossible de charger l'animal {biome_dir}/{filename} : {e}")
+                    print(f"[Textures] Impossible de charger {path} : {e}")
+        self._write_cache(cache_key, decoded)
+        return decoded, "PNG"
+
+    def _load_build(self, cache_key):
+        """
+        Charge le manifeste et le pack produits par build_assets.py et envoie les TextureArray des ARRAY_CATEGORIES.
+        Retourne False si le build est absent ou périmé.
+        """
+        try:
+            with open(BUILD_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open(BUILD_PACK_PATH, 'rb') as f:
+                pack = f.read()
+        except (OSError, ValueError):
+            return False
+        if manifest.get("version") != BUILD_VERSION or manifest.get("source_key") != cache_key:
+            print("[Textures] Build des assets périmé, relancez 'python build_assets.py'")
+            return False
+
+        for category, array_info in manifest["arrays"].items():
+            layer_width, layer_height = array_info["width"], array_info["height"]
+            layers = {key: (entry["layer"], entry["width"] / layer_width, entry["height"] / layer_height)
+                      for key, entry in array_info["textures"].items()}
+            self.texture_arrays[category] = (self._upload_array(array_info, pack), layers)
+        self.animal_biomes = manifest["biomes"].get("animal", {})
+        return True
+
+    @staticmethod
+    def _upload_array(array_info, pack):
+        """Crée un TextureArray avec tous ses niveaux de mipmap précalculés."""
+        levels = array_info["levels"]
+        texture_array = pyglet.image.TextureArray.create(array_info["width"], array_info["height"],
+                                                         max_depth=array_info["layers"])
+        gl = pyglet.gl
+        gl.glBindTexture(texture_array.target, texture_array.id)
+        for level, level_info in enumerate(levels):
+            data = pack[level_info["offset"]:level_info["offset"] + level_info["length"]]
+            gl.glTexImage3D(texture_array.target, level, gl.GL_RGBA, level_info["width"], level_info["height"],
+                            array_info["layers"], 0, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE,
+                            (gl.GLubyte * len(data)).from_buffer_copy(data))
+        gl.glTexParameteri(texture_array.target, gl.GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+        gl.glTexParameteri(texture_array.target, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR_MIPMAP_LINEAR)
+        return texture_array
+
+    def load_textures(self):
+        entries = scan_assets()
+        built = self._load_build(source_key([entry for entry in entries if entry[0] in ARRAY_CATEGORIES]))
+        if built:
+            # Les ARRAY_CATEGORIES viennent du build : seules les textures 2D sont décodées
+            entries = [entry for entry in entries if entry[0] not in ARRAY_CATEGORIES]
+        decoded, origin = self._load_sources(entries, source_key(entries))
+        if built:
+            origin += " + build"
+        self.sprite_biomes = biome_map(key for category, key in decoded if category == "sprite")
+        if not built:
+            self.animal_biomes = biome_map(key for category, key in decoded if category == "animal")
+
+        for (category, key), (width, height, data) in decoded.items():
+            image = pyglet.image.ImageData(width, height, 'RGBA', data)
+            self.images[(category, key)] = image
+            if category in ARRAY_CATEGORIES:
+                continue # Envoyée au GPU seulement dans son TextureArray
+            texture = image.get_texture()
+            if category == "general":
+                self.textures[key] = texture
+                if key in BIOME_BLOCK_NAMES:
+                    self.biome_textures[key] = texture
+            else:
+                self.sprite_textures[key] = texture
+
+        arrays = sum(len(layers) for array, layers in self.texture_arrays.values())
+        print(f"[Textures] {len(decoded) + arrays} textures chargées ({origin})")
 
     def get(self, texture_name):
-        # Priorité : animaux, puis sprites, puis biomes, puis général
-        if texture_name in self.animal_textures:
-            return self.animal_textures[texture_name]
+        # Priorité : sprites, puis biomes, puis général (les animaux n'existent qu'en TextureArray)
         if texture_name in self.sprite_textures:
             return self.sprite_textures[texture_name]
         if texture_name in self.biome_textures:
             return self.biome_textures[texture_name]
         return self.textures.get(texture_name)
 
+    def get_animal_texture_array(self):
+        """
+        Retourne (TextureArray, { nom: (couche, u_max, v_max) }) pour toutes les textures d'animaux.
+        Les images n'ont pas toutes la même taille : chacune occupe le coin d'une couche.
+        """
+        if "animal" in self.texture_arrays:
+            return self.texture_arrays["animal"]
+        names = sorted(key for category, key in self.images if category == "animal")
+        if self.animal_texture_array is None and names:
+            images = [self.images[("animal", name)] for name in names]
+            width = max(image.width for image in images)
+            height = max(image.height for image in images)
+            self.animal_texture_array = pyglet.image.TextureArray.create(width, height, max_depth=len(images))
+            regions = self.animal_texture_array.allocate(*images)
+            for name, region in zip(names, regions):
+                self.animal_layers[name] = (region.z, region.width / width, region.height / height)
+        return self.animal_texture_array, self.animal_layers
+
     def get_biome_textures(self):
         """Retourne un dictionnaire { biome: [chemins des textures de sprites disponibles] }"""
-        biome_map = {}
-        for key in self.sprite_textures.keys():
-            if "/" in key:
-                biome_dir, sprite_name = key.split("/", 1)
-                if biome_dir not in biome_map:
-                    biome_map[biome_dir] = []
-                biome_map[biome_dir].append(key)
-        return biome_map
+        return self.sprite_biomes
 
     def get_animal_biome_textures(self):
         """Retourne un dictionnaire { biome: [chemins des textures d'animaux disponibles] }"""
-        biome_map = {}
-        for key in self.animal_textures.keys():
-            if "/" in key:
-                biome_dir, animal_name = key.split("/", 1)
-                if biome_dir not in biome_map:
-                    biome_map[biome_dir] = []
-                biome_map[biome_dir].append(key)
-        return biome_map
-
-# List of block types that can be placed by the player
-block_types = [name for name in Textures().textures.keys() if name in Textures().biome_textures]
+        return self.animal_biomes
+
+
+# Registre unique pour tout le processus, créé au premier accès (l'import ne touche pas au disque)
+_registry = None
+
+
+def get_textures():
+    global _registry
+    if _registry is None:
+        _registry = Textures()
+    return _registry
+
+
+def get_block_types():
+    """List of block types that can be placed by the player"""
+    textures = get_textures()
+    return [name for name in textures.textures.keys() if name in textures.biome_textures]
@@ -1,131 +1,185 @@
-import random
+import numpy as np
+from core.blocks import LOG, CACTUS, BIOME_LEAVES_BLOCKS
+from config import CHUNK_SIZE, LEGACY_WORLD_HASH
+from core import hashing
+
+# Valeur du hash au-dessus de laquelle un arbre/cactus pousse, par biome
+BIOME_TREE_THRESHOLDS = {
+    "forest": 0.98,
+    "taiga": 0.985,
+    "jungle": 0.98,
+    "plains": 0.99,
+    "savanna": 0.98,
+    "desert": 0.999,
+}
+MIN_TREE_THRESHOLD = min(BIOME_TREE_THRESHOLDS.values())
+
+# Débord horizontal maximal d'un arbre autour de son tronc (couronne de la jungle)
+TREE_MARGIN = 3
+
+
+# -----------------------------
+# Types d’arbres
+# Chaque fonction écrit un arbre dont le pied est à l'origine ; le résultat sert de gabarit (stamp).
+# -----------------------------
+
+def _tree_oak(blocks, leaves, height):
+    for i in range(height):
+        blocks[(0, i, 0)] = LOG
+    # petite boule de feuilles
+    for dx in range(-1, 2):
+        for dz in range(-1, 2):
+            for dy in range(0, 2):
+                if abs(dx) + abs(dz) + dy < 3:
+                    blocks[(dx, height-1+dy, dz)] = leaves
+
+def _tree_pine(blocks, leaves, height):
+    for i in range(height):
+        blocks[(0, i, 0)] = LOG
+    radius = 2
+    for dy in range(height//2, height+1):
+        for dx in range(-radius, radius+1):
+            for dz in range(-radius, radius+1):
+                if dx**2 + dz**2 <= radius**2:
+                    blocks[(dx, dy, dz)] = leaves
+        radius = max(1, radius-1)
+
+def _tree_jungle(blocks, leaves, height):
+    # Tronc
+    for i in range(height):
+        blocks[(0, i, 0)] = LOG
+
+    # Feuillage principal (couche intermédiaire)
+    for dx in range(-2, 3):
+        for dz in range(-2, 3):
+            for dy in range(0, 2):
+                if dx**2 + dz**2 + dy**2 < 6:
+                    blocks[(dx, height-2+dy, dz)] = leaves
+
+    # Couronne plus large au sommet
+    for dx in range(-3, 4):  # élargit à -3..3
+        for dz in range(-3, 4):
+            if dx**2 + dz**2 < 15:  # cercle un peu plus large
+                blocks[(dx, height, dz)] = leaves
+
+    # Petite pointe feuillue (optionnel, pour donner une forme conique)
+    for dx in range(-1, 2):
+        for dz in range(-1, 2):
+            blocks[(dx, height+1, dz)] = leaves
+
+def _tree_small(blocks, leaves, height):
+    for i in range(height):
+        blocks[(0, i, 0)] = LOG
+    # petit toupet
+    for dx in range(-1, 2):
+        for dz in range(-1, 2):
+            blocks[(dx, height, dz)] = leaves
+
+def _cactus(blocks, leaves, height):
+    for i in range(height):
+        blocks[(0, i, 0)] = CACTUS
+
+def _tree_acacia(blocks, leaves, height):
+    for i in range(height):
+        blocks[(0, i, 0)] = LOG
+    for dx in range(-2, 3):
+        for dz in range(-2, 3):
+            if abs(dx) + abs(dz) < 3:
+                blocks[(dx, height, dz)] = leaves
+
+
+# Espèce par biome : (constructeur, hauteur min, hauteur max)
+BIOME_TREES = {
+    "forest": (_tree_oak, 2, 4),
+    "taiga": (_tree_pine, 3, 6),
+    "jungle": (_tree_jungle, 4, 6),
+    "plains": (_tree_small, 2, 3),
+    "desert": (_cactus, 2, 3),
+    "savanna": (_tree_acacia, 3, 4),
+}
+
+
+def _build_stamps():
+    """Précalcule, pour chaque biome et chaque hauteur, les décalages (dx, dy, dz) et blocs de l'arbre."""
+    stamps = {}
+    for biome, (builder, low, high) in BIOME_TREES.items():
+        for height in range(low, high + 1):
+            blocks = {}
+            builder(blocks, BIOME_LEAVES_BLOCKS.get(biome), height)
+            offsets = np.array(list(blocks.keys()), dtype=np.int64).reshape(-1, 3)
+            ids = np.array(list(blocks.values()), dtype=np.int64)
+            stamps[(biome, height)] = (offsets, ids)
+    return stamps
+
+
+TREE_STAMPS = _build_stamps()
+
 
 class Vegetation:
     def __init__(self, seed=0):
         self.seed = seed
 
-    def rand(self, x, z):
-        """Retourne un générateur pseudo-aléatoire déterministe basé sur (x, z, seed)."""
-        return random.Random((x * 73856093) ^ (z * 19349663) ^ self.seed)
+    def randint(self, x, z, low, high):
+        """Entier déterministe dans [low, high] pour la colonne (x, z) (hauteur des arbres)."""
+        # Seed propre : avec celle de has_tree, la valeur déjà > seuil donnerait toujours la hauteur maximale.
+        # L'ancien hash tirait la hauteur du même générateur, sans cette corrélation : il garde la seed.
+        seed = self.seed if LEGACY_WORLD_HASH else self.seed + 1
+        return hashing.randint(x, z, seed, low, high)
 
     def hash_noise(self, x, z, seed):
         """Retourne une valeur bruitée déterministe entre 0 et 1."""
-        r = random.Random((x * 73856093) ^ (z * 19349663) ^ seed)
-        return r.random()
+        return hashing.hash01(x, z, seed)
 
     def has_tree(self, x, z, biome):
         """Décide si un arbre/cactus pousse ici selon le bruit et le biome."""
-        val = self.hash_noise(x, z, self.seed)
-
-        if biome == "forest":
-            return val > 0.98
-        elif biome == "taiga":
-            return val > 0.985
-        elif biome == "jungle":
-            return val > 0.98
-        elif biome == "plains":
-            return val > 0.99
-        elif biome == "savanna":
-            return val > 0.98
-        elif biome == "desert":
-            return val > 0.999
-        else:
-            return False
-
-    def generate(self, chunk_blocks, x, z, y, biome):
-        """Génère la végétation (arbre/cactus) au-dessus du sol."""
-        if self.has_tree(x, z, biome):
-
-            if biome == "forest":
-                self._tree_oak(biome, chunk_blocks, x, z, y)
-            elif biome == "taiga":
-                self._tree_pine(biome, chunk_blocks, x, z, y)
-            elif biome == "jungle":
-                self._tree_jungle(biome, chunk_blocks, x, z, y)
-            elif biome == "plains":
-                self._tree_small(biome, chunk_blocks, x, z, y)
-            elif biome == "desert":
-                self._cactus(biome, chunk_blocks, x, z, y)
-            elif biome == "savanna":
-                self._tree_acacia(biome, chunk_blocks, x, z, y)
-
-    # -----------------------------
-    # Types d’arbres
-    # -----------------------------
-
-    def _tree_oak(self, biome, blocks, x, z, y):
-        r = self.rand(x, z)
-        height = r.randint(2, 4)
-        for i in range(height):
-            blocks[(x, y+i, z)] = "log"
-        # petite boule de feuilles
-        for dx in range(-1, 2):
-            for dz in range(-1, 2):
-                for dy in range(0, 2):
-                    if abs(dx) + abs(dz) + dy < 3:
-                        blocks[(x+dx, y+height-1+dy, z+dz)] = biome + "/leaves"
-
-    def _tree_pine(self, biome, blocks, x, z, y):
-        r = self.rand(x, z)
-        height = r.randint(3, 6)
-        for i in range(height):
-            blocks[(x, y+i, z)] = "log"
-        radius = 2
-        for dy in range(height//2, height+1):
-            for dx in range(-radius, radius+1):
-                for dz in range(-radius, radius+1):
-                    if dx**2 + dz**2 <= radius**2:
-                        blocks[(x+dx, y+dy, z+dz)] = biome + "/leaves"
-            radius = max(1, radius-1)
-
-    def _tree_jungle(self, biome, blocks, x, z, y):
-        height = self.rand(x, z).randint(4, 6)
-        
-        # Tronc
-        for i in range(height):
-            blocks[(x, y+i, z)] = "log"
-        
-        # Feuillage principal (couche intermédiaire)
-        for dx in range(-2, 3):
-            for dz in range(-2, 3):
-                for dy in range(0, 2):
-                    if dx**2 + dz**2 + dy**2 < 6:
-                        blocks[(x+dx, y+height-2+dy, z+dz)] = biome + "/leaves"
-
-        # Couronne plus large au sommet
-        for dx in range(-3, 4):  # élargit à -3..3
-            for dz in range(-3, 4):
-                if dx**2 + dz**2 < 15:  # cercle un peu plus large
-                    blocks[(x+dx, y+height, z+dz)] = biome + "/leaves"
-
-        # Petite pointe feuillue (optionnel, pour donner une forme conique)
-        for dx in range(-1, 2):
-            for dz in range(-1, 2):
-                blocks[(x+dx, y+height+1, z+dz)] = biome + "/leaves"
-
-
-    def _tree_small(self, biome, blocks, x, z, y):
-        r = self.rand(x, z)
-        height = r.randint(2, 3)
-        for i in range(height):
-            blocks[(x, y+i, z)] = "log"
-        # petit toupet
-        for dx in range(-1, 2):
-            for dz in range(-1, 2):
-                blocks[(x+dx, y+height, z+dz)] = biome + "/leaves"
-
-    def _cactus(self, biome, blocks, x, z, y):
-        r = self.rand(x, z)
-        height = r.randint(2, 3)
-        for i in range(height):
-            blocks[(x, y+i, z)] = "cactus"
-
-    def _tree_acacia(self, biome, blocks, x, z, y):
-        r = self.rand(x, z)
-        height = r.randint(3, 4)
-        for i in range(height):
-            blocks[(x, y+i, z)] = "log"
-        for dx in range(-2, 3):
-            for dz in range(-2, 3):
-                if abs(dx) + abs(dz) < 3:
-                    blocks[(x+dx, y+height, z+dz)] = biome + "/leaves"
+        threshold = BIOME_TREE_THRESHOLDS.get(biome)
+        return threshold is not None and self.hash_noise(x, z, self.seed) > threshold
+
+    def tree_mask(self, xs, zs, biomes):
+        """Version par lot de has_tree : tableau de booléens pour des colonnes (xs, zs) et leurs biomes."""
+        thresholds = np.array([BIOME_TREE_THRESHOLDS.get(biome, 1.0) for biome in biomes])
+        return hashing.hash01_batch(xs, zs, self.seed) > thresholds
+
+    def tree_stamp(self, x, z, biome):
+        """Gabarit (décalages, blocs) de l'arbre qui pousse en (x, z)."""
+        builder, low, high = BIOME_TREES[biome]
+        return TREE_STAMPS[(biome, self.randint(x, z, low, high))]
+
+    def tree_anchors(self, cx, cz, columns, get_height, get_biome_name):
+        """
+        Pieds des arbres qui peuvent toucher le chunk (cx, cz) : ceux du chunk (déjà dans `columns`)
+        et ceux de la marge de TREE_MARGIN colonnes, préfiltrés par le hash avant tout calcul de bruit.
+        Retourne [(x, y, z, biome)] trié, pour que chaque chunk résolve les chevauchements dans le même ordre.
+        """
+        heights = columns['heights']
+        biomes = columns['biomes']
+        anchors = [(x, heights[(x, z)] + 1, z, biomes[(x, z)]) for x, z in columns['trees'] if heights[(x, z)] > 0]
+
+        x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+        span = np.arange(-TREE_MARGIN, CHUNK_SIZE + TREE_MARGIN)
+        xs, zs = np.meshgrid(x0 + span, z0 + span, indexing='ij')
+        outside = ~(((xs >= x0) & (xs < x0 + CHUNK_SIZE)) & ((zs >= z0) & (zs < z0 + CHUNK_SIZE)))
+        candidates = outside & (hashing.hash01_batch(xs, zs, self.seed) > MIN_TREE_THRESHOLD)
+        for x, z in zip(xs[candidates].tolist(), zs[candidates].tolist()):
+            biome = get_biome_name(x, z)
+            if self.has_tree(x, z, biome):
+                h = get_height(x, z)
+                if h > 0:
+                    anchors.append((x, h + 1, z, biome))
+
+        anchors.sort(key=lambda anchor: (anchor[0], anchor[2]))
+        return anchors
+
+    def structures_for_chunk(self, cx, cz, anchors):
+        """
+        Applique les gabarits des arbres et ne garde que les blocs qui appartiennent au chunk (cx, cz).
+        Retourne { (x, y, z): bloc } ; en cas de chevauchement, le premier arbre (dans l'ordre des pieds) l'emporte.
+        """
+        structure_blocks = {}
+        for x, y, z, biome in anchors:
+            offsets, ids = self.tree_stamp(x, z, biome)
+            positions = offsets + (x, y, z)
+            owned = (positions[:, 0] // CHUNK_SIZE == cx) & (positions[:, 2] // CHUNK_SIZE == cz)
+            for pos, block in zip(map(tuple, positions[owned].tolist()), ids[owned].tolist()):
+                structure_blocks.setdefault(pos, block)
+        return structure_blocks
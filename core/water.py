@@ -1,6 +1,7 @@
 import pyglet
 from pyglet.graphics import shader
 from pyglet.math import Mat4
+from core.render_state import render_state
 
 class WaterPlane:
     def __init__(self, height=0.0, size=200.0):
@@ -127,18 +128,17 @@ class WaterPlane:
 
     def draw(self, projection, view, time, camera_position, fog_color, fog_start, fog_end):
         if self.program:
-            pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
-            pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
-            pyglet.gl.glDisable(pyglet.gl.GL_CULL_FACE) # Disable culling for water
-            self.program.use()
-            self.program['projection'] = projection
-            self.program['view'] = view
-            self.program['time'] = time # Pass time uniform to vertex shader
-            self.program['camera_position'] = camera_position # Pass camera position uniform
-            self.program['fog_color'] = fog_color
-            self.program['fog_start'] = fog_start
-            self.program['fog_end'] = fog_end
+            render_state.enable(pyglet.gl.GL_BLEND)
+            render_state.blend_func(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+            render_state.disable(pyglet.gl.GL_CULL_FACE) # Disable culling for water
+            render_state.use_program(self.program)
+            render_state.set_uniform(self.program, 'projection', projection)
+            render_state.set_uniform(self.program, 'view', view)
+            render_state.set_uniform(self.program, 'time', time) # Pass time uniform to vertex shader
+            render_state.set_uniform(self.program, 'camera_position', camera_position) # Pass camera position uniform
+            render_state.set_uniform(self.program, 'fog_color', fog_color)
+            render_state.set_uniform(self.program, 'fog_start', fog_start)
+            render_state.set_uniform(self.program, 'fog_end', fog_end)
             self.vertex_list.draw(pyglet.gl.GL_TRIANGLES)
-            self.program.stop()
-            pyglet.gl.glEnable(pyglet.gl.GL_CULL_FACE) # Re-enable culling
-            pyglet.gl.glDisable(pyglet.gl.GL_BLEND)
\ No newline at end of file
+            render_state.enable(pyglet.gl.GL_CULL_FACE) # Re-enable culling
+            render_state.disable(pyglet.gl.GL_BLEND)
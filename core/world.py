@@ -1,11 +1,30 @@
-import threading, queue, math
+import math
 import pyglet
-import noise
-from core.textures import Textures
-from core.vegetation import Vegetation
-from core.sprites import Sprites
+from worldgen import Generator
+from worldgen.storage import ChunkStore
+from core.textures import get_textures
 from core.animals import Animals # Importer la nouvelle classe
-from config import CHUNK_SIZE, RENDER_DISTANCE, WORLD_SEED, SPRITE_RENDER_DISTANCE
+from core.lod import FarTerrain
+from core.chunk_memory import ChunkMemory
+from core.jobs import JobSystem, Job, GENERATE, MESH, SPRITE
+from core.memory import LRUCache, TrackedSize, memory_governor, dict_bytes, BLOCK_ENTRY_BYTES
+from core.render_state import render_state
+from core.blocks import block_registry, AIR, FACE_COUNT
+import config
+from config import CHUNK_SIZE, WORLD_SEED, PREFETCH_LOOKAHEAD, PREFETCH_MAX_CHUNKS, JOB_WORKERS, JOB_FRAME_BUDGET_MS
+
+# Préchargement : en dessous de MIN_SPEED le joueur flâne, au-dessus de MAX_SPEED c'est une téléportation.
+# La trajectoire prévue n'est recalculée que si le chunk du joueur ou son secteur de direction change.
+PREFETCH_MIN_SPEED = 2.0
+PREFETCH_MAX_SPEED = 200.0
+PREFETCH_SECTORS = 16
+# Seconde référence à chaque bloc, dans le dict de son chunk (les clés sont partagées avec World.blocks)
+CHUNK_BLOCK_ENTRY_BYTES = 40
+
+
+def columns_bytes(key, columns):
+    return dict_bytes(columns['heights']) + dict_bytes(columns['biomes']) + dict_bytes(columns['trees'])
+
 
 class World:
     def __init__(self, program, seed=WORLD_SEED):
@@ -15,166 +34,226 @@ class World:
         self.chunks = {}
         self.chunk_batches = {}
 
-        self.chunk_generation_queue = queue.Queue()
-        self.chunk_batch_creation_queue = queue.Queue()
+        # Tâches de fond (core/jobs.py) : génération, maillage et sprites par des workers, les plus proches
+        # du joueur d'abord ; les vertex lists sont créées par le thread principal dans le budget de la frame
+        self.jobs = JobSystem(JOB_WORKERS)
+        self.chunk_jobs = {} # (cx, cz) -> (génération, maillage) en cours
+        self.sprite_jobs = {} # (cx, cz) -> tâche de sprites en cours
 
-        self.textures = Textures()
-        self.vegetation = Vegetation(seed=self.seed)
+        self.textures = get_textures() # Registre partagé par tout le processus
+        # Texture de chaque couche du registre de blocs (None si l'asset manque)
+        self.layer_textures = [self.textures.get(name) for name in block_registry.layer_names]
+
+        # Génération pure (worldgen) : le monde n'ajoute que les caches, les threads et le rendu
+        self.generator = Generator(self.seed, sprite_biomes=self.textures.get_biome_textures())
+        self.vegetation = self.generator.vegetation
+        # Chunks prégénérés pour cette seed (pregenerate.py), lus par le worker de terrain s'ils existent
+        self.store = ChunkStore.open_existing(self.seed)
 
         # Système de sprites (basé sur les chunks)
-        self.sprites = Sprites(seed=self.seed, vegetation=self.vegetation, textures=self.textures)
+        self.sprites = self.generator.sprites
         self.sprite_chunks = {}
         self.sprite_batches = {}
-        self.sprite_generation_queue = queue.Queue()
-        self.sprite_batch_creation_queue = queue.Queue()
 
         # Système d'animaux (basé sur des entités)
-        self.animals = Animals(seed=self.seed, vegetation=self.vegetation, program=self.program)
+        self.animals = Animals(seed=self.seed, vegetation=self.vegetation)
         self.animals.set_textures(self.textures)
 
         self.destroyed_blocks = set()
+        # Blocs des chunks chargés et blocs détruits : comptés dans le budget mémoire, libérés au déchargement
+        self.blocks_size = TrackedSize("world_blocks", lambda: dict_bytes(self.blocks, BLOCK_ENTRY_BYTES + CHUNK_BLOCK_ENTRY_BYTES))
+        self.destroyed_size = TrackedSize("destroyed_blocks", lambda: dict_bytes(self.destroyed_blocks, BLOCK_ENTRY_BYTES))
+        # Données par colonne des chunks (hauteurs, biomes, arbres), partagées par le terrain et les sprites ;
+        # recalculées par get_chunk_columns si le budget mémoire les a évincées
+        self.chunk_columns = LRUCache("chunk_columns", columns_bytes, priority=2)
+        # Résultat du test de grotte par position évaluée, par chunk (génération et blocs révélés en creusant)
+        self.cave_masks = LRUCache("cave_masks", lambda key, mask: dict_bytes(mask, BLOCK_ENTRY_BYTES), priority=1)
+        # Chunks demandés par le préchargement, gardés hors de la fenêtre de rendu (au plus PREFETCH_MAX_CHUNKS)
+        self.prefetched = set()
+        self.prefetch_key = None
+        self.player_chunk = None # Chunk du joueur au dernier tick
+        # Blocs et masques de grottes des chunks inactifs gardés compressés (core/chunk_memory.py)
+        self.chunk_memory = ChunkMemory(self)
+
+        # Anneaux de terrain lointain et maillages provisoires des chunks en cours de génération
+        self.far_terrain = FarTerrain(self)
+
+    def queue_chunk(self, cx, cz, priority):
+        """Génère puis maille le chunk en tâches de fond ; son batch est créé par le thread principal."""
+        chunk_data = self.chunks[(cx, cz)] = {'status': 'generating'}
+        generate = Job(GENERATE, lambda: self.generate_chunk_data(cx, cz, chunk_data), priority)
+        mesh = Job(MESH, lambda: self.build_chunk_mesh(cx, cz), priority,
+                   complete=lambda mesh_data: self.finish_chunk(cx, cz, chunk_data, mesh_data), depends_on=[generate])
+        self.chunk_jobs[(cx, cz)] = (generate, mesh)
+        self.jobs.submit(generate)
+        self.jobs.submit(mesh)
+
+    def reprioritize_chunk(self, cx, cz, priority):
+        for job in self.chunk_jobs.get((cx, cz), ()):
+            self.jobs.reprioritize(job, priority)
+
+    def generate_chunk_data(self, cx, cz, chunk_data):
+        """Worker : blocs et masque de grottes du chunk, ajoutés au monde s'il n'a pas été déchargé entre-temps."""
+        chunk = self.load_chunk(cx, cz)
+        if self.chunks.get((cx, cz)) is not chunk_data:
+            return # Déchargé pendant la génération (ses tâches sont annulées)
+        self.cave_masks[(cx, cz)] = chunk.cave_mask
+        self.blocks.update(chunk.blocks)
+        chunk_data['blocks'] = chunk.blocks
+        chunk_data['status'] = 'meshing'
+
+    def finish_chunk(self, cx, cz, chunk_data, mesh_data):
+        """Thread principal : batches du chunk maillé."""
+        self.chunk_jobs.pop((cx, cz), None)
+        if self.chunks.get((cx, cz)) is chunk_data:
+            self.create_chunk_batches(cx, cz, mesh_data)
+            chunk_data['status'] = 'rendered'
+
+    def queue_sprites(self, cx, cz, priority):
+        sprite_chunk = self.sprite_chunks[(cx, cz)] = {'status': 'queued'}
+        self.sprite_jobs[(cx, cz)] = self.jobs.submit(Job(
+            SPRITE, lambda: self.generate_sprite_mesh(cx, cz, sprite_chunk), priority,
+            complete=lambda mesh_data: self.finish_sprites(cx, cz, sprite_chunk, mesh_data)))
+
+    def generate_sprite_mesh(self, cx, cz, sprite_chunk):
+        """Worker : sprites du chunk et leur maillage (None si le chunk n'en a pas)."""
+        sprite_chunk['status'] = 'generating'
+        sprites_in_chunk = self.sprites.generate_for_chunk(cx, cz, self.get_chunk_columns(cx, cz))
+        if not sprites_in_chunk:
+            sprite_chunk['status'] = 'empty'
+            return None
+        sprite_chunk['sprites'] = sprites_in_chunk
+        sprite_chunk['status'] = 'meshing'
+        return self.build_sprite_mesh(sprites_in_chunk, perpendicular=True)
+
+    def finish_sprites(self, cx, cz, sprite_chunk, mesh_data):
+        """Thread principal : batches des sprites du chunk."""
+        self.sprite_jobs.pop((cx, cz), None)
+        if mesh_data is not None and self.sprite_chunks.get((cx, cz)) is sprite_chunk:
+            self.create_sprite_batches(cx, cz, mesh_data)
+            sprite_chunk['status'] = 'rendered'
+
+    def load_chunk(self, cx, cz):
+        """Données du chunk (sans sprites) : prégénérées si la base en a, générées sinon."""
+        chunk = self.store.load(cx, cz) if self.store else None
+        if chunk is None:
+            chunk = self.generator.generate_chunk(cx, cz, columns=self.get_chunk_columns(cx, cz), with_sprites=False)
+        else:
+            self.chunk_columns.setdefault((cx, cz), chunk.columns)
+        return chunk
+
+    def get_chunk_columns(self, cx, cz):
+        """
+        Hauteurs (chunk + une colonne de marge), biomes et arbres des colonnes d'un chunk.
+        Calculés une seule fois par le premier worker qui en a besoin, puis réutilisés par l'autre.
+        """
+        columns = self.chunk_columns.get((cx, cz))
+        if columns is not None:
+            return columns
+
+        columns = self.generator.chunk_columns(cx, cz)
+        self.chunk_columns[(cx, cz)] = columns
+        return columns
+
+    def is_cave(self, pos):
+        """True si la génération creuse une grotte en pos (réutilise le masque du chunk quand il existe)."""
+        x, y, z = pos
+        return self.generator.is_cave(pos, self.cave_masks.get((int(x // CHUNK_SIZE), int(z // CHUNK_SIZE))))
 
-        # Démarrer les workers pour le terrain et les sprites
-        threading.Thread(target=self.chunk_generation_worker, daemon=True).start()
-        threading.Thread(target=self.sprite_generation_worker, daemon=True).start()
-
-    def chunk_generation_worker(self):
-        while True:
-            cx, cz, player_chunk_x, player_chunk_z = self.chunk_generation_queue.get()
-            if (cx, cz) in self.chunks and self.chunks[(cx, cz)].get('status') != 'generating':
-                continue
-
-            chunk_blocks = {}
-
-            # Pre-calculate heights in and around the chunk to avoid redundant noise calls
-            surface_heights = {}
-            for local_x in range(-1, CHUNK_SIZE + 1):
-                for local_z in range(-1, CHUNK_SIZE + 1):
-                    world_x, world_z = cx * CHUNK_SIZE + local_x, cz * CHUNK_SIZE + local_z
-                    surface_heights[(world_x, world_z)] = self.get_height(world_x, world_z)
-
-            for x in range(cx * CHUNK_SIZE, (cx + 1) * CHUNK_SIZE):
-                for z in range(cz * CHUNK_SIZE, (cz + 1) * CHUNK_SIZE):
-                    h = surface_heights.get((x, z), 0)
-                    biome_info = self.get_biome(x, z)
-                    biome = biome_info["name"]
-
-                    # Determine block types based on biome
-                    block_type_top = biome
-                    if biome in ["desert", "savanna"]:
-                        block_type_base = biome
-                    elif biome in ["tundra", "snow", "taiga"]:
-                        block_type_base = "stone"
-                    else:
-                        block_type_base = "dirt"
-
-                    if h < 0:
-                        block_type_top = "sea_floor"
-                        block_type_base = "sea_floor"
-
-                    # Generate the surface block
-                    chunk_blocks[(x, h, z)] = block_type_top
-
-                    # Generate trees on the surface
-                    if h > 0 and self.vegetation.has_tree(x, z, biome):
-                        self.vegetation.generate(chunk_blocks, x, z, h + 1, biome)
-
-                    # Get neighbor heights from the pre-calculated map
-                    h_xp = surface_heights.get((x + 1, z), h)
-                    h_xm = surface_heights.get((x - 1, z), h)
-                    h_zp = surface_heights.get((x, z + 1), h)
-                    h_zm = surface_heights.get((x, z - 1), h)
-
-                    # Find the minimum height among the column and its direct neighbors
-                    min_neighbor_h = min(h, h_xp, h_xm, h_zp, h_zm)
-
-                    # Fill downwards from the surface to seal any side-holes
-                    for y in range(h - 1, min_neighbor_h - 1, -1):
-                        chunk_blocks[(x, y, z)] = block_type_base if y >= 0 else "sea_floor"
-
-            # Carve caves using 3D noise
-            for pos in list(chunk_blocks.keys()):
-                x, y, z = pos
-                surface_h = surface_heights.get((x, z), 0)
-                # Don't carve near the surface or in water
-                if y >= surface_h - 3 or y < 0:
-                    continue
-
-                # 3D noise for caves
-                cave_noise = noise.pnoise3(x * 0.05, y * 0.05, z * 0.05, octaves=2, base=self.seed + 2)
-
-                if cave_noise > 0.6:
-                    del chunk_blocks[pos]
-
-            self.blocks.update(chunk_blocks)
-            self.chunks[(cx, cz)] = {'blocks': chunk_blocks, 'status': 'meshing'}
-
-            mesh_data = self.build_chunk_mesh(cx, cz)
-            self.chunk_batch_creation_queue.put((cx, cz, mesh_data))
-
-    def sprite_generation_worker(self):
-        while True:
-            cx, cz, player_chunk_x, player_chunk_z = self.sprite_generation_queue.get()
-            if (cx, cz) in self.sprite_chunks and self.sprite_chunks[(cx, cz)].get('status') not in ['queued', 'generating']:
-                continue
-
-            if abs(cx - player_chunk_x) <= SPRITE_RENDER_DISTANCE and abs(cz - player_chunk_z) <= SPRITE_RENDER_DISTANCE:
-                self.sprite_chunks[(cx, cz)] = {'status': 'generating'}
-                sprites_in_chunk = self.sprites.generate_for_chunk(cx, cz, self.get_height, self.get_biome_name)
-
-                if sprites_in_chunk:
-                    self.sprite_chunks[(cx, cz)]['sprites'] = sprites_in_chunk
-                    self.sprite_chunks[(cx, cz)]['status'] = 'meshing'
-                    mesh_data = self.build_sprite_mesh(sprites_in_chunk, perpendicular=True)
-                    self.sprite_batch_creation_queue.put((cx, cz, mesh_data))
-                else:
-                    self.sprite_chunks[(cx, cz)]['status'] = 'empty'
-
-    def update(self, dt, player_pos):
+    def update(self, dt, player_pos, player_velocity=None):
+        """Tick de simulation : chunks et sprites à générer, animaux, compression et déchargement des chunks."""
         chunk_x = int(player_pos[0] // CHUNK_SIZE)
         chunk_z = int(player_pos[2] // CHUNK_SIZE)
+        self.player_chunk = (chunk_x, chunk_z)
 
-        # Génération des chunks de terrain
-        for dx in range(-RENDER_DISTANCE, RENDER_DISTANCE + 1):
-            for dz in range(-RENDER_DISTANCE, RENDER_DISTANCE + 1):
+        # Génération des chunks de terrain (la distance peut changer en jeu : seuls les chunks manquants sont demandés)
+        render_distance = config.RENDER_DISTANCE
+        for dx in range(-render_distance, render_distance + 1):
+            for dz in range(-render_distance, render_distance + 1):
                 cx, cz = chunk_x + dx, chunk_z + dz
                 if (cx, cz) not in self.chunks:
-                    self.chunks[(cx, cz)] = {'status': 'generating'}
-                    self.chunk_generation_queue.put((cx, cz, chunk_x, chunk_z))
+                    self.queue_chunk(cx, cz, max(abs(dx), abs(dz)))
+                elif (cx, cz) in self.prefetched:
+                    # Un chunk préchargé entre dans la fenêtre : il reprend la priorité normale s'il attend encore
+                    self.prefetched.discard((cx, cz))
+                    self.reprioritize_chunk(cx, cz, max(abs(dx), abs(dz)))
+
+        if player_velocity is not None:
+            self.prefetch(player_pos, player_velocity, chunk_x, chunk_z)
 
         # Génération des sprites (par chunk)
-        for dx in range(-SPRITE_RENDER_DISTANCE, SPRITE_RENDER_DISTANCE + 1):
-            for dz in range(-SPRITE_RENDER_DISTANCE, SPRITE_RENDER_DISTANCE + 1):
+        sprite_distance = config.SPRITE_RENDER_DISTANCE
+        for dx in range(-sprite_distance, sprite_distance + 1):
+            for dz in range(-sprite_distance, sprite_distance + 1):
                 cx, cz = chunk_x + dx, chunk_z + dz
                 if (cx, cz) not in self.sprite_chunks:
-                    self.sprite_chunks[(cx, cz)] = {'status': 'queued'}
-                    self.sprite_generation_queue.put((cx, cz, chunk_x, chunk_z))
+                    self.queue_sprites(cx, cz, max(abs(dx), abs(dz)))
 
-        # Mise à jour des animaux (par entité)
+        # Mise à jour des animaux (tous ensemble, sur le relief naturel du terrain)
         world_info_funcs = {
             "get_height": self.get_height,
-            "get_biome": self.get_biome_name,
-            "is_solid": self.is_solid
+            "get_biome": self.get_biome_name
         }
         self.animals.update(dt, player_pos, world_info_funcs)
 
-        # Création des batches de terrain (depuis le worker)
-        while not self.chunk_batch_creation_queue.empty():
-            cx, cz, mesh_data = self.chunk_batch_creation_queue.get()
-            chunk_data = self.chunks.get((cx, cz))
-            if chunk_data:
-                self.create_chunk_batches(cx, cz, mesh_data)
-                chunk_data['status'] = 'rendered'
-
-        # Création des batches de sprites (depuis le worker)
-        while not self.sprite_batch_creation_queue.empty():
-            cx, cz, mesh_data = self.sprite_batch_creation_queue.get()
-            sprite_chunk_data = self.sprite_chunks.get((cx, cz))
-            if sprite_chunk_data:
-                self.create_sprite_batches(cx, cz, mesh_data)
-                sprite_chunk_data['status'] = 'rendered'
+        # Compression des chunks inactifs
+        self.chunk_memory.update(chunk_x, chunk_z)
 
         self.cleanup_chunks(player_pos)
+        # Budget mémoire : les blocs (non évinçables) ont pu grandir sans passer par un cache
+        memory_governor.enforce_if_over()
+
+    def update_frame(self, alpha=1.0):
+        """Une fois par frame, avant le rendu : envois au GPU et positions interpolées des animaux."""
+        # Batches des tâches finies (terrain, sprites, terrain lointain), les plus proches d'abord,
+        # dans la limite du budget de la frame : le reste attend la suivante
+        self.jobs.run_completions(JOB_FRAME_BUDGET_MS / 1000.0)
+
+        # Terrain lointain et maillages provisoires (retirés dans la frame où le chunk complet est rendu)
+        if self.player_chunk is not None:
+            self.far_terrain.update(*self.player_chunk)
+
+        self.animals.interpolate(alpha)
+
+    def prefetch(self, player_pos, player_velocity, chunk_x, chunk_z):
+        """
+        Demande, avec une priorité plus basse que la fenêtre de rendu, les chunks qui y entreront le long de la
+        trajectoire prévue (position + vitesse * t, pour t jusqu'à PREFETCH_LOOKAHEAD secondes).
+        """
+        vx, vz = player_velocity[0], player_velocity[2]
+        speed = math.hypot(vx, vz)
+        if speed < PREFETCH_MIN_SPEED or speed > PREFETCH_MAX_SPEED:
+            return
+        sector = round(math.atan2(vz, vx) / (2 * math.pi) * PREFETCH_SECTORS) % PREFETCH_SECTORS
+        render_distance = config.RENDER_DISTANCE
+        key = (chunk_x, chunk_z, sector, render_distance)
+        if key == self.prefetch_key:
+            return
+        self.prefetch_key = key
+
+        # Un échantillon par chunk parcouru ; les fenêtres prévues sont ajoutées dans l'ordre du temps
+        predicted = []
+        seen = set()
+        steps = int(PREFETCH_LOOKAHEAD * speed / CHUNK_SIZE)
+        for step in range(1, steps + 1):
+            t = step * CHUNK_SIZE / speed
+            pcx = int((player_pos[0] + vx * t) // CHUNK_SIZE)
+            pcz = int((player_pos[2] + vz * t) // CHUNK_SIZE)
+            window = [(pcx + dx, pcz + dz) for dx in range(-render_distance, render_distance + 1)
+                      for dz in range(-render_distance, render_distance + 1)
+                      if max(abs(pcx + dx - chunk_x), abs(pcz + dz - chunk_z)) > render_distance]
+            window.sort(key=lambda coord: max(abs(coord[0] - pcx), abs(coord[1] - pcz)))
+            for coord in window:
+                if coord not in seen and len(predicted) < PREFETCH_MAX_CHUNKS:
+                    seen.add(coord)
+                    predicted.append((step, coord))
+
+        # Les chunks préchargés pour une autre trajectoire sont libérés par cleanup_chunks
+        self.prefetched &= seen
+        for step, (cx, cz) in predicted:
+            self.prefetched.add((cx, cz))
+            if (cx, cz) not in self.chunks:
+                self.queue_chunk(cx, cz, render_distance + step)
 
     def _rebuild_chunk(self, cx, cz):
         # Re-mesh the chunk and update its batch. This is synchronous.
@@ -188,6 +267,8 @@ class World:
 
         x, y, z = pos
         cx, cz = int(x // CHUNK_SIZE), int(z // CHUNK_SIZE)
+        self.chunk_memory.touch_area(cx, cz) # Le chunk et ses voisins remaillés doivent avoir leurs blocs
+        self.chunk_memory.edited.add((cx, cz))
 
         # Add to global and chunk-specific block lists
         self.blocks[pos] = block_type
@@ -208,6 +289,8 @@ class World:
             self._rebuild_chunk(cx, cz + 1)
 
     def remove_block(self, pos):
+        # Le chunk et ses voisins (blocs révélés, remaillage) doivent avoir leurs blocs
+        self.chunk_memory.touch_area(int(pos[0] // CHUNK_SIZE), int(pos[2] // CHUNK_SIZE))
         if pos not in self.blocks:
             return
 
@@ -237,6 +320,8 @@ class World:
             ncx, ncz = int(n_pos[0] // CHUNK_SIZE), int(n_pos[2] // CHUNK_SIZE)
             chunks_to_rebuild.add((ncx, ncz))
 
+        # Blocs révélés compris : ces chunks ne peuvent plus être régénérés à l'identique
+        self.chunk_memory.edited.update(chunks_to_rebuild)
         for chunk_coord in chunks_to_rebuild:
             self._rebuild_chunk(chunk_coord[0], chunk_coord[1])
 
@@ -267,22 +352,12 @@ class World:
         if not is_exposed:
             return # Not exposed, no need to generate
 
+        if self.is_cave(pos):
+            return # Carved by a cave: stays open
+
         # If we get here, the block is missing, not player-destroyed, below the surface, and exposed.
         # We should generate it.
-        biome_info = self.get_biome(x, z)
-        biome = biome_info["name"]
-
-        if y == h:
-            block_type = biome if h >= 0 else "sea_floor"
-        else: # y < h
-            if h < 0:
-                block_type = "sea_floor"
-            elif biome in ["desert", "savanna"]:
-                block_type = biome
-            elif biome in ["tundra", "snow", "taiga"]:
-                block_type = "stone"
-            else:
-                block_type = "dirt"
+        block_type = self.generator.natural_block(x, y, z, h)
 
         # Add the new block to the world data
         cx, cz = int(x // CHUNK_SIZE), int(z // CHUNK_SIZE)
@@ -292,46 +367,49 @@ class World:
 
 
     def build_chunk_mesh(self, cx, cz):
+        # Verrou tenu pendant tout le maillage : la compression (thread principal) ne retire pas les blocs lus
+        with self.chunk_memory.lock:
+            return self._build_chunk_mesh(cx, cz)
+
+    def _build_chunk_mesh(self, cx, cz):
+        self.chunk_memory.touch_area(cx, cz) # Blocs du chunk et de ses voisins (faces cachées aux bords)
         chunk_data = self.chunks.get((cx, cz))
         if not chunk_data or 'blocks' not in chunk_data:
             return {}
 
-        vertex_data_by_texture = {}
+        vertex_data_by_layer = {}
 
+        # Dans l'ordre de core.blocks.FACES : (direction, sommets, coordonnées de texture)
         faces = [
-            ("front", ((-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (-0.5, 0.5, 0.5))),
-            ("back", ((0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (0.5, 0.5, -0.5))),
-            ("left", ((-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5), (-0.5, 0.5, 0.5), (-0.5, 0.5, -0.5))),
-            ("right", ((0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, 0.5, 0.5))),
-            ("top", ((-0.5, 0.5, 0.5), (0.5, 0.5, 0.5), (0.5, 0.5, -0.5), (-0.5, 0.5, -0.5))),
-            ("bottom", ((-0.5, -0.5, -0.5), (0.5, -0.5, -0.5), (0.5, -0.5, 0.5), (-0.5, -0.5, 0.5)))
+            ((0, 0, 1), ((-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (-0.5, 0.5, 0.5)), (0, 0, 1, 0, 1, 1, 0, 1)),
+            ((0, 0, -1), ((0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (0.5, 0.5, -0.5)), (1, 0, 0, 0, 0, 1, 1, 1)),
+            ((-1, 0, 0), ((-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5), (-0.5, 0.5, 0.5), (-0.5, 0.5, -0.5)), (1, 0, 0, 0, 0, 1, 1, 1)),
+            ((1, 0, 0), ((0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, 0.5, 0.5)), (0, 0, 1, 0, 1, 1, 0, 1)),
+            ((0, 1, 0), ((-0.5, 0.5, 0.5), (0.5, 0.5, 0.5), (0.5, 0.5, -0.5), (-0.5, 0.5, -0.5)), (0, 1, 1, 1, 1, 0, 0, 0)),
+            ((0, -1, 0), ((-0.5, -0.5, -0.5), (0.5, -0.5, -0.5), (0.5, -0.5, 0.5), (-0.5, -0.5, 0.5)), (0, 0, 1, 0, 1, 1, 0, 1))
         ]
 
-        tex_coords = {
-            "front": (0, 0, 1, 0, 1, 1, 0, 1),
-            "back": (1, 0, 0, 0, 0, 1, 1, 1),
-            "left": (1, 0, 0, 0, 0, 1, 1, 1),
-            "right": (0, 0, 1, 0, 1, 1, 0, 1),
-            "top": (0, 1, 1, 1, 1, 0, 0, 0),
-            "bottom": (0, 0, 1, 0, 1, 1, 0, 1)
-        }
-
+        blocks = self.blocks
+        face_layers = block_registry.face_layers
+        transparent = block_registry.transparent
+        layer_textures = self.layer_textures
         for (x, y, z), block_type in chunk_data['blocks'].items():
-            texture = self.textures.get(block_type)
-            if texture is None: continue
-            if texture not in vertex_data_by_texture: vertex_data_by_texture[texture] = {'positions': [], 'tex_coords': [], 'indices': [], 'colors': [], 'count': 0}
-            mesh_data = vertex_data_by_texture[texture]
-            for face_name, face_verts in faces:
-                direction = self.get_direction_from_face_name(face_name)
-                neighbor_pos = (x + direction[0], y + direction[1], z + direction[2])
-                if self.blocks.get(neighbor_pos, 'air') != 'air': continue
+            base = block_type * FACE_COUNT
+            for face, (direction, face_verts, face_tex_coords) in enumerate(faces):
+                # Une face est cachée par un voisin opaque, ou par un voisin transparent du même type
+                neighbor = blocks.get((x + direction[0], y + direction[1], z + direction[2]), AIR)
+                if neighbor != AIR and (not transparent[neighbor] or neighbor == block_type): continue
+                layer = face_layers[base + face]
+                if layer_textures[layer] is None: continue
+                mesh_data = vertex_data_by_layer.get(layer)
+                if mesh_data is None: mesh_data = vertex_data_by_layer[layer] = {'positions': [], 'tex_coords': [], 'indices': [], 'colors': [], 'count': 0}
                 for vert in face_verts: mesh_data['positions'].extend((x + vert[0], y + vert[1], z + vert[2]))
-                mesh_data['tex_coords'].extend(tex_coords[face_name])
+                mesh_data['tex_coords'].extend(face_tex_coords)
                 mesh_data['colors'].extend((1.0, 1.0, 1.0) * 4)
                 vc = mesh_data['count']
                 mesh_data['indices'].extend((vc, vc + 1, vc + 2, vc, vc + 2, vc + 3))
                 mesh_data['count'] += 4
-        return vertex_data_by_texture
+        return vertex_data_by_layer
 
     def build_sprite_mesh(self, sprites_in_chunk, perpendicular=True):
         vertex_data_by_texture = {}
@@ -403,21 +481,13 @@ class World:
 
         return vertex_data_by_texture
 
-    def get_direction_from_face_name(self, face_name):
-        if face_name == "front": return (0, 0, 1)
-        if face_name == "back": return (0, 0, -1)
-        if face_name == "left": return (-1, 0, 0)
-        if face_name == "right": return (1, 0, 0)
-        if face_name == "top": return (0, 1, 0)
-        if face_name == "bottom": return (0, -1, 0)
-        return (0, 0, 0)
-
-    def create_chunk_batches(self, cx, cz, mesh_data_by_texture):
+    def create_chunk_batches(self, cx, cz, mesh_data_by_layer):
         self.chunk_batches[(cx, cz)] = {}
-        for texture, mesh_data in mesh_data_by_texture.items():
+        for layer, mesh_data in mesh_data_by_layer.items():
             if not mesh_data['indices']: continue
+            texture = self.layer_textures[layer]
             batch = pyglet.graphics.Batch()
-            self.program.vertex_list_indexed(mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, None, position=('f', mesh_data['positions']), tex_coords=('f', mesh_data['tex_coords']), colors=('f', mesh_data['colors']))
+            self.program.vertex_list_indexed(mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, render_state.group(self.program), position=('f', mesh_data['positions']), tex_coords=('f', mesh_data['tex_coords']), colors=('f', mesh_data['colors']))
             self.chunk_batches[(cx, cz)][texture] = batch
 
     def create_sprite_batches(self, cx, cz, mesh_data_by_texture):
@@ -425,7 +495,7 @@ class World:
         for texture, mesh_data in mesh_data_by_texture.items():
             if not mesh_data['indices']: continue
             batch = pyglet.graphics.Batch()
-            self.program.vertex_list_indexed(mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, None, position=('f', mesh_data['positions']), tex_coords=('f', mesh_data['tex_coords']), colors=('f', mesh_data['colors']))
+            self.program.vertex_list_indexed(mesh_data['count'], pyglet.gl.GL_TRIANGLES, mesh_data['indices'], batch, render_state.group(self.program), position=('f', mesh_data['positions']), tex_coords=('f', mesh_data['tex_coords']), colors=('f', mesh_data['colors']))
             self.sprite_batches[(cx, cz)][texture] = batch
 
     def get_biome_label(self, player_pos):
@@ -433,142 +503,103 @@ class World:
         return f"Biome: {biome_name.capitalize()}"
 
     def get_height(self, x, z):
-        # Base terrain noise for rolling hills
-        base = noise.pnoise2(x * 0.01, z * 0.01, octaves=20, base=self.seed)
-
-        # Mountain noise for major elevation changes
-        mountain_noise = noise.pnoise2(x * 0.01, z * 0.01, octaves=4, base=self.seed + 1)
-        ridge_noise = noise.pnoise2(x * 0.01, z * 0.01, octaves=4, base=self.seed + 2)
-
-        # Remap mountain noise from [-1, 1] to a [0, 1] intensity, starting from a threshold
-        # This creates a smooth transition from plains to mountains instead of a sharp cliff
-        mountain_threshold = 0.0001
-        mountain_intensity = (mountain_noise - mountain_threshold) / (1.0 - mountain_threshold)
-        mountain_intensity = max(0, mountain_intensity)
-
-        # Add ridge detail to mountain intensity
-        ridge_threshold = 0.001
-        ridge_intensity = (ridge_noise - ridge_threshold) / (1.0 - ridge_threshold)
-        ridge_intensity = max(0, ridge_intensity)
-
-        # Shape the intensity curve to make foothills less steep and peaks more dramatic
-        mountain_elevation = pow(mountain_intensity, 2) * 500
-        ridge_elevation = pow(ridge_intensity, 2) * -150
-
-        # Combine base terrain with mountains
-        final_height = (base * -10) + mountain_elevation + ridge_elevation + 10
-
-        return int(final_height)
+        return self.generator.get_height(x, z)
 
     def cleanup_chunks(self, player_pos):
         to_delete = []
         player_chunk_x = int(player_pos[0] // CHUNK_SIZE)
         player_chunk_z = int(player_pos[2] // CHUNK_SIZE)
+        render_distance = config.RENDER_DISTANCE
 
         for (cx, cz) in list(self.chunks.keys()):
-            if abs(cx - player_chunk_x) > RENDER_DISTANCE or abs(cz - player_chunk_z) > RENDER_DISTANCE:
+            if max(abs(cx - player_chunk_x), abs(cz - player_chunk_z)) > render_distance and (cx, cz) not in self.prefetched:
                 to_delete.append((cx, cz))
 
         for key in to_delete:
-            self.chunks.pop(key, None)
+            for job in self.chunk_jobs.pop(key, ()):
+                job.cancel()
+            sprite_job = self.sprite_jobs.pop(key, None)
+            if sprite_job is not None:
+                sprite_job.cancel()
+            chunk_data = self.chunks.pop(key, None)
+            if chunk_data and 'blocks' in chunk_data:
+                for pos in chunk_data['blocks']:
+                    self.blocks.pop(pos, None)
             self.chunk_batches.pop(key, None)
             self.sprite_chunks.pop(key, None)
             self.sprite_batches.pop(key, None)
-
-    def draw(self, player_pos):
+            self.chunk_columns.pop(key, None)
+            self.cave_masks.pop(key, None)
+            self.chunk_memory.forget(*key)
+
+        # Un chunk rechargé est régénéré : les destructions de blocs qu'il contenait ne servent plus
+        if to_delete and self.destroyed_blocks:
+            unloaded = set(to_delete)
+            self.destroyed_blocks = {pos for pos in self.destroyed_blocks
+                                     if (int(pos[0] // CHUNK_SIZE), int(pos[2] // CHUNK_SIZE)) not in unloaded}
+
+    def _draw_batches_by_texture(self, batches_by_chunk, player_chunk_x, player_chunk_z, distance):
+        # Regroupe les batches visibles par texture : un seul bind par texture et par frame
+        batches_by_texture = {}
+        for dx in range(-distance, distance + 1):
+            for dz in range(-distance, distance + 1):
+                chunk_batches = batches_by_chunk.get((player_chunk_x + dx, player_chunk_z + dz))
+                if chunk_batches:
+                    for texture, batch in chunk_batches.items():
+                        batches_by_texture.setdefault(texture, []).append(batch)
+
+        render_state.use_program(self.program)
+        render_state.set_uniform(self.program, 'our_texture', 0)
+        for texture, batches in batches_by_texture.items():
+            render_state.bind_texture(texture.target, texture.id)
+            for batch in batches:
+                batch.draw()
+
+    def draw(self, player_pos, projection, view, fog_color, fog_start, fog_end):
         player_chunk_x = int(player_pos[0] // CHUNK_SIZE)
         player_chunk_z = int(player_pos[2] // CHUNK_SIZE)
 
         # Dessin des chunks
-        for dx in range(-RENDER_DISTANCE, RENDER_DISTANCE + 1):
-            for dz in range(-RENDER_DISTANCE, RENDER_DISTANCE + 1):
-                cx, cz = player_chunk_x + dx, player_chunk_z + dz
-                if (cx, cz) in self.chunk_batches:
-                    for texture, batch in self.chunk_batches[(cx, cz)].items():
-                        pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0)
-                        pyglet.gl.glBindTexture(texture.target, texture.id)
-                        self.program['our_texture'] = 0
-                        batch.draw()
+        self._draw_batches_by_texture(self.chunk_batches, player_chunk_x, player_chunk_z, config.RENDER_DISTANCE)
+        self.far_terrain.draw()
 
         # Dessin des sprites et animaux
-        pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
-        pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
-        pyglet.gl.glDisable(pyglet.gl.GL_CULL_FACE)
+        render_state.enable(pyglet.gl.GL_BLEND)
+        render_state.blend_func(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+        render_state.disable(pyglet.gl.GL_CULL_FACE)
 
         # Dessin des sprites (par chunk)
-        for dx in range(-SPRITE_RENDER_DISTANCE, SPRITE_RENDER_DISTANCE + 1):
-            for dz in range(-SPRITE_RENDER_DISTANCE, SPRITE_RENDER_DISTANCE + 1):
-                cx, cz = player_chunk_x + dx, player_chunk_z + dz
-                if (cx, cz) in self.sprite_batches:
-                    for texture, batch in self.sprite_batches[(cx, cz)].items():
-                        pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0)
-                        pyglet.gl.glBindTexture(texture.target, texture.id)
-                        self.program['our_texture'] = 0
-                        batch.draw()
-
-        # Dessin des animaux (batch unique)
-        self.animals.draw() # Added
-
-        pyglet.gl.glEnable(pyglet.gl.GL_CULL_FACE)
-        pyglet.gl.glDisable(pyglet.gl.GL_BLEND)
-
-    def normalize_to_uniform_simple(self, noise_value):
-        normalized = (noise_value + 1) / 2
-        return 1 / (1 + math.exp(-10 * (normalized - 0.5)))
-
-    def get_biome_name(self, x, z):
-        return self.get_biome(x, z)["name"]
+        self._draw_batches_by_texture(self.sprite_batches, player_chunk_x, player_chunk_z, config.SPRITE_RENDER_DISTANCE)
 
-    def get_biome(self, x, z, biome_scale=1000.0):
-        seed = self.seed
-        octaves = 100
-
-        temp_raw = noise.pnoise2(x / biome_scale, z / biome_scale, octaves=octaves, base=seed)
-        humid_raw = noise.pnoise2((x + 1000) / biome_scale, (z + 1000) / biome_scale, octaves=octaves, base=seed + 10)
+        # Dessin des animaux (rendu instancié, programme dédié)
+        self.animals.draw(projection, view, fog_color, fog_start, fog_end)
 
-        temp = self.normalize_to_uniform_simple(temp_raw)
-        humid = self.normalize_to_uniform_simple(humid_raw)
+        render_state.enable(pyglet.gl.GL_CULL_FACE)
+        render_state.disable(pyglet.gl.GL_BLEND)
 
-        biome_name = "plains"
-        if temp < 0.35:
-            if humid < 0.5:
-                biome_name = "tundra"
-            else:
-                biome_name = "snow"
-        elif temp < 0.50:
-            if humid < 0.4:
-                biome_name = "taiga"
-            else:
-                biome_name = "forest"
-        elif temp < 0.60:
-            if humid < 0.4:
-                biome_name = "plains"
-            else:
-                biome_name = "forest"
-        elif temp < 0.70:
-            if humid < 0.40:
-                biome_name = "savanna"
-            else:
-                biome_name = "forest"
-        else:
-            if humid < 0.5:
-                biome_name = "desert"
-            else:
-                biome_name = "jungle"
+    def get_biome_name(self, x, z):
+        return self.generator.get_biome_name(x, z)
 
-        return {"name": biome_name, "temp": temp, "humid": humid}
+    def get_biome(self, x, z, biome_scale=1000.0):
+        return self.generator.get_biome(x, z, biome_scale)
 
     def get_biome_at_chunk_center(self, cx, cz):
-        center_x = cx * CHUNK_SIZE + CHUNK_SIZE // 2
-        center_z = cz * CHUNK_SIZE + CHUNK_SIZE // 2
-
-        height_at_center = self.get_height(center_x, center_z)
-
-        if height_at_center < 0:
-            return "sea_floor"
-
-        return self.get_biome_name(center_x, center_z)
+        return self.generator.get_biomes_at_chunk_centers([(cx, cz)])[0]
+
+    def get_biomes_at_chunk_centers(self, chunk_coords):
+        """Version par lot de get_biome_at_chunk_center (utilisée par la minimap)."""
+        return self.generator.get_biomes_at_chunk_centers(chunk_coords)
+
+    def get_block(self, position):
+        """
+        Bloc en position (None pour l'air), en décompressant son chunk s'il l'est. Un chunk abandonné par le budget
+        mémoire est régénéré en tâche de fond : d'ici là, il est vu comme non chargé (air), comme un chunk en cours
+        de génération.
+        """
+        block_type = self.blocks.get(position)
+        if block_type is None and self.chunk_memory.has_inactive() and self.chunk_memory.touch_position(position):
+            block_type = self.blocks.get(position)
+        return block_type
 
     def is_solid(self, position):
-        block_type = self.blocks.get(position)
-        return block_type is not None
+        return block_registry.solid[self.get_block(position) or AIR] == 1
@@ -0,0 +1,99 @@
+import sys
+import time
+import signal
+import argparse
+import multiprocessing
+from worldgen import get_generator
+from worldgen.storage import ChunkStore, encode_chunk
+
+# Prégénération d'une zone du monde (par exemple le spawn d'un serveur) dans worldgen/storage.
+# Les chunks déjà présents sont sautés : relancer la même commande reprend là où elle s'était arrêtée.
+
+COMMIT_INTERVAL = 1.0 # Secondes entre deux écritures en base (et deux lignes de progression)
+
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C est géré par le processus principal
+
+
+def _generate(job):
+    """Exécuté dans un processus de travail : génère et encode un chunk."""
+    seed, cx, cz = job
+    return cx, cz, encode_chunk(get_generator(seed).generate_chunk(cx, cz))
+
+
+def chunk_area(args):
+    """Chunks demandés, du centre vers l'extérieur pour qu'une génération interrompue soit déjà utile."""
+    if args.rect:
+        x0, z0, x1, z1 = args.rect
+        coords = [(cx, cz) for cx in range(min(x0, x1), max(x0, x1) + 1) for cz in range(min(z0, z1), max(z0, z1) + 1)]
+        center_x, center_z = (x0 + x1) / 2, (z0 + z1) / 2
+    else:
+        radius = args.radius
+        coords = [(cx, cz) for cx in range(-radius, radius + 1) for cz in range(-radius, radius + 1)]
+        center_x = center_z = 0
+    coords.sort(key=lambda coord: max(abs(coord[0] - center_x), abs(coord[1] - center_z)))
+    return coords
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def pregenerate(args):
+    store = ChunkStore(args.seed, path=args.output, create=True)
+    requested = chunk_area(args)
+    existing = store.existing()
+    todo = [coord for coord in requested if coord not in existing]
+    print(f"{store.path} : {len(requested)} chunks demandés, {len(requested) - len(todo)} déjà générés, "
+          f"{len(todo)} à faire avec {args.workers} processus")
+    if not todo:
+        store.close()
+        return
+
+    done = 0
+    pending = []
+    start = last_commit = time.time()
+    pool = multiprocessing.Pool(args.workers, initializer=_init_worker)
+    try:
+        jobs = [(args.seed, cx, cz) for cx, cz in todo]
+        for result in pool.imap_unordered(_generate, jobs, chunksize=4):
+            pending.append(result)
+            done += 1
+            now = time.time()
+            if now - last_commit >= COMMIT_INTERVAL or done == len(todo):
+                store.save_many(pending)
+                pending = []
+                last_commit = now
+                rate = done / (now - start)
+                eta = (len(todo) - done) / rate if rate else 0
+                print(f"\r{done}/{len(todo)} chunks | {rate:.1f} chunks/s | ETA {format_duration(eta)}  ", end="", flush=True)
+        print()
+    except KeyboardInterrupt:
+        pool.terminate()
+        store.save_many(pending)
+        print(f"\nInterrompu après {done} chunks ; relancer la même commande pour reprendre.")
+        return
+    finally:
+        pool.close()
+        pool.join()
+        store.close()
+    elapsed = time.time() - start
+    print(f"Terminé : {done} chunks en {format_duration(elapsed)} ({done / elapsed:.1f} chunks/s)")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Prégénère une zone du monde dans worldgen/storage (sans fenêtre ni OpenGL).")
+    parser.add_argument("seed", type=int, help="seed du monde (entier, comme config.WORLD_SEED)")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--radius", type=int, help="rayon en chunks autour du chunk (0, 0)")
+    area.add_argument("--rect", type=int, nargs=4, metavar=("CX0", "CZ0", "CX1", "CZ1"), help="rectangle de chunks (bornes incluses)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="nombre de processus (par défaut : un par cœur)")
+    parser.add_argument("--output", help="fichier de la base (par défaut : celle que le jeu lit pour cette seed)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    pregenerate(parse_args(sys.argv[1:]))
@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import multiprocessing
+import numpy as np
+from worldgen import get_generator
+from worldgen.generator import BIOME_NAMES
+from worldgen.maps import MapCache, MAP_TILE_CHUNKS, TILE_DTYPE, UNKNOWN_BIOME, render_tile, tile_range
+from core.assets import ASSETS_PATH
+
+# Rendu hors jeu de la carte d'une zone du monde (biome et hauteur de chaque chunk) en pyramide de tuiles
+# (worldgen/maps.py). Une tuile par tâche, écrite directement par le processus qui l'a calculée :
+# le temps de rendu est divisé par le nombre de cœurs. Les tuiles déjà rendues sont sautées.
+
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C est géré par le processus principal
+
+
+def _render(job):
+    """Exécuté dans un processus de travail : calcule et écrit une tuile du niveau 0."""
+    seed, path, tx, tz = job
+    biomes, heights = render_tile(get_generator(seed), tx, tz)
+    MapCache(seed, path).write_tile(0, tx, tz, biomes, heights)
+    return tx, tz
+
+
+def _build_parent(job):
+    """Exécuté dans un processus de travail : réduit 4 tuiles d'un niveau en une du niveau suivant."""
+    seed, path, level, tx, tz = job
+    MapCache(seed, path).build_parent(level, tx, tz)
+    return tx, tz
+
+
+def chunk_rect(args):
+    """Rectangle de chunks demandé (bornes incluses)."""
+    if args.rect:
+        x0, z0, x1, z1 = args.rect
+        return min(x0, x1), min(z0, z1), max(x0, x1), max(z0, z1)
+    return -args.radius, -args.radius, args.radius, args.radius
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def biome_colors():
+    """Couleur moyenne de la texture de chaque biome (Pillow), grise si elle manque."""
+    from PIL import Image
+    colors = np.full((256, 3), 128, dtype=np.float32)
+    for index, name in enumerate(BIOME_NAMES):
+        path = os.path.join(ASSETS_PATH, f"{name}.png")
+        if os.path.exists(path):
+            colors[index] = np.asarray(Image.open(path).convert('RGB'), dtype=np.float32).reshape(-1, 3).mean(axis=0)
+    colors[UNKNOWN_BIOME] = 0
+    return colors
+
+
+def save_image(cache, rect, level, filename):
+    """Image PNG du rectangle au niveau `level` : couleur du biome, éclairée selon la pente du relief."""
+    from PIL import Image
+    x0, z0, x1, z1 = (c >> level for c in rect)
+    cells = np.zeros((x1 - x0 + 1, z1 - z0 + 1), dtype=TILE_DTYPE)
+    cells['biome'] = UNKNOWN_BIOME
+    for tx in range(x0 // MAP_TILE_CHUNKS, x1 // MAP_TILE_CHUNKS + 1):
+        for tz in range(z0 // MAP_TILE_CHUNKS, z1 // MAP_TILE_CHUNKS + 1):
+            tile = cache.tile(level, tx, tz)
+            if tile is None:
+                continue
+            i0, j0 = tx * MAP_TILE_CHUNKS, tz * MAP_TILE_CHUNKS
+            si = slice(max(x0, i0), min(x1 + 1, i0 + MAP_TILE_CHUNKS))
+            sj = slice(max(z0, j0), min(z1 + 1, j0 + MAP_TILE_CHUNKS))
+            cells[si.start - x0:si.stop - x0, sj.start - z0:sj.stop - z0] = tile[si.start - i0:si.stop - i0, sj.start - j0:sj.stop - j0]
+
+    heights = cells['height'].astype(np.float32)
+    shade = np.clip(1.0 + np.gradient(heights, axis=0) * 0.02, 0.6, 1.2)
+    rgb = biome_colors()[cells['biome']] * shade[..., None]
+    # Image en (z, x) : x vers la droite, z vers le bas
+    Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8).transpose(1, 0, 2)).save(filename)
+    print(f"{filename} : {rgb.shape[0]}x{rgb.shape[1]} pixels (niveau {level})")
+
+
+def run_jobs(pool, function, jobs, label):
+    """Exécute les tâches dans le pool en affichant la progression ; retourne le nombre de tâches terminées."""
+    done = 0
+    start = last_print = time.time()
+    for _ in pool.imap_unordered(function, jobs):
+        done += 1
+        now = time.time()
+        if now - last_print >= 1.0 or done == len(jobs):
+            last_print = now
+            rate = done / (now - start)
+            eta = (len(jobs) - done) / rate if rate else 0
+            print(f"\r{label} : {done}/{len(jobs)} tuiles | {rate:.2f} tuiles/s | ETA {format_duration(eta)}  ", end="", flush=True)
+    if jobs:
+        print()
+    return done
+
+
+def render_map(args):
+    cache = MapCache(args.seed, path=args.output, create=True)
+    rect = chunk_rect(args)
+    tiles = [(tx, tz) for tx in tile_range(rect[0], rect[2]) for tz in tile_range(rect[1], rect[3])]
+    todo = [(tx, tz) for tx, tz in tiles if not cache.has_tile(0, tx, tz)]
+    print(f"{cache.path} : {len(tiles)} tuiles de {MAP_TILE_CHUNKS}x{MAP_TILE_CHUNKS} chunks, "
+          f"{len(tiles) - len(todo)} déjà rendues, {len(todo)} à faire avec {args.workers} processus")
+
+    start = time.time()
+    pool = multiprocessing.Pool(args.workers, initializer=_init_worker)
+    try:
+        run_jobs(pool, _render, [(args.seed, cache.path, tx, tz) for tx, tz in todo], "niveau 0")
+        # Niveaux réduits : reconstruits sur toute la zone (c'est rapide), puisque de nouvelles tuiles ont pu y apparaître
+        for level in range(1, args.levels):
+            jobs = [(args.seed, cache.path, level, tx, tz)
+                    for tx in tile_range(rect[0], rect[2], level) for tz in tile_range(rect[1], rect[3], level)]
+            run_jobs(pool, _build_parent, jobs, f"niveau {level}")
+    except KeyboardInterrupt:
+        pool.terminate()
+        print("\nInterrompu ; relancer la même commande pour reprendre.")
+        return
+    finally:
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start
+    if todo:
+        chunks = len(todo) * MAP_TILE_CHUNKS * MAP_TILE_CHUNKS
+        print(f"Terminé : {chunks} chunks en {format_duration(elapsed)} ({chunks / elapsed:.0f} chunks/s)")
+    if args.image:
+        save_image(MapCache(args.seed, cache.path), rect, min(args.image_level, args.levels - 1), args.image)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Rend la carte des biomes et du relief d'une zone du monde (sans fenêtre ni OpenGL).")
+    parser.add_argument("seed", type=int, help="seed du monde (entier, comme config.WORLD_SEED)")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--radius", type=int, help="rayon en chunks autour du chunk (0, 0)")
+    area.add_argument("--rect", type=int, nargs=4, metavar=("CX0", "CZ0", "CX1", "CZ1"), help="rectangle de chunks (bornes incluses)")
+    parser.add_argument("--levels", type=int, default=5, help="niveaux de la pyramide, le niveau k ayant une cellule pour 2^k chunks (défaut : 5)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="nombre de processus (par défaut : un par cœur)")
+    parser.add_argument("--output", help="répertoire des tuiles (par défaut : celui que lit la minimap pour cette seed)")
+    parser.add_argument("--image", help="écrit aussi une image PNG de la zone (nécessite Pillow)")
+    parser.add_argument("--image-level", type=int, default=0, help="niveau de la pyramide utilisé pour l'image (défaut : 0)")
+    args = parser.parse_args(argv)
+    if args.levels < 1:
+        parser.error("--levels doit être au moins 1")
+    return args
+
+
+if __name__ == "__main__":
+    render_map(parse_args(sys.argv[1:]))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from core.perlin import pnoise2, pnoise3, pnoise2_batch, pnoise3_batch
+from worldgen.generator import Generator, BIOME_NAMES
+
+# Bases de toutes sortes : petites, au-delà de l'ancienne limite du portage (705), négatives, seeds de texte (32 bits)
+BASES = [0, 1, 42, 705, 706, 1000, 65536, -3, 2 ** 32 - 1]
+
+
+def random_points(count, scale, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-scale, scale, count), rng.uniform(-scale, scale, count), rng.uniform(-scale, scale, count)
+
+
+@pytest.mark.parametrize("base", BASES)
+@pytest.mark.parametrize("octaves", [1, 4, 20])
+def test_pnoise2_batch_matches_scalar(base, octaves):
+    xs, ys, _ = random_points(300, 300.0)
+    expected = [pnoise2(x, y, octaves=octaves, base=base) for x, y in zip(xs.tolist(), ys.tolist())]
+    assert pnoise2_batch(xs, ys, octaves=octaves, base=base).tolist() == expected
+
+
+@pytest.mark.parametrize("base", BASES)
+def test_pnoise3_batch_matches_scalar(base):
+    xs, ys, zs = random_points(300, 50.0)
+    expected = [pnoise3(x, y, z, octaves=2, base=base) for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist())]
+    assert pnoise3_batch(xs, ys, zs, octaves=2, base=base).tolist() == expected
+
+
+def test_bases_give_different_fields():
+    xs, ys, _ = random_points(50, 10.0)
+    fields = [tuple(pnoise2_batch(xs, ys, octaves=4, base=base).tolist()) for base in BASES]
+    assert len(set(fields)) == len(BASES)
+
+
+@pytest.mark.parametrize("seed", [42, 1000, 5000, 65536, -7, 3735928559])
+def test_generator_batch_matches_scalar(seed):
+    generator = Generator(seed)
+    rng = np.random.default_rng(seed & 0xFFFF)
+    xs = rng.integers(-200000, 200000, 200)
+    zs = rng.integers(-200000, 200000, 200)
+    heights = [generator.get_height(x, z) for x, z in zip(xs.tolist(), zs.tolist())]
+    biomes = [BIOME_NAMES.index(generator.get_biome_name(x, z)) for x, z in zip(xs.tolist(), zs.tolist())]
+    assert generator.get_heights(xs, zs).tolist() == heights
+    assert generator.get_biome_indices(xs, zs).tolist() == biomes
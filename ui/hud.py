@@ -1,44 +1,113 @@
 import pyglet
 from pyglet import shapes
+from config import DEBUG_TEXT_RATE
+
 
 class HUD:
-    def __init__(self):
-        self.temp_label = pyglet.text.Label(
+    """
+    HUD persistant : les formes, labels et sprites sont créés une fois dans un batch.
+    Le texte n'est réassigné (et remis en page par pyglet) que si la valeur affichée change.
+    """
+    def __init__(self, window_width, window_height):
+        self.batch = pyglet.graphics.Batch()
+        self._texts = {} # nom du label -> dernier texte assigné
+        self._debug_timer = 0.0
+
+        # Crosshair
+        self.crosshair_size = 10
+        self.crosshair_thickness = 2
+        self.crosshair_h = shapes.Rectangle(0, 0, self.crosshair_size * 2, self.crosshair_thickness,
+                                            color=(255, 255, 255, 255), batch=self.batch)
+        self.crosshair_v = shapes.Rectangle(0, 0, self.crosshair_thickness, self.crosshair_size * 2,
+                                            color=(255, 255, 255, 255), batch=self.batch)
+
+        # Labels en haut à gauche (info, mode, debug, bloc visé, serveur)
+        self.labels = {}
+        for index, name in enumerate(["info", "mode", "debug", "target_block", "server_info"]):
+            self.labels[name] = pyglet.text.Label(
+                '', font_name='Arial', font_size=12,
+                x=5, y=window_height - 5 - 20 * index,
+                anchor_x='left', anchor_y='top',
+                batch=self.batch
+            )
+        # Rapport mémoire (F3) sous les labels du haut : une ligne par cache, police à chasse fixe pour les colonnes
+        self.labels["memory"] = pyglet.text.Label(
+            '', font_name='Courier New', font_size=10,
+            x=5, y=window_height - 5 - 20 * 5, width=window_width - 10,
+            anchor_x='left', anchor_y='top', multiline=True,
+            batch=self.batch
+        )
+        self.labels["selected_block"] = pyglet.text.Label(
+            '', font_name='Arial', font_size=14,
+            x=window_width // 2, y=30,
+            anchor_x='center', anchor_y='center',
+            batch=self.batch
+        )
+        self.labels["temp"] = pyglet.text.Label(
             '', font_name='Arial', font_size=12,
-            x=10, y=10, anchor_x='left', anchor_y='bottom'
+            x=10, y=10, anchor_x='left', anchor_y='bottom',
+            batch=self.batch
         )
-        self.humid_label = pyglet.text.Label(
+        self.labels["humid"] = pyglet.text.Label(
             '', font_name='Arial', font_size=12,
-            x=10, y=30, anchor_x='left', anchor_y='bottom'
+            x=10, y=30, anchor_x='left', anchor_y='bottom',
+            batch=self.batch
         )
+
+        self.selected_block_texture = None
         self.selected_block_sprite = None
-    def draw(self, window_width, window_height, temp=0.0, humid=0.0, selected_block_texture=None):
-        # Draw crosshair
-        crosshair_size = 10
-        crosshair_thickness = 2
+        self.on_resize(window_width, window_height)
+
+    def on_resize(self, window_width, window_height):
+        self.window_width = window_width
+        self.window_height = window_height
+
         center_x = window_width / 2
         center_y = window_height / 2
+        self.crosshair_h.position = (center_x - self.crosshair_size, center_y - self.crosshair_thickness / 2)
+        self.crosshair_v.position = (center_x - self.crosshair_thickness / 2, center_y - self.crosshair_size)
+
+        for index, name in enumerate(["info", "mode", "debug", "target_block", "server_info"]):
+            self.labels[name].y = window_height - 5 - 20 * index
+        self.labels["memory"].y = window_height - 5 - 20 * 5
+        self.labels["memory"].width = window_width - 10
+        self.labels["selected_block"].x = window_width // 2
+
+        if self.selected_block_sprite:
+            # Position it next to the selected block label (which is at y=30)
+            self.selected_block_sprite.update(x=window_width / 2 + 100, y=30)
+
+    def set_text(self, name, text):
+        """Assigne le texte d'un label seulement s'il a changé (évite une remise en page pyglet)."""
+        if self._texts.get(name) != text:
+            self._texts[name] = text
+            self.labels[name].text = text
 
-        shapes.Rectangle(center_x - crosshair_size, center_y - crosshair_thickness / 2,
-                           crosshair_size * 2, crosshair_thickness,
-                           color=(255, 255, 255, 255)).draw()
-        shapes.Rectangle(center_x - crosshair_thickness / 2, center_y - crosshair_size,
-                           crosshair_thickness, crosshair_size * 2,
-                           color=(255, 255, 255, 255)).draw()
+    def debug_due(self, dt):
+        """Retourne True quand le texte de debug doit être rafraîchi (DEBUG_TEXT_RATE fois par seconde)."""
+        self._debug_timer -= dt
+        if self._debug_timer > 0:
+            return False
+        self._debug_timer = 1.0 / DEBUG_TEXT_RATE if DEBUG_TEXT_RATE > 0 else 0.0
+        return True
 
-        # Update and draw labels
-        self.temp_label.text = f"Temperature: {temp:.2f}"
-        self.humid_label.text = f"Humidity: {humid:.2f}"
-        self.temp_label.draw()
-        self.humid_label.draw()
+    def set_climate(self, temp=0.0, humid=0.0):
+        self.set_text("temp", f"Temperature: {temp:.2f}")
+        self.set_text("humid", f"Humidity: {humid:.2f}")
 
-        # Draw selected block texture
+    def set_selected_block(self, block_name, selected_block_texture=None):
+        self.set_text("selected_block", f"Selected: {block_name.capitalize()}")
+        if selected_block_texture is self.selected_block_texture:
+            return
+        self.selected_block_texture = selected_block_texture
+        if self.selected_block_sprite:
+            self.selected_block_sprite.delete()
+            self.selected_block_sprite = None
         if selected_block_texture:
-            if not self.selected_block_sprite or self.selected_block_sprite.image != selected_block_texture:
-                self.selected_block_sprite = pyglet.sprite.Sprite(selected_block_texture)
-                self.selected_block_sprite.scale = 2.0 # Make it bigger
+            self.selected_block_sprite = pyglet.sprite.Sprite(selected_block_texture,
+                                                              x=self.window_width / 2 + 100, y=30,
+                                                              batch=self.batch)
+            self.selected_block_sprite.scale = 2.0 # Make it bigger
 
-            # Position it next to the selected block label (which is at y=30)
-            self.selected_block_sprite.x = window_width / 2 + 100
-            self.selected_block_sprite.y = 30
-            self.selected_block_sprite.draw()
+    def draw(self):
+        self.batch.draw()
@@ -1,62 +1,184 @@
 import pyglet
+from worldgen.maps import MapCache
+from core.memory import LRUCache, ENTRY_BYTES
 from config import CHUNK_SIZE, MINIMAP_RADIUS, MINIMAP_CHUNK_PIXEL_SIZE
 
+# Biome au centre de chaque chunk, mis en cache par seed (partagé entre les parties de la session, budget mémoire)
+_chunk_biome_cache = {}
+
+
+def chunk_biome_cache(seed):
+    cache = _chunk_biome_cache.get(seed)
+    if cache is None:
+        cache = _chunk_biome_cache[seed] = LRUCache(f"minimap_biomes_{seed}", lambda key, biome: ENTRY_BYTES, priority=0)
+    return cache
+
+
 class Minimap:
     def __init__(self, world, textures, window_width, window_height):
         self.world = world
         self.textures = textures
         self.window_width = window_width
         self.window_height = window_height
-        self.minimap_size = (MINIMAP_RADIUS * 2 + 1) * MINIMAP_CHUNK_PIXEL_SIZE
+        self.grid_size = MINIMAP_RADIUS * 2 + 1
+        self.minimap_size = self.grid_size * MINIMAP_CHUNK_PIXEL_SIZE
+
+        self.biome_cache = chunk_biome_cache(world.seed)
+        self.map_cache = MapCache.open_existing(world.seed) # Carte prérendue par render_map.py, si elle existe
+        self.tiles = {} # biome -> pixels RGBA d'une cellule (MINIMAP_CHUNK_PIXEL_SIZE²)
+        self.center_chunk = None # Chunk au centre de l'image actuelle
+
+        # Texture torique : le chunk (cx, cz) occupe toujours la cellule (cx % grid_size, cz % grid_size). Un
+        # déplacement n'envoie au GPU que les colonnes et lignes de cellules nouvelles ; l'image est affichée
+        # décalée, en (au plus) quatre morceaux. Copie CPU gardée pour extraire ces bandes.
+        self.pixels = bytearray(self.minimap_size * self.minimap_size * 4)
+        self.texture = pyglet.image.Texture.create(self.minimap_size, self.minimap_size)
+        self.origin = (0, 0)
 
-        # Create a batch for drawing the minimap to optimize rendering
+        # Formes et sprites persistants, dessinés en un seul batch
         self.batch = pyglet.graphics.Batch()
-        self.sprites = []
+        background = pyglet.graphics.Group(order=0)
+        foreground = pyglet.graphics.Group(order=1)
+        self.background = pyglet.shapes.Rectangle(0, 0, self.minimap_size + 10, self.minimap_size + 10,
+                                                  color=(0, 0, 0, 128), batch=self.batch, group=background)
+        self.sprites = [pyglet.sprite.Sprite(self.texture, batch=self.batch, group=background) for _ in range(4)]
+        self.player_indicator = pyglet.shapes.Circle(0, 0, MINIMAP_CHUNK_PIXEL_SIZE // 4, color=(255, 0, 0),
+                                                     batch=self.batch, group=foreground)
+        self.on_resize(window_width, window_height)
 
-    def update_minimap(self, player_position):
-        self.sprites = [] # Clear existing sprites
-        player_chunk_x = int(player_position[0] // CHUNK_SIZE)
-        player_chunk_z = int(player_position[2] // CHUNK_SIZE)
+    def on_resize(self, window_width, window_height):
+        self.window_width = window_width
+        self.window_height = window_height
 
         # Calculate minimap position (centered)
         minimap_x_offset = (self.window_width - self.minimap_size) // 2
         minimap_y_offset = (self.window_height - self.minimap_size) // 2
 
-        for dx in range(-MINIMAP_RADIUS, MINIMAP_RADIUS + 1):
-            for dz in range(-MINIMAP_RADIUS, MINIMAP_RADIUS + 1):
-                cx, cz = player_chunk_x + dx, player_chunk_z + dz
-                
-                # Get biome at chunk center
-                biome_name = self.world.get_biome_at_chunk_center(cx, cz)
-                biome_texture = self.textures.get(biome_name)
-
-                if biome_texture:
-                    # Calculate position on the minimap grid
-                    sprite_x = minimap_x_offset + (dx + MINIMAP_RADIUS) * MINIMAP_CHUNK_PIXEL_SIZE
-                    sprite_y = minimap_y_offset + (dz + MINIMAP_RADIUS) * MINIMAP_CHUNK_PIXEL_SIZE
-                    
-                    # Create a sprite for the biome texture
-                    sprite = pyglet.sprite.Sprite(biome_texture, x=sprite_x, y=sprite_y, batch=self.batch)
-                    sprite.scale = MINIMAP_CHUNK_PIXEL_SIZE / sprite.width # Scale to MINIMAP_CHUNK_PIXEL_SIZE
-                    self.sprites.append(sprite)
+        self.background.x = minimap_x_offset - 5
+        self.background.y = minimap_y_offset - 5
+        self.origin = (minimap_x_offset, minimap_y_offset)
+        self._place_sprites()
+        self.player_indicator.x = minimap_x_offset + MINIMAP_RADIUS * MINIMAP_CHUNK_PIXEL_SIZE + (MINIMAP_CHUNK_PIXEL_SIZE // 2)
+        self.player_indicator.y = minimap_y_offset + MINIMAP_RADIUS * MINIMAP_CHUNK_PIXEL_SIZE + (MINIMAP_CHUNK_PIXEL_SIZE // 2)
 
-    def draw(self):
-        # Calculate minimap position (centered) - recalculate to ensure it's always up-to-date
-        minimap_x_offset = (self.window_width - self.minimap_size) // 2
-        minimap_y_offset = (self.window_height - self.minimap_size) // 2
+    def _get_tile(self, biome_name):
+        """Pixels d'une cellule pour un biome : image du biome réduite (plus proche voisin)."""
+        tile = self.tiles.get(biome_name)
+        if tile is None:
+            size = MINIMAP_CHUNK_PIXEL_SIZE
+            tile = bytes(size * size * 4)
+            biome_image = self.textures.images.get(("general", biome_name))
+            if biome_image:
+                width, height = biome_image.width, biome_image.height
+                data = biome_image.get_data('RGBA', width * 4)
+                tile = bytearray()
+                for ty in range(size):
+                    row_start = (ty * height // size) * width
+                    for tx in range(size):
+                        offset = (row_start + tx * width // size) * 4
+                        tile += data[offset:offset + 4]
+                tile = bytes(tile)
+            self.tiles[biome_name] = tile
+        return tile
 
-        # Draw the minimap background
-        pyglet.shapes.Rectangle(
-            minimap_x_offset - 5,
-            minimap_y_offset - 5,
-            self.minimap_size + 10,
-            self.minimap_size + 10,
-            color=(0, 0, 0, 128) # Semi-transparent black background
-        ).draw()
+    def _get_biomes(self, chunk_coords):
+        """Biomes pour une liste de chunks ; seuls ceux absents du cache et de la carte prérendue sont calculés."""
+        # Résultats gardés localement : le cache peut évincer des entrées pendant qu'on le remplit
+        biomes = {coord: self.biome_cache.get(coord) for coord in chunk_coords}
+        missing = [coord for coord, biome_name in biomes.items() if biome_name is None]
+        if missing and self.map_cache:
+            found = [(coord, name) for coord, name in zip(missing, self.map_cache.biome_names(missing)) if name is not None]
+            biomes.update(found)
+            self.biome_cache.update(found)
+            missing = [coord for coord in missing if biomes[coord] is None]
+        if missing:
+            computed = list(zip(missing, self.world.get_biomes_at_chunk_centers(missing)))
+            biomes.update(computed)
+            self.biome_cache.update(computed)
+        return [biomes[coord] for coord in chunk_coords]
 
-        self.batch.draw()
+    def _fill_cells(self, cells):
+        """Remplit les cellules (i, j) de la grille à partir des biomes des chunks correspondants."""
+        center_x, center_z = self.center_chunk
+        chunk_coords = [(center_x + i - MINIMAP_RADIUS, center_z + j - MINIMAP_RADIUS) for i, j in cells]
+        size = MINIMAP_CHUNK_PIXEL_SIZE
+        row_bytes = size * 4
+        stride = self.minimap_size * 4
+        for (cx, cz), biome_name in zip(chunk_coords, self._get_biomes(chunk_coords)):
+            tile = self._get_tile(biome_name)
+            slot_x, slot_z = cx % self.grid_size, cz % self.grid_size
+            for ty in range(size):
+                offset = (slot_z * size + ty) * stride + slot_x * row_bytes
+                self.pixels[offset:offset + row_bytes] = tile[ty * row_bytes:(ty + 1) * row_bytes]
+
+    def _upload_column(self, slot_x):
+        """Envoie au GPU une colonne de cellules de la texture torique."""
+        size = MINIMAP_CHUNK_PIXEL_SIZE
+        stride = self.minimap_size * 4
+        start = slot_x * size * 4
+        data = b"".join(self.pixels[py * stride + start:py * stride + start + size * 4] for py in range(self.minimap_size))
+        self.texture.blit_into(pyglet.image.ImageData(size, self.minimap_size, 'RGBA', data), slot_x * size, 0, 0)
+
+    def _upload_row(self, slot_z):
+        """Envoie au GPU une ligne de cellules de la texture torique (contiguë dans la copie CPU)."""
+        size = MINIMAP_CHUNK_PIXEL_SIZE
+        stride = self.minimap_size * 4
+        data = bytes(self.pixels[slot_z * size * stride:(slot_z + 1) * size * stride])
+        self.texture.blit_into(pyglet.image.ImageData(self.minimap_size, size, 'RGBA', data), 0, slot_z * size, 0)
+
+    def _place_sprites(self):
+        """Affiche la texture torique décalée : la cellule du coin bas-gauche de la carte vient en premier."""
+        if self.center_chunk is None:
+            for sprite in self.sprites:
+                sprite.visible = False # Rien à afficher avant la première image
+            return
+        size = MINIMAP_CHUNK_PIXEL_SIZE
+        full = self.minimap_size
+        split_x = (self.center_chunk[0] - MINIMAP_RADIUS) % self.grid_size * size
+        split_y = (self.center_chunk[1] - MINIMAP_RADIUS) % self.grid_size * size
+        # (x, y, largeur, hauteur) dans la texture, et position du morceau dans la carte
+        pieces = [
+            (split_x, split_y, full - split_x, full - split_y, 0, 0),
+            (0, split_y, split_x, full - split_y, full - split_x, 0),
+            (split_x, 0, full - split_x, split_y, 0, full - split_y),
+            (0, 0, split_x, split_y, full - split_x, full - split_y),
+        ]
+        origin_x, origin_y = self.origin
+        for sprite, (x, y, width, height, offset_x, offset_y) in zip(self.sprites, pieces):
+            sprite.visible = width > 0 and height > 0
+            if sprite.visible:
+                sprite.image = self.texture.get_region(x, y, width, height)
+                sprite.update(x=origin_x + offset_x, y=origin_y + offset_y)
 
-        # Draw player indicator
-        player_indicator_x = minimap_x_offset + MINIMAP_RADIUS * MINIMAP_CHUNK_PIXEL_SIZE + (MINIMAP_CHUNK_PIXEL_SIZE // 2)
-        player_indicator_y = minimap_y_offset + MINIMAP_RADIUS * MINIMAP_CHUNK_PIXEL_SIZE + (MINIMAP_CHUNK_PIXEL_SIZE // 2)
-        pyglet.shapes.Circle(player_indicator_x, player_indicator_y, MINIMAP_CHUNK_PIXEL_SIZE // 4, color=(255, 0, 0)).draw()
+    def update_minimap(self, player_position):
+        player_chunk = (int(player_position[0] // CHUNK_SIZE), int(player_position[2] // CHUNK_SIZE))
+        if player_chunk == self.center_chunk:
+            return # Rien n'a changé depuis la dernière frame
+
+        grid_size = self.grid_size
+        if self.center_chunk is not None:
+            shift_x = player_chunk[0] - self.center_chunk[0]
+            shift_z = player_chunk[1] - self.center_chunk[1]
+        if self.center_chunk is None or max(abs(shift_x), abs(shift_z)) >= grid_size:
+            # Première image ou téléportation : toute la carte est nouvelle
+            self.center_chunk = player_chunk
+            self._fill_cells([(i, j) for i in range(grid_size) for j in range(grid_size)])
+            self.texture.blit_into(pyglet.image.ImageData(self.minimap_size, self.minimap_size, 'RGBA',
+                                                          bytes(self.pixels)), 0, 0, 0)
+        else:
+            # Seules les colonnes et lignes entrées dans la carte sont calculées et envoyées
+            self.center_chunk = player_chunk
+            columns = [i for i in range(grid_size) if not 0 <= i + shift_x < grid_size]
+            rows = [j for j in range(grid_size) if not 0 <= j + shift_z < grid_size]
+            cells = [(i, j) for i in columns for j in range(grid_size)]
+            cells += [(i, j) for j in rows for i in range(grid_size) if 0 <= i + shift_x < grid_size]
+            self._fill_cells(cells)
+            corner_x, corner_z = player_chunk[0] - MINIMAP_RADIUS, player_chunk[1] - MINIMAP_RADIUS
+            for i in columns:
+                self._upload_column((corner_x + i) % grid_size)
+            for j in rows:
+                self._upload_row((corner_z + j) % grid_size)
+        self._place_sprites()
+
+    def draw(self):
+        self.batch.draw()
@@ -1,4 +1,5 @@
 import math
+import time
 import pyglet
 from pyglet.graphics import shader
 from pyglet.window import key, mouse
@@ -8,12 +9,14 @@ from enum import Enum
 
 from core.world import World
 from core.player import Player, EYE_HEIGHT
-from core.player_sprite import PlayerSprite
 from core.water import WaterPlane
 from ui.hud import HUD
 from ui.menu import Menu
 from core.server import Server
 from core.client import Client
+from core.render_state import render_state
+from core.memory import memory_governor
+from core.blocks import block_registry
 import config
 from ui.minimap import Minimap
 
@@ -35,10 +38,11 @@ class GhostCamera:
         )
         self.view = Mat4()
 
-    def update(self, player):
-        """Met à jour la matrice de vue basée sur la position et rotation du joueur"""
+    def update(self, player, position=None):
+        """Met à jour la matrice de vue basée sur la position (interpolée si donnée) et rotation du joueur"""
         # Position de la caméra = position du joueur
-        pos = Vec3(player.position[0], player.position[1] + EYE_HEIGHT, player.position[2])
+        position = position or player.position
+        pos = Vec3(position[0], position[1] + EYE_HEIGHT, position[2])
 
         # Calculer le point vers lequel on regarde
         pitch_rad = math.radians(player.pitch)
@@ -63,6 +67,163 @@ class GhostCamera:
             fov=65.0
         )
 
+class GpuTimer:
+    """
+    Temps GPU des frames, par requêtes GL_TIME_ELAPSED. Le résultat d'une frame est lu quelques frames plus
+    tard, quand il est disponible, pour ne jamais attendre le GPU ; last_time garde la dernière mesure lue.
+    """
+    def __init__(self, depth=3):
+        self.queries = (pyglet.gl.GLuint * depth)()
+        pyglet.gl.glGenQueries(depth, self.queries)
+        self.pending = [False] * depth
+        self.index = 0
+        self.running = False
+        self.last_time = 0.0
+
+    def begin(self):
+        query = self.queries[self.index]
+        if self.pending[self.index]:
+            available = pyglet.gl.GLint()
+            pyglet.gl.glGetQueryObjectiv(query, pyglet.gl.GL_QUERY_RESULT_AVAILABLE, available)
+            if not available.value:
+                return # Toutes les requêtes sont encore en vol : cette frame n'est pas mesurée
+            elapsed = pyglet.gl.GLuint64()
+            pyglet.gl.glGetQueryObjectui64v(query, pyglet.gl.GL_QUERY_RESULT, elapsed)
+            self.pending[self.index] = False
+            if elapsed.value < 1e9: # Certains pilotes rendent une valeur aberrante pour la toute première requête
+                self.last_time = elapsed.value / 1e9
+        pyglet.gl.glBeginQuery(pyglet.gl.GL_TIME_ELAPSED, query)
+        self.running = True
+
+    def end(self):
+        if not self.running:
+            return
+        pyglet.gl.glEndQuery(pyglet.gl.GL_TIME_ELAPSED)
+        self.running = False
+        self.pending[self.index] = True
+        self.index = (self.index + 1) % len(self.queries)
+
+
+class DynamicResolution:
+    """
+    Ajuste l'échelle de rendu de la passe 3D pour tenir un temps de frame cible. Mesuré sur le temps GPU :
+    c'est lui (remplissage des pixels) que l'échelle réduit, pas le travail du CPU.
+    """
+    def __init__(self, enabled, target_frame_time, min_scale, step=0.05, cooldown=0.5):
+        self.enabled = enabled
+        self.target_frame_time = target_frame_time
+        self.min_scale = min_scale
+        self.step = step
+        self.cooldown = cooldown
+        self.scale = 1.0
+        self.smoothed_frame_time = target_frame_time
+        self._time_since_change = 0.0
+
+    def update(self, dt, gpu_time):
+        """gpu_time : temps GPU de la dernière frame mesurée (GpuTimer)."""
+        if not self.enabled:
+            self.scale = 1.0
+            return
+        # Moyenne glissante pour ne pas réagir à une frame isolée
+        self.smoothed_frame_time = self.smoothed_frame_time * 0.9 + gpu_time * 0.1
+        self._time_since_change += dt
+        if self._time_since_change < self.cooldown:
+            return
+
+        if self.smoothed_frame_time > self.target_frame_time * 1.1 and self.scale > self.min_scale:
+            self.scale = max(self.min_scale, round(self.scale - self.step, 2))
+            self._time_since_change = 0.0
+        elif self.smoothed_frame_time < self.target_frame_time * 0.8 and self.scale < 1.0:
+            self.scale = min(1.0, round(self.scale + self.step, 2))
+            self._time_since_change = 0.0
+
+    def scaled_size(self, width, height):
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+# Distances de config.py au lancement : RenderDistanceGovernor les modifie en jeu
+CONFIGURED_VIEW = (config.RENDER_DISTANCE, config.SPRITE_RENDER_DISTANCE, config.ANIMAL_RENDER_DISTANCE, config.MAX_ANIMALS)
+
+class RenderDistanceGovernor:
+    """
+    Ajuste la distance de rendu d'un chunk à la fois pour tenir un temps de frame cible ; les distances des
+    sprites et des animaux et le nombre d'animaux suivent en proportion de leurs valeurs de config.py.
+    Plus lent que DynamicResolution : chaque changement charge ou décharge tout un anneau de chunks.
+    La distance n'augmente que si les workers ont rattrapé leur retard (backlog), sinon elle ajouterait du
+    travail à une génération qui ne suit déjà pas.
+    """
+    def __init__(self, enabled, target_frame_time, min_distance, max_distance, max_backlog, cooldown=3.0, warmup=5.0):
+        self.enabled = enabled
+        self.target_frame_time = target_frame_time
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.max_backlog = max_backlog
+        self.cooldown = cooldown
+        self.base = CONFIGURED_VIEW
+        self.set_distance(self.base[0]) # Une nouvelle partie repart des valeurs configurées
+        self.smoothed_frame_time = target_frame_time
+        self._time_since_change = cooldown - warmup # Pas de changement pendant le chargement initial
+
+    def update(self, dt, frame_time, backlog):
+        """frame_time : coût de la frame, le plus grand du travail CPU (hors attente du limiteur) et du temps GPU ;
+        retourne True si la distance a changé."""
+        if not self.enabled:
+            return False
+        # Moyenne glissante pour ne pas réagir à une frame isolée
+        self.smoothed_frame_time = self.smoothed_frame_time * 0.95 + frame_time * 0.05
+        self._time_since_change += dt
+        if self._time_since_change < self.cooldown:
+            return False
+
+        if self.smoothed_frame_time > self.target_frame_time * 1.1 and self.distance > self.min_distance:
+            self.set_distance(self.distance - 1)
+        elif (self.smoothed_frame_time < self.target_frame_time * 0.6 and backlog <= self.max_backlog
+              and self.distance < self.max_distance):
+            self.set_distance(self.distance + 1)
+        else:
+            return False
+        self._time_since_change = 0.0
+        return True
+
+    def set_distance(self, distance):
+        """Applique une distance de rendu et celles qui en découlent (lues en jeu dans config)."""
+        base_distance, base_sprites, base_animals, base_max_animals = self.base
+        ratio = distance / base_distance
+        self.distance = distance
+        config.RENDER_DISTANCE = distance
+        config.SPRITE_RENDER_DISTANCE = max(1, round(base_sprites * ratio))
+        config.ANIMAL_RENDER_DISTANCE = max(1, round(base_animals * ratio))
+        config.MAX_ANIMALS = max(1, round(base_max_animals * ratio * ratio)) # La population suit la surface
+
+    @property
+    def ratio(self):
+        return self.distance / self.base[0]
+
+class FixedTimestep:
+    """
+    Pas de simulation fixe : advance(dt) accumule le temps de la frame et retourne le nombre de ticks à exécuter
+    (au plus max_ticks, le retard au-delà est abandonné) ; alpha est la fraction du tick suivant déjà écoulée,
+    pour interpoler le rendu entre les deux derniers ticks.
+    """
+    def __init__(self, rate, max_ticks):
+        self.step = 1.0 / rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.dropped_time = 0.0 # Temps abandonné faute de pouvoir rattraper
+
+    def advance(self, dt):
+        self.accumulator += dt
+        ticks = int(self.accumulator / self.step)
+        if ticks > self.max_ticks:
+            self.dropped_time += (ticks - self.max_ticks) * self.step
+            ticks = self.max_ticks
+            self.accumulator = self.step * ticks
+        self.accumulator = max(0.0, self.accumulator - ticks * self.step)
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator / self.step)
+
 # Classe Window mise à jour pour utiliser le nouveau système
 class Window(pyglet.window.Window):
     def __init__(self, *args, **kwargs):
@@ -78,6 +239,9 @@ class Window(pyglet.window.Window):
         self.fog_density = 0.01 # Adjust as needed
         self.fog_start = config.FOG_START # Fog starts at this distance
         self.fog_end = config.FOG_END # Fog is fully opaque at this distance
+        if config.LOD_RINGS: # The far terrain pushes the horizon out
+            self.fog_start = config.LOD_FOG_START
+            self.fog_end = config.LOD_FOG_END
         pyglet.gl.glEnable(pyglet.gl.GL_DEPTH_TEST)
         pyglet.gl.glEnable(pyglet.gl.GL_CULL_FACE)
         pyglet.gl.glFrontFace(pyglet.gl.GL_CCW)
@@ -85,7 +249,11 @@ class Window(pyglet.window.Window):
 
         self.keys = key.KeyStateHandler()
         self.push_handlers(self.keys)
-        pyglet.clock.schedule(self.update)
+        # Une mise à jour par frame (au rythme du limiteur), qui exécute les ticks de simulation en retard
+        if config.FRAME_RATE_LIMIT > 0:
+            pyglet.clock.schedule_interval(self.update, 1.0 / config.FRAME_RATE_LIMIT)
+        else:
+            pyglet.clock.schedule(self.update)
         self.set_exclusive_mouse(False)
         self.server = None
         self.client = None
@@ -93,56 +261,6 @@ class Window(pyglet.window.Window):
         # Initialize shader program here
         self.program = self.create_shader_program() # Moved from start_game
 
-        # UI
-        self.ui_batch = pyglet.graphics.Batch()
-        self.info_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 5,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.mode_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 25,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.debug_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 45,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.target_block_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 65,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.server_info_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 85,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.selected_block_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=14,
-            x=self.width // 2, y=30,
-            anchor_x='center', anchor_y='center',
-            batch=self.ui_batch
-        )
         self.current_biome_info = {}
 
     def on_close(self):
@@ -157,7 +275,7 @@ class Window(pyglet.window.Window):
         self.server = Server(port=int(port), seed=seed)
         self.server.start()
         # Connect a client to the newly created server for the host player
-        self.client = Client('127.0.0.1', int(port), program=self.program)
+        self.client = Client('127.0.0.1', int(port))
         self.client.connect()
         self.start_game(seed)
 
@@ -182,14 +300,17 @@ class Window(pyglet.window.Window):
         self.camera = GhostCamera(self)
 
         self.world = World(self.program, seed=config.WORLD_SEED)
-        self.water = WaterPlane(size=500.0)  # Votre eau existante
+        if self.client:
+            self.client.set_textures(self.world.textures)
+        self.water = WaterPlane(size=max(500.0, 2.0 * self.fog_end))  # Votre eau existante (jusqu'à l'horizon)
 
         # Minimap
         self.show_minimap = False
+        self.show_memory_report = False # F3 : rapport mémoire dans le HUD
         self.minimap = Minimap(self.world, self.world.textures, self.width, self.height)
 
-        # HUD
-        self.hud = HUD()
+        # HUD (shapes and labels are persistent; text is only pushed when it changes)
+        self.hud = HUD(self.width, self.height)
 
         # Underwater filter initialization
         self.underwater_program = self.create_underwater_shader_program()
@@ -218,44 +339,30 @@ class Window(pyglet.window.Window):
         else:
             self.blit_vertex_list = None
 
-                # UI
-        self.ui_batch = pyglet.graphics.Batch()
-        self.info_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 5,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.mode_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 25,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
-        )
-        self.debug_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 45,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
+        self.total_time = 0.0 # Initialize total time
+
+        # Distance de rendu adaptée au temps de frame (travail CPU de la mise à jour et du rendu, ou temps GPU)
+        self.render_distance = RenderDistanceGovernor(
+            config.ADAPTIVE_RENDER_DISTANCE, 1.0 / config.TARGET_FPS,
+            config.MIN_RENDER_DISTANCE, config.MAX_RENDER_DISTANCE, config.ADAPTIVE_MAX_BACKLOG
         )
-        self.target_block_label = pyglet.text.Label(
-            '',
-            font_name='Arial',
-            font_size=12,
-            x=5, y=self.height - 65,
-            anchor_x='left', anchor_y='top',
-            batch=self.ui_batch
+        self.last_draw_time = 0.0
+        if not config.LOD_RINGS:
+            self.fog_start, self.fog_end = config.FOG_START, config.FOG_END
+
+        # Simulation à pas fixe, indépendante du nombre d'images par seconde
+        self.timestep = FixedTimestep(config.SIMULATION_RATE, config.MAX_TICKS_PER_FRAME)
+        self.tick_count = 0
+        self.send_interval = max(1, round(config.SIMULATION_RATE / config.NETWORK_SEND_RATE)) # En ticks
+        self.targeted_block_coords = self.targeted_block_type = self.block_placement_coords = None
+
+        # Dynamic resolution: the 3D pass is rendered into a scaled FBO and upsampled
+        self.dynamic_resolution = DynamicResolution(
+            config.DYNAMIC_RESOLUTION, 1.0 / config.TARGET_FPS, config.MIN_RENDER_SCALE
         )
+        self.gpu_timer = GpuTimer()
 
-        self.total_time = 0.0 # Initialize total time
-
-        # Framebuffer Object (FBO) for post-processing
+        # Framebuffer Object (FBO) for post-processing (only used when a post-effect or scaling is active)
         self.fbo = pyglet.gl.GLuint() # Create a GLuint object to store the FBO ID
         pyglet.gl.glGenFramebuffers(1, self.fbo) # Generate 1 framebuffer and store its ID in self.fbo
 
@@ -265,7 +372,7 @@ class Window(pyglet.window.Window):
         self.fbo_depth_texture = pyglet.gl.GLuint() # Create a GLuint object for the depth texture ID
         pyglet.gl.glGenTextures(1, self.fbo_depth_texture) # Generate 1 texture and store its ID
 
-        self.create_fbo_attachments(self.width, self.height)
+        self.fbo_size = (0, 0)
 
     def create_shader_program(self):
         vertex_shader_source = '''
@@ -431,6 +538,13 @@ class Window(pyglet.window.Window):
 
         # Unbind FBO
         pyglet.gl.glBindFramebuffer(pyglet.gl.GL_FRAMEBUFFER, 0)
+        self.fbo_size = (width, height)
+        render_state.invalidate() # Texture bindings changed outside the tracker
+
+    def ensure_fbo_size(self, width, height):
+        """(Re)alloue les attachements du FBO seulement si la taille demandée a changé."""
+        if self.fbo_size != (width, height):
+            self.create_fbo_attachments(width, height)
 
     def on_resize(self, width, height):
         super().on_resize(width, height)
@@ -438,12 +552,11 @@ class Window(pyglet.window.Window):
             self.menu.on_resize(width, height)
         elif self.game_state == GameState.GAME:
             self.camera.on_resize(width, height)
-            self.create_fbo_attachments(width, height) # Update FBO attachments on resize
+            self.fbo_size = (0, 0) # FBO attachments are reallocated on the next frame that needs them
             if hasattr(self, 'minimap'):
-                self.minimap.window_width = width
-                self.minimap.window_height = height
-                # Re-calculate minimap size and position if needed, or let update_minimap handle it
-                # For now, just updating width/height should be enough as minimap recalculates positions
+                self.minimap.on_resize(width, height)
+            if hasattr(self, 'hud'):
+                self.hud.on_resize(width, height)
 
     def on_mouse_motion(self, x, y, dx, dy):
         if self.game_state == GameState.GAME:
@@ -464,155 +577,201 @@ class Window(pyglet.window.Window):
                     self.world.remove_block(self.targeted_block_coords)
             elif button == mouse.RIGHT:
                 if self.block_placement_coords:
-                    self.world.add_block(self.block_placement_coords, self.player.selected_block)
+                    self.world.add_block(self.block_placement_coords, block_registry.id(self.player.selected_block))
 
     def on_text(self, text):
         if self.game_state == GameState.MENU:
             self.menu.on_text(text)
 
     def update(self, dt):
-        if self.server:
-            self.server_info_label.text = f"Server: {self.server.get_client_count()} players connected"
-        else:
-            self.server_info_label.text = ""
-
+        """Une fois par frame : ticks de simulation en retard, puis ce qui suit le rendu (caméra, envois GPU, HUD)."""
         if self.game_state == GameState.GAME:
+            frame_start = time.perf_counter()
+            if self.server:
+                self.hud.set_text("server_info", f"Server: {self.server.get_client_count()} players connected")
+            else:
+                self.hud.set_text("server_info", "")
+
             self.total_time += dt # Update total time
-            self.player.update(dt, self.keys, self.world)
-            self.camera.update(self.player)
+            for _ in range(self.timestep.advance(dt)):
+                self.tick(self.timestep.step)
+
+            # Rendu entre les deux derniers ticks
+            alpha = self.timestep.alpha
+            self.camera.update(self.player, self.player.interpolated_position(alpha))
+            self.world.update_frame(alpha)
 
-            # Send and receive player data if connected to a server
             if self.client:
-                self.client.send_player_data(self.player.position, (self.player.pitch, self.player.yaw))
                 self.client.receive_player_data()
 
-            # Mettre à jour l'affichage de position
             pos = self.player.position
-            self.info_label.text = f'Position: ({pos[0]:.1f}, {pos[1]:.1f}, {pos[2]:.1f}) | Pitch: {self.player.pitch:.1f}° | Yaw: {self.player.yaw:.1f}°'
             mode_text = f"Mode: {'Ghost' if self.player.ghost_mode else 'Grounded'}"
             if self.player.is_swimming:
                 mode_text += " (Swimming)"
-            self.mode_label.text = mode_text
+            self.hud.set_text("mode", mode_text)
+
+            # Debug text (position, biome, GL stats) is throttled to config.DEBUG_TEXT_RATE
+            if self.hud.debug_due(dt):
+                self.hud.set_text("info", f'Position: ({pos[0]:.1f}, {pos[1]:.1f}, {pos[2]:.1f}) | Pitch: {self.player.pitch:.1f}° | Yaw: {self.player.yaw:.1f}°'
+                                          f' | View: {config.RENDER_DISTANCE} chunks')
+
+                # Get current biome info
+                self.current_biome_info = self.world.get_biome(pos[0], pos[2])
+                biome_name = self.current_biome_info.get('name', 'N/A')
+                jobs_ready, jobs_completing = self.world.jobs.pending()
+                self.hud.set_text("debug", f"Debug Info: {self.player.debug_info} | Biome: {biome_name.capitalize()}"
+                                           f" | GL calls: {render_state.last_frame_issued} (avoided: {render_state.last_frame_avoided})"
+                                           f" | Memory: {memory_governor.total_bytes() / 2 ** 20:.0f}/{memory_governor.budget_bytes / 2 ** 20:.0f} MB"
+                                           f" (compressed chunks: {len(self.world.chunk_memory.compressed)})"
+                                           f" | Jobs: {jobs_ready} queued, {jobs_completing} to upload")
+                self.hud.set_climate(self.current_biome_info.get('temp', 0), self.current_biome_info.get('humid', 0))
+                # Taille, taux de succès et évictions de chaque cache
+                self.hud.set_text("memory", memory_governor.report() if self.show_memory_report else "")
+
+            if self.targeted_block_type is not None:
+                block_name = block_registry.name(self.targeted_block_type)
+                self.hud.set_text("target_block", f"Target Block: {block_name.capitalize()} at {self.targeted_block_coords}")
+            else:
+                self.hud.set_text("target_block", "Target Block: None")
 
-            # Get current biome info
-            self.current_biome_info = self.world.get_biome(pos[0], pos[2])
-            biome_name = self.current_biome_info.get('name', 'N/A')
-            self.debug_label.text = f"Debug Info: {self.player.debug_info} | Biome: {biome_name.capitalize()}"
+            # Update selected block label and icon
+            self.hud.set_selected_block(self.player.selected_block, self.world.textures.get(self.player.selected_block))
 
-            # Raycast to find targeted block
-            player_pos = self.player.position
-            eye_pos = (player_pos[0], player_pos[1] + EYE_HEIGHT, player_pos[2])
+            frame_time = time.perf_counter() - frame_start + self.last_draw_time
+            self.dynamic_resolution.update(dt, self.gpu_timer.last_time)
+            # La distance de rendu charge le CPU (chunks, animaux) comme le GPU : le plus lent des deux compte
+            frame_cost = max(frame_time, self.gpu_timer.last_time)
+            if self.render_distance.update(dt, frame_cost, sum(self.world.jobs.pending())) and not config.LOD_RINGS:
+                # Sans terrain lointain, le brouillard cache le bord des chunks chargés : il suit la distance
+                self.fog_start = config.FOG_START * self.render_distance.ratio
+                self.fog_end = config.FOG_END * self.render_distance.ratio
 
-            pitch_rad = math.radians(self.player.pitch)
-            yaw_rad = math.radians(self.player.yaw)
+    def tick(self, dt):
+        """Un pas de simulation de durée fixe : physique du joueur, réseau, bloc visé, monde et animaux."""
+        self.tick_count += 1
+        self.player.update(dt, self.keys, self.world)
 
-            dx = math.sin(yaw_rad) * math.cos(pitch_rad)
-            dy = -math.sin(pitch_rad)
-            dz = -math.cos(yaw_rad) * math.cos(pitch_rad)
-            looking_vector = (dx, dy, dz)
+        # Send player data at config.NETWORK_SEND_RATE if connected to a server
+        if self.client and self.tick_count % self.send_interval == 0:
+            self.client.send_player_data(self.player.position, (self.player.pitch, self.player.yaw))
 
-            self.targeted_block_coords, self.targeted_block_type, self.block_placement_coords = self._raycast(eye_pos, looking_vector)
+        # Raycast to find targeted block
+        player_pos = self.player.position
+        eye_pos = (player_pos[0], player_pos[1] + EYE_HEIGHT, player_pos[2])
 
-            if self.targeted_block_type:
-                self.target_block_label.text = f"Target Block: {self.targeted_block_type.capitalize()} at {self.targeted_block_coords}"
-            else:
-                self.target_block_label.text = "Target Block: None"
+        pitch_rad = math.radians(self.player.pitch)
+        yaw_rad = math.radians(self.player.yaw)
+
+        dx = math.sin(yaw_rad) * math.cos(pitch_rad)
+        dy = -math.sin(pitch_rad)
+        dz = -math.cos(yaw_rad) * math.cos(pitch_rad)
+        looking_vector = (dx, dy, dz)
 
-            # Mettre à jour votre monde si vous l'avez
-            self.world.update(dt, self.player.position)
+        self.targeted_block_coords, self.targeted_block_type, self.block_placement_coords = self._raycast(eye_pos, looking_vector)
+
+        # Mettre à jour votre monde si vous l'avez
+        self.world.update(dt, self.player.position, self.player.velocity)
 
-            # Update selected block label
-            self.selected_block_label.text = f"Selected: {self.player.selected_block.capitalize()}"
     def on_draw(self):
+        draw_start = time.perf_counter()
         self.clear()
+        render_state.begin_frame()
         if self.game_state == GameState.MENU:
-            pyglet.gl.glDisable(pyglet.gl.GL_DEPTH_TEST)
-            pyglet.gl.glDisable(pyglet.gl.GL_CULL_FACE)
+            render_state.disable(pyglet.gl.GL_DEPTH_TEST)
+            render_state.disable(pyglet.gl.GL_CULL_FACE)
             self.menu.draw()
         elif self.game_state == GameState.GAME:
-            pyglet.gl.glEnable(pyglet.gl.GL_DEPTH_TEST)
-            pyglet.gl.glEnable(pyglet.gl.GL_CULL_FACE)
-            # Render to FBO
-            pyglet.gl.glBindFramebuffer(pyglet.gl.GL_FRAMEBUFFER, self.fbo)
-            self.clear() # Clear FBO
+            self.gpu_timer.begin()
+            render_state.enable(pyglet.gl.GL_DEPTH_TEST)
+            render_state.enable(pyglet.gl.GL_CULL_FACE)
+
+            # The FBO is only needed for the underwater distortion or a scaled 3D pass;
+            # otherwise the scene goes straight to the back buffer (no full-screen blit).
+            framebuffer_width, framebuffer_height = self.get_framebuffer_size()
+            use_fbo = self.player.is_swimming or self.dynamic_resolution.scale < 1.0
+            if use_fbo:
+                fbo_width, fbo_height = self.dynamic_resolution.scaled_size(framebuffer_width, framebuffer_height)
+                self.ensure_fbo_size(fbo_width, fbo_height)
+                pyglet.gl.glBindFramebuffer(pyglet.gl.GL_FRAMEBUFFER, self.fbo)
+                pyglet.gl.glViewport(0, 0, fbo_width, fbo_height)
+                self.clear() # Clear FBO
 
             # Rendu 3D
-            self.program.use()
-            self.program['projection'] = self.camera.projection
-            self.program['view'] = self.camera.view
-            self.program['fog_color'] = self.fog_color
-            self.program['fog_start'] = self.fog_start
-            self.program['fog_end'] = self.fog_end
-
-            self.world.draw(self.player.position)
+            render_state.use_program(self.program)
+            render_state.set_uniform(self.program, 'projection', self.camera.projection)
+            render_state.set_uniform(self.program, 'view', self.camera.view)
+            render_state.set_uniform(self.program, 'fog_color', self.fog_color)
+            render_state.set_uniform(self.program, 'fog_start', self.fog_start)
+            render_state.set_uniform(self.program, 'fog_end', self.fog_end)
+
+            self.world.draw(self.player.position, self.camera.projection, self.camera.view,
+                            self.fog_color, self.fog_start, self.fog_end)
 
             # Draw other players
             if self.client:
-                self.client.draw_other_players(self.camera.view) # Pass view_matrix
-
-            self.program.stop()
+                self.client.draw_other_players(self.camera.projection, self.camera.view,
+                                               self.fog_color, self.fog_start, self.fog_end)
 
             # Dessiner votre eau si vous l'avez
             self.water.draw(self.camera.projection, self.camera.view, self.total_time, self.player.position,
                             self.fog_color, self.fog_start, self.fog_end)
 
-            # Unbind FBO and render to screen
-            pyglet.gl.glBindFramebuffer(pyglet.gl.GL_FRAMEBUFFER, 0)
-            self.clear() # Clear screen
+            if use_fbo:
+                # Unbind FBO and render to screen
+                pyglet.gl.glBindFramebuffer(pyglet.gl.GL_FRAMEBUFFER, 0)
+                pyglet.gl.glViewport(0, 0, framebuffer_width, framebuffer_height)
+                self.clear() # Clear screen
 
             # Appliquer le filtre sous-marin si le joueur est sous l'eau
             if self.player.is_swimming:
                 self.draw_underwater_filter()
-            else:
-                # If not underwater, draw the FBO texture directly to screen using the blit shader
+            elif use_fbo:
+                # Upsample the scaled FBO texture to the screen using the blit shader
                 if self.blit_program and self.blit_vertex_list:
-                    pyglet.gl.glDisable(pyglet.gl.GL_BLEND) # Disable blending for full screen quad
+                    render_state.disable(pyglet.gl.GL_BLEND) # Disable blending for full screen quad
 
-                    self.blit_program.use()
-                    pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0)
-                    pyglet.gl.glBindTexture(pyglet.gl.GL_TEXTURE_2D, self.fbo_texture)
-                    self.blit_program['screen_texture'] = 0 # Assign texture unit 0
+                    render_state.use_program(self.blit_program)
+                    render_state.bind_texture(pyglet.gl.GL_TEXTURE_2D, self.fbo_texture.value)
+                    render_state.set_uniform(self.blit_program, 'screen_texture', 0) # Assign texture unit 0
 
                     self.blit_vertex_list.draw(pyglet.gl.GL_TRIANGLES)
-                    self.blit_program.stop()
 
             # UI
             # Ensure blending is enabled for UI elements
-            pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
-            pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
-            pyglet.gl.glDisable(pyglet.gl.GL_DEPTH_TEST) # Disable depth test for 2D UI
+            render_state.enable(pyglet.gl.GL_BLEND)
+            render_state.blend_func(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+            render_state.disable(pyglet.gl.GL_DEPTH_TEST) # Disable depth test for 2D UI
 
-            temp = self.current_biome_info.get('temp', 0)
-            humid = self.current_biome_info.get('humid', 0)
-            selected_block_texture = self.world.textures.get(self.player.selected_block)
-            self.hud.draw(self.width, self.height, temp, humid, selected_block_texture)
-            self.ui_batch.draw()
+            self.hud.draw()
 
             if self.show_minimap:
                 self.minimap.update_minimap(self.player.position)
                 self.minimap.draw()
 
+            # pyglet's own UI drawing changes programs and textures behind the tracker's back
+            render_state.invalidate()
+
             # Restore depth test for 3D rendering (if it was enabled before)
-            pyglet.gl.glEnable(pyglet.gl.GL_DEPTH_TEST)
+            render_state.enable(pyglet.gl.GL_DEPTH_TEST)
+            self.gpu_timer.end()
+            self.last_draw_time = time.perf_counter() - draw_start
 
     def draw_underwater_filter(self):
         if self.underwater_program and self.underwater_vertex_list:
-            pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
-            pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+            render_state.enable(pyglet.gl.GL_BLEND)
+            render_state.blend_func(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
 
-            self.underwater_program.use()
-            self.underwater_program['time'] = self.total_time
-            self.underwater_program['resolution'] = (float(self.width), float(self.height))
+            render_state.use_program(self.underwater_program)
+            render_state.set_uniform(self.underwater_program, 'time', self.total_time)
+            render_state.set_uniform(self.underwater_program, 'resolution', (float(self.width), float(self.height)))
 
             # Pass the FBO texture as a uniform
-            pyglet.gl.glActiveTexture(pyglet.gl.GL_TEXTURE0)
-            pyglet.gl.glBindTexture(pyglet.gl.GL_TEXTURE_2D, self.fbo_texture)
-            self.underwater_program['scene_texture'] = 0 # Assign texture unit 0
+            render_state.bind_texture(pyglet.gl.GL_TEXTURE_2D, self.fbo_texture.value)
+            render_state.set_uniform(self.underwater_program, 'scene_texture', 0) # Assign texture unit 0
 
             self.underwater_vertex_list.draw(pyglet.gl.GL_TRIANGLES)
-            self.underwater_program.stop()
 
-            pyglet.gl.glDisable(pyglet.gl.GL_BLEND)
+            render_state.disable(pyglet.gl.GL_BLEND)
 
     def on_key_press(self, symbol, modifiers):
         if self.game_state == GameState.MENU:
@@ -631,11 +790,13 @@ class Window(pyglet.window.Window):
                 self.player.toggle_ghost_mode()
             elif symbol == key.M:
                 self.show_minimap = not self.show_minimap
+            elif symbol == key.F3:
+                self.show_memory_report = not self.show_memory_report
 
     def _raycast(self, position, vector, max_distance=10):
         """
         Performs a raycast from a position in a given direction to find the first block hit.
-        Returns (block_x, block_y, block_z), block_type, and the previous position (prior_x, prior_y, prior_z).
+        Returns (block_x, block_y, block_z), block_type (registry id), and the previous position (prior_x, prior_y, prior_z).
         """
         x, y, z = position
         dx, dy, dz = vector
@@ -657,7 +818,7 @@ class Window(pyglet.window.Window):
         distance = 0.0
 
         while distance < max_distance:
-            block_type = self.world.blocks.get((current_x, current_y, current_z))
+            block_type = self.world.get_block((current_x, current_y, current_z))
             if block_type is not None:
                 return (current_x, current_y, current_z), block_type, (prior_x, prior_y, prior_z)
 
@@ -677,4 +838,4 @@ class Window(pyglet.window.Window):
         return None, None, None
 
     def run(self):
-        pyglet.app.run()
+        pyglet.app.run(1.0 / config.FRAME_RATE_LIMIT if config.FRAME_RATE_LIMIT > 0 else 0)
@@ -0,0 +1,6 @@
+"""
+Génération du monde sans OpenGL ni pyglet : utilisable depuis un processus de travail, le serveur,
+un outil de prégénération ou un test. core.world.World en est le client côté jeu.
+"""
+from worldgen.generator import (Generator, ChunkData, generate_chunk, get_generator,
+                                CAVE_NOISE_SCALE, CAVE_THRESHOLD, CAVE_MIN_DEPTH, BIOME_NAMES, SEA_FLOOR_BIOME)
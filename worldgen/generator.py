@@ -0,0 +1,307 @@
+import math
+import numpy as np
+from core.perlin import pnoise2, pnoise2_batch, pnoise3_batch
+from core.vegetation import Vegetation
+from core.sprites import Sprites
+from core.assets import sprite_biome_map
+from core.blocks import SEA_FLOOR, BIOME_TOP_BLOCKS, BIOME_BASE_BLOCKS
+from config import CHUNK_SIZE
+
+# Grottes : bruit 3D évalué seulement à plus de CAVE_MIN_DEPTH blocs sous la surface et au-dessus de y = 0
+CAVE_NOISE_SCALE = 0.05
+CAVE_THRESHOLD = 0.6
+CAVE_MIN_DEPTH = 3
+
+# Biomes de get_biome, dans l'ordre de leurs index dans les cartes (get_biome_indices, worldgen/maps.py)
+BIOME_NAMES = ("tundra", "snow", "taiga", "forest", "plains", "savanna", "desert", "jungle", "sea_floor")
+SEA_FLOOR_BIOME = BIOME_NAMES.index("sea_floor")
+# À partir de ce nombre de chunks, get_biomes_at_chunk_centers passe par le calcul par lot (get_heights et
+# get_biome_indices) : ~14 ms de coût fixe (les 100 octaves des biomes), puis ~13 µs par chunk contre ~21 µs
+CENTER_BATCH_MIN_CHUNKS = 2048
+
+
+class ChunkData:
+    """
+    Résultat de la génération d'un chunk :
+    - blocks : { (x, y, z): identifiant de bloc } (terrain, arbres, grottes creusées)
+    - columns : hauteurs (avec une colonne de marge), biomes et arbres des colonnes
+    - cave_mask : { position évaluée: True si la grotte la creuse }
+    - sprites : liste des sprites du chunk, ou None si on ne les a pas demandés
+    """
+    def __init__(self, cx, cz, blocks, columns, cave_mask, sprites=None):
+        self.cx = cx
+        self.cz = cz
+        self.blocks = blocks
+        self.columns = columns
+        self.cave_mask = cave_mask
+        self.sprites = sprites
+
+
+class Generator:
+    """
+    Génération déterministe du monde pour une seed : relief, biomes, arbres, grottes et sprites.
+    Sans état partagé ni dépendance à OpenGL ; World en est un client, qui ajoute caches, threads et rendu.
+    """
+    def __init__(self, seed, sprite_biomes=None):
+        self.seed = seed
+        self.vegetation = Vegetation(seed=seed)
+        if sprite_biomes is None:
+            sprite_biomes = sprite_biome_map()
+        self.sprites = Sprites(seed=seed, vegetation=self.vegetation, sprite_biomes=sprite_biomes)
+
+    def get_height(self, x, z):
+        # Base terrain noise for rolling hills
+        base = pnoise2(x * 0.01, z * 0.01, octaves=20, base=self.seed)
+
+        # Mountain noise for major elevation changes
+        mountain_noise = pnoise2(x * 0.01, z * 0.01, octaves=4, base=self.seed + 1)
+        ridge_noise = pnoise2(x * 0.01, z * 0.01, octaves=4, base=self.seed + 2)
+
+        # Remap mountain noise from [-1, 1] to a [0, 1] intensity, starting from a threshold
+        # This creates a smooth transition from plains to mountains instead of a sharp cliff
+        mountain_threshold = 0.0001
+        mountain_intensity = (mountain_noise - mountain_threshold) / (1.0 - mountain_threshold)
+        mountain_intensity = max(0, mountain_intensity)
+
+        # Add ridge detail to mountain intensity
+        ridge_threshold = 0.001
+        ridge_intensity = (ridge_noise - ridge_threshold) / (1.0 - ridge_threshold)
+        ridge_intensity = max(0, ridge_intensity)
+
+        # Shape the intensity curve to make foothills less steep and peaks more dramatic
+        mountain_elevation = pow(mountain_intensity, 2) * 500
+        ridge_elevation = pow(ridge_intensity, 2) * -150
+
+        # Combine base terrain with mountains
+        final_height = (base * -10) + mountain_elevation + ridge_elevation + 10
+
+        return int(final_height)
+
+    def normalize_to_uniform_simple(self, noise_value):
+        normalized = (noise_value + 1) / 2
+        return 1 / (1 + math.exp(-10 * (normalized - 0.5)))
+
+    def get_biome_name(self, x, z):
+        return self.get_biome(x, z)["name"]
+
+    def get_biome(self, x, z, biome_scale=1000.0):
+        seed = self.seed
+        octaves = 100
+
+        temp_raw = pnoise2(x / biome_scale, z / biome_scale, octaves=octaves, base=seed)
+        humid_raw = pnoise2((x + 1000) / biome_scale, (z + 1000) / biome_scale, octaves=octaves, base=seed + 10)
+
+        temp = self.normalize_to_uniform_simple(temp_raw)
+        humid = self.normalize_to_uniform_simple(humid_raw)
+
+        biome_name = "plains"
+        if temp < 0.35:
+            if humid < 0.5:
+                biome_name = "tundra"
+            else:
+                biome_name = "snow"
+        elif temp < 0.50:
+            if humid < 0.4:
+                biome_name = "taiga"
+            else:
+                biome_name = "forest"
+        elif temp < 0.60:
+            if humid < 0.4:
+                biome_name = "plains"
+            else:
+                biome_name = "forest"
+        elif temp < 0.70:
+            if humid < 0.40:
+                biome_name = "savanna"
+            else:
+                biome_name = "forest"
+        else:
+            if humid < 0.5:
+                biome_name = "desert"
+            else:
+                biome_name = "jungle"
+
+        return {"name": biome_name, "temp": temp, "humid": humid}
+
+    def get_heights(self, xs, zs):
+        """Version par lot de get_height (mêmes valeurs) pour des tableaux de coordonnées entières."""
+        x = np.asarray(xs, dtype=np.float64) * 0.01
+        z = np.asarray(zs, dtype=np.float64) * 0.01
+        base = pnoise2_batch(x, z, octaves=20, base=self.seed)
+        mountain_noise = pnoise2_batch(x, z, octaves=4, base=self.seed + 1)
+        ridge_noise = pnoise2_batch(x, z, octaves=4, base=self.seed + 2)
+
+        # Mêmes formules (et seuils) que get_height
+        mountain_intensity = np.maximum(0, (mountain_noise - 0.0001) / (1.0 - 0.0001))
+        ridge_intensity = np.maximum(0, (ridge_noise - 0.001) / (1.0 - 0.001))
+        final_height = (base * -10) + mountain_intensity ** 2 * 500 + ridge_intensity ** 2 * -150 + 10
+        return final_height.astype(np.int64)
+
+    def get_biome_indices(self, xs, zs, biome_scale=1000.0):
+        """Version par lot de get_biome : index dans BIOME_NAMES (jamais sea_floor, qui dépend de la hauteur)."""
+        x = np.asarray(xs, dtype=np.float64)
+        z = np.asarray(zs, dtype=np.float64)
+        temp_raw = pnoise2_batch(x / biome_scale, z / biome_scale, octaves=100, base=self.seed)
+        humid_raw = pnoise2_batch((x + 1000) / biome_scale, (z + 1000) / biome_scale, octaves=100, base=self.seed + 10)
+        temp = 1 / (1 + np.exp(-10 * ((temp_raw + 1) / 2 - 0.5)))
+        humid = 1 / (1 + np.exp(-10 * ((humid_raw + 1) / 2 - 0.5)))
+
+        # Même arbre de décision que get_biome
+        index = BIOME_NAMES.index
+        biomes = np.select(
+            [temp < 0.35, temp < 0.50, temp < 0.60, temp < 0.70],
+            [np.where(humid < 0.5, index("tundra"), index("snow")),
+             np.where(humid < 0.4, index("taiga"), index("forest")),
+             np.where(humid < 0.4, index("plains"), index("forest")),
+             np.where(humid < 0.4, index("savanna"), index("forest"))],
+            np.where(humid < 0.5, index("desert"), index("jungle")))
+        return biomes.astype(np.uint8)
+
+    def chunk_center_map(self, cx0, cz0, width, depth, step=1):
+        """
+        Biome (index dans BIOME_NAMES, SEA_FLOOR_BIOME sous l'eau) et hauteur au centre des chunks
+        (cx0 + i * step, cz0 + j * step), en tableaux [i, j] de forme (width, depth).
+        """
+        half = CHUNK_SIZE // 2
+        cx = cx0 + np.arange(width, dtype=np.int64) * step
+        cz = cz0 + np.arange(depth, dtype=np.int64) * step
+        xs, zs = np.meshgrid(cx * CHUNK_SIZE + half, cz * CHUNK_SIZE + half, indexing='ij')
+        heights = self.get_heights(xs, zs)
+        biomes = self.get_biome_indices(xs, zs)
+        biomes[heights < 0] = SEA_FLOOR_BIOME
+        return biomes, heights.astype(np.int16)
+
+    def get_biomes_at_chunk_centers(self, chunk_coords):
+        """Biome au centre de chaque chunk ("sea_floor" sous l'eau), pour la minimap."""
+        if len(chunk_coords) < CENTER_BATCH_MIN_CHUNKS:
+            # Bandes découvertes en se déplaçant : un appel par chunk coûte moins que le coût fixe d'un lot
+            half = CHUNK_SIZE // 2
+            return ["sea_floor" if self.get_height(cx * CHUNK_SIZE + half, cz * CHUNK_SIZE + half) < 0
+                    else self.get_biome_name(cx * CHUNK_SIZE + half, cz * CHUNK_SIZE + half) for cx, cz in chunk_coords]
+        # Remplissage complet (début de partie, téléportation) : un seul calcul par lot, mêmes valeurs
+        centers = np.array(chunk_coords, dtype=np.int64).reshape(-1, 2) * CHUNK_SIZE + CHUNK_SIZE // 2
+        heights = self.get_heights(centers[:, 0], centers[:, 1])
+        biomes = self.get_biome_indices(centers[:, 0], centers[:, 1])
+        biomes[heights < 0] = SEA_FLOOR_BIOME
+        return [BIOME_NAMES[index] for index in biomes.tolist()]
+
+    def chunk_columns(self, cx, cz):
+        """Hauteurs (chunk + une colonne de marge), biomes et arbres des colonnes d'un chunk."""
+        # Pre-calculate heights in and around the chunk to avoid redundant noise calls
+        surface_heights = {}
+        for local_x in range(-1, CHUNK_SIZE + 1):
+            for local_z in range(-1, CHUNK_SIZE + 1):
+                world_x, world_z = cx * CHUNK_SIZE + local_x, cz * CHUNK_SIZE + local_z
+                surface_heights[(world_x, world_z)] = self.get_height(world_x, world_z)
+
+        coords = [(x, z) for x in range(cx * CHUNK_SIZE, (cx + 1) * CHUNK_SIZE)
+                  for z in range(cz * CHUNK_SIZE, (cz + 1) * CHUNK_SIZE)]
+        biomes = {(x, z): self.get_biome(x, z)["name"] for x, z in coords}
+        tree_mask = self.vegetation.tree_mask([x for x, z in coords], [z for x, z in coords], list(biomes.values()))
+        trees = {coord for coord, has_tree in zip(coords, tree_mask.tolist()) if has_tree}
+
+        return {'heights': surface_heights, 'biomes': biomes, 'trees': trees}
+
+    def cave_density(self, positions):
+        """Teste un lot de positions : { position: True si la grotte la creuse }."""
+        if not positions:
+            return {}
+        coords = np.array(positions, dtype=np.float64) * CAVE_NOISE_SCALE
+        values = pnoise3_batch(coords[:, 0], coords[:, 1], coords[:, 2], octaves=2, base=self.seed + 2)
+        return dict(zip(positions, (values > CAVE_THRESHOLD).tolist()))
+
+    def is_cave(self, pos, cave_mask=None):
+        """True si la génération creuse une grotte en pos ; `cave_mask` (celui du chunk) sert de cache."""
+        x, y, z = pos
+        if y < 0 or y >= self.get_height(x, z) - CAVE_MIN_DEPTH:
+            return False # Don't carve near the surface or in water
+        if cave_mask is not None and pos in cave_mask:
+            return cave_mask[pos]
+        is_cave = self.cave_density([pos])[pos]
+        if cave_mask is not None:
+            cave_mask[pos] = is_cave
+        return is_cave
+
+    def natural_block(self, x, y, z, h):
+        """Bloc que la génération place en (x, y, z) sous une surface de hauteur h (sans arbres ni grottes)."""
+        if h < 0:
+            return SEA_FLOOR
+        biome = self.get_biome_name(x, z)
+        return BIOME_TOP_BLOCKS[biome] if y == h else BIOME_BASE_BLOCKS[biome]
+
+    def generate_chunk(self, cx, cz, columns=None, with_sprites=True):
+        """
+        Génère le chunk (cx, cz). `columns` évite de recalculer des colonnes déjà connues de l'appelant ;
+        `with_sprites` ajoute la liste des sprites (le client les place à une autre distance que le terrain).
+        """
+        if columns is None:
+            columns = self.chunk_columns(cx, cz)
+        chunk_blocks = {}
+        cave_candidates = []
+
+        surface_heights = columns['heights']
+        biomes = columns['biomes']
+
+        for x in range(cx * CHUNK_SIZE, (cx + 1) * CHUNK_SIZE):
+            for z in range(cz * CHUNK_SIZE, (cz + 1) * CHUNK_SIZE):
+                h = surface_heights.get((x, z), 0)
+                biome = biomes[(x, z)]
+
+                # Determine block types based on biome
+                if h < 0:
+                    block_type_top = SEA_FLOOR
+                    block_type_base = SEA_FLOOR
+                else:
+                    block_type_top = BIOME_TOP_BLOCKS[biome]
+                    block_type_base = BIOME_BASE_BLOCKS[biome]
+
+                # Generate the surface block
+                chunk_blocks[(x, h, z)] = block_type_top
+
+                # Get neighbor heights from the pre-calculated map
+                h_xp = surface_heights.get((x + 1, z), h)
+                h_xm = surface_heights.get((x - 1, z), h)
+                h_zp = surface_heights.get((x, z + 1), h)
+                h_zm = surface_heights.get((x, z - 1), h)
+
+                # Find the minimum height among the column and its direct neighbors
+                min_neighbor_h = min(h, h_xp, h_xm, h_zp, h_zm)
+
+                # Fill downwards from the surface to seal any side-holes
+                for y in range(h - 1, min_neighbor_h - 1, -1):
+                    chunk_blocks[(x, y, z)] = block_type_base if y >= 0 else SEA_FLOOR
+
+                # Only the part of the shell deep enough below the surface can be carved;
+                # columns whose shell is too thin are skipped entirely
+                for y in range(max(min_neighbor_h, 0), h - CAVE_MIN_DEPTH):
+                    cave_candidates.append((x, y, z))
+
+        # Trees (this chunk's and the overhang of its neighbours'), only where the terrain left air
+        anchors = self.vegetation.tree_anchors(cx, cz, columns, self.get_height, self.get_biome_name)
+        for pos, block_type in self.vegetation.structures_for_chunk(cx, cz, anchors).items():
+            chunk_blocks.setdefault(pos, block_type)
+
+        # Carve caves using 3D noise, evaluated in one batch over the candidate blocks
+        cave_mask = self.cave_density(cave_candidates)
+        for pos, is_cave in cave_mask.items():
+            if is_cave:
+                del chunk_blocks[pos]
+
+        sprites = self.sprites.generate_for_chunk(cx, cz, columns) if with_sprites else None
+        return ChunkData(cx, cz, chunk_blocks, columns, cave_mask, sprites)
+
+
+# Un générateur par seed, partagé par les appels à generate_chunk (workers de processus, serveur, outils)
+_generators = {}
+
+
+def get_generator(seed):
+    generator = _generators.get(seed)
+    if generator is None:
+        generator = _generators[seed] = Generator(seed)
+    return generator
+
+
+def generate_chunk(seed, cx, cz):
+    """Génère le chunk (cx, cz) du monde `seed`, sprites compris."""
+    return get_generator(seed).generate_chunk(cx, cz)
@@ -0,0 +1,132 @@
+import os
+import json
+import numpy as np
+from worldgen.generator import BIOME_NAMES
+from worldgen.storage import STORE_PATH
+from config import CHUNK_SIZE, LEGACY_WORLD_NOISE
+
+# Cartes du monde (biome et hauteur au centre de chaque chunk) en pyramide de tuiles .npy,
+# écrites par render_map.py et lues en mémoire mappée (par la minimap entre autres).
+# Niveau k : une cellule pour 2^k × 2^k chunks, celle du chunk (cx, cz) avec cx et cz multiples de 2^k ;
+# la tuile (tx, tz) du niveau k couvre les chunks [tx * MAP_TILE_CHUNKS * 2^k, (tx + 1) * MAP_TILE_CHUNKS * 2^k[.
+
+MAP_VERSION = 3 # 2 : bruit exact pour toutes les seeds ; 3 : bruit de core/perlin.py
+MAP_TILE_CHUNKS = 256 # Côté d'une tuile, en cellules
+TILE_DTYPE = np.dtype([('biome', 'u1'), ('height', '<i2')])
+UNKNOWN_BIOME = 255 # Cellule d'un niveau réduit dont la tuile source n'a pas été rendue
+
+
+def map_path(seed):
+    return os.path.join(STORE_PATH, f"{seed}_map")
+
+
+def map_settings(seed):
+    """Réglages dont dépend le contenu des tuiles ; une carte écrite avec d'autres réglages est ignorée."""
+    return {"version": MAP_VERSION, "seed": seed, "chunk_size": CHUNK_SIZE,
+            "tile_chunks": MAP_TILE_CHUNKS, "biomes": list(BIOME_NAMES), "legacy_world_noise": LEGACY_WORLD_NOISE}
+
+
+def tile_range(c0, c1, level=0):
+    """Index des tuiles du niveau `level` qui couvrent les chunks c0..c1 (bornes incluses) sur un axe."""
+    span = MAP_TILE_CHUNKS << level
+    return range(min(c0, c1) // span, max(c0, c1) // span + 1)
+
+
+def render_tile(generator, tx, tz):
+    """Biomes et hauteurs de la tuile (tx, tz) du niveau 0."""
+    return generator.chunk_center_map(tx * MAP_TILE_CHUNKS, tz * MAP_TILE_CHUNKS, MAP_TILE_CHUNKS, MAP_TILE_CHUNKS)
+
+
+class MapCache:
+    """
+    Répertoire de tuiles d'une seed : <niveau>/<tx>_<tz>.npy, un tableau TILE_DTYPE [i, j] par tuile.
+    Chaque tuile est écrite dans un fichier temporaire puis renommée : une tuile présente est complète,
+    plusieurs processus peuvent écrire des tuiles différentes en même temps.
+    """
+    def __init__(self, seed, path=None, create=False):
+        self.seed = seed
+        self.path = path or map_path(seed)
+        self.tiles = {} # (niveau, tx, tz) -> tableau mappé en lecture, ou None si absente
+        settings = map_settings(seed)
+        meta_path = os.path.join(self.path, "meta.json")
+        if create and not os.path.exists(meta_path):
+            os.makedirs(self.path, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump(settings, f)
+        with open(meta_path) as f:
+            stored = json.load(f)
+        if stored != settings:
+            raise ValueError(f"{self.path} a été rendu avec d'autres réglages : {stored}")
+
+    @classmethod
+    def open_existing(cls, seed):
+        """Carte de la seed si elle existe et correspond aux réglages actuels, sinon None (avec un message)."""
+        path = map_path(seed)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(seed, path)
+        except (ValueError, OSError) as e:
+            print(f"Carte prérendue ignorée : {e}")
+            return None
+
+    def tile_path(self, level, tx, tz):
+        return os.path.join(self.path, str(level), f"{tx}_{tz}.npy")
+
+    def has_tile(self, level, tx, tz):
+        return os.path.exists(self.tile_path(level, tx, tz))
+
+    def write_tile(self, level, tx, tz, biomes, heights):
+        path = self.tile_path(level, tx, tz)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        tile = np.lib.format.open_memmap(temp_path, mode='w+', dtype=TILE_DTYPE, shape=biomes.shape)
+        tile['biome'] = biomes
+        tile['height'] = heights
+        tile.flush()
+        del tile
+        os.replace(temp_path, path)
+        self.tiles.pop((level, tx, tz), None)
+
+    def tile(self, level, tx, tz):
+        """Tuile mappée en lecture seule, ou None si elle n'a pas été rendue."""
+        key = (level, tx, tz)
+        if key not in self.tiles:
+            path = self.tile_path(level, tx, tz)
+            self.tiles[key] = np.load(path, mmap_mode='r') if os.path.exists(path) else None
+        return self.tiles[key]
+
+    def build_parent(self, level, tx, tz):
+        """Écrit la tuile (tx, tz) du niveau `level` (> 0) en sous-échantillonnant ses 4 tuiles du niveau inférieur."""
+        half = MAP_TILE_CHUNKS // 2
+        biomes = np.full((MAP_TILE_CHUNKS, MAP_TILE_CHUNKS), UNKNOWN_BIOME, dtype=np.uint8)
+        heights = np.zeros((MAP_TILE_CHUNKS, MAP_TILE_CHUNKS), dtype=np.int16)
+        for a in range(2):
+            for b in range(2):
+                child = self.tile(level - 1, 2 * tx + a, 2 * tz + b)
+                if child is None:
+                    continue
+                area = (slice(a * half, (a + 1) * half), slice(b * half, (b + 1) * half))
+                biomes[area] = child['biome'][::2, ::2]
+                heights[area] = child['height'][::2, ::2]
+        self.write_tile(level, tx, tz, biomes, heights)
+
+    def lookup(self, chunk_coords, level=0):
+        """
+        Cellules des chunks demandés : [(index de biome, hauteur) ou None si la carte ne les couvre pas].
+        Au niveau k, un chunk prend la cellule du coin de son bloc de 2^k × 2^k chunks.
+        """
+        results = []
+        for cx, cz in chunk_coords:
+            i, j = cx >> level, cz >> level
+            tile = self.tile(level, i // MAP_TILE_CHUNKS, j // MAP_TILE_CHUNKS)
+            cell = tile[i % MAP_TILE_CHUNKS, j % MAP_TILE_CHUNKS] if tile is not None else None
+            if cell is None or cell['biome'] == UNKNOWN_BIOME:
+                results.append(None)
+            else:
+                results.append((int(cell['biome']), int(cell['height'])))
+        return results
+
+    def biome_names(self, chunk_coords):
+        """Nom du biome de chaque chunk (comme World.get_biomes_at_chunk_centers), None hors de la carte."""
+        return [BIOME_NAMES[cell[0]] if cell else None for cell in self.lookup(chunk_coords)]
@@ -0,0 +1,142 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+import numpy as np
+from worldgen.generator import ChunkData
+from config import CHUNK_SIZE, LEGACY_WORLD_HASH, LEGACY_WORLD_NOISE, WORLD_STORE_DIR
+
+# Stockage persistant des chunks générés : une base SQLite par seed, un blob compressé par chunk.
+# Les blocs modifiés par les joueurs n'y sont pas : c'est l'état de sortie du générateur.
+
+STORE_VERSION = 4 # 2 : hauteur des arbres tirée avec sa propre seed ; 3 : grottes exactes pour toutes les seeds ; 4 : bruit de core/perlin.py
+STORE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", WORLD_STORE_DIR))
+
+
+def store_path(seed):
+    return os.path.join(STORE_PATH, f"{seed}.sqlite")
+
+
+def store_settings(seed):
+    """Réglages dont dépend le contenu des chunks ; une base écrite avec d'autres réglages est ignorée."""
+    return {"version": STORE_VERSION, "seed": seed, "chunk_size": CHUNK_SIZE, "legacy_world_hash": LEGACY_WORLD_HASH,
+            "legacy_world_noise": LEGACY_WORLD_NOISE}
+
+
+def encode_chunk(chunk):
+    """ChunkData -> octets : en-tête JSON (biomes, sprites, tailles) suivi des tableaux, le tout compressé."""
+    x0, z0 = chunk.cx * CHUNK_SIZE, chunk.cz * CHUNK_SIZE
+    span = range(-1, CHUNK_SIZE + 1)
+    heights = np.array([[chunk.columns['heights'][(x0 + i, z0 + j)] for j in span] for i in span], dtype=np.int32)
+
+    palette = sorted(set(chunk.columns['biomes'].values()))
+    biome_index = {name: index for index, name in enumerate(palette)}
+    biomes = np.array([[biome_index[chunk.columns['biomes'][(x0 + i, z0 + j)]] for j in range(CHUNK_SIZE)]
+                       for i in range(CHUNK_SIZE)], dtype=np.uint8)
+
+    arrays = [
+        ("block_positions", np.array(list(chunk.blocks.keys()), dtype=np.int32).reshape(-1, 3)),
+        ("block_ids", np.array(list(chunk.blocks.values()), dtype=np.uint16)),
+        ("heights", heights),
+        ("biomes", biomes),
+        ("trees", np.array(sorted(chunk.columns['trees']), dtype=np.int32).reshape(-1, 2)),
+        ("cave_positions", np.array(list(chunk.cave_mask.keys()), dtype=np.int32).reshape(-1, 3)),
+        ("cave_values", np.array(list(chunk.cave_mask.values()), dtype=np.uint8)),
+    ]
+    header = {
+        "cx": chunk.cx,
+        "cz": chunk.cz,
+        "biome_palette": palette,
+        "sprites": chunk.sprites,
+        "arrays": [[name, array.dtype.str, list(array.shape)] for name, array in arrays],
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    payload = len(header_bytes).to_bytes(4, 'little') + header_bytes + b"".join(array.tobytes() for name, array in arrays)
+    return zlib.compress(payload, 6)
+
+
+def decode_chunk(data):
+    """Inverse de encode_chunk."""
+    payload = zlib.decompress(data)
+    header_length = int.from_bytes(payload[:4], 'little')
+    header = json.loads(payload[4:4 + header_length])
+    arrays = {}
+    offset = 4 + header_length
+    for name, dtype, shape in header["arrays"]:
+        array = np.frombuffer(payload, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        arrays[name] = array
+        offset += array.nbytes
+
+    cx, cz = header["cx"], header["cz"]
+    x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+    heights = arrays["heights"].tolist()
+    palette = header["biome_palette"]
+    biomes = arrays["biomes"].tolist()
+    span = range(CHUNK_SIZE + 2)
+    columns = {
+        'heights': {(x0 + i - 1, z0 + j - 1): heights[i][j] for i in span for j in span},
+        'biomes': {(x0 + i, z0 + j): palette[biomes[i][j]] for i in range(CHUNK_SIZE) for j in range(CHUNK_SIZE)},
+        'trees': set(map(tuple, arrays["trees"].tolist())),
+    }
+    blocks = dict(zip(map(tuple, arrays["block_positions"].tolist()), arrays["block_ids"].tolist()))
+    cave_mask = dict(zip(map(tuple, arrays["cave_positions"].tolist()), (arrays["cave_values"] != 0).tolist()))
+    sprites = header["sprites"]
+    if sprites is not None:
+        for sprite in sprites:
+            sprite["position"] = tuple(sprite["position"])
+    return ChunkData(cx, cz, blocks, columns, cave_mask, sprites)
+
+
+class ChunkStore:
+    """
+    Base de chunks d'une seed. Une seule connexion, partagée sous verrou (en jeu, le worker de génération
+    et la régénération des chunks évincés de la mémoire ; le processus principal de pregenerate.py).
+    """
+    def __init__(self, seed, path=None, create=False):
+        self.seed = seed
+        self.path = path or store_path(seed)
+        if create:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chunks (cx INTEGER, cz INTEGER, data BLOB, PRIMARY KEY (cx, cz))")
+        settings = store_settings(seed)
+        stored = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if not stored:
+            self.connection.executemany("INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value)) for key, value in settings.items()])
+            self.connection.commit()
+        elif {key: json.loads(value) for key, value in stored.items()} != settings:
+            self.connection.close()
+            raise ValueError(f"{self.path} a été généré avec d'autres réglages : {stored}")
+
+    @classmethod
+    def open_existing(cls, seed):
+        """Base de la seed si elle existe et correspond aux réglages actuels, sinon None (avec un message)."""
+        path = store_path(seed)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(seed, path)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"Monde prégénéré ignoré : {e}")
+            return None
+
+    def existing(self):
+        """Coordonnées de tous les chunks déjà stockés."""
+        return set(self.connection.execute("SELECT cx, cz FROM chunks"))
+
+    def load(self, cx, cz):
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM chunks WHERE cx = ? AND cz = ?", (cx, cz)).fetchone()
+        return decode_chunk(row[0]) if row else None
+
+    def save_many(self, encoded_chunks):
+        """Écrit [(cx, cz, octets)] en une transaction."""
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", encoded_chunks)
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()